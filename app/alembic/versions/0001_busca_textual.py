@@ -0,0 +1,53 @@
+"""busca textual em pessoas e projetos
+
+Revision ID: 0001_busca_textual
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.db.utils.busca_textual import DDL_POSTGRES, DDL_REMOCAO_POSTGRES
+
+# revision identifiers, used by Alembic.
+revision = '0001_busca_textual'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+TABELAS = ("tb_pessoa", "tb_projeto")
+
+
+def upgrade():
+    # bancos criados pelo create_all já têm a coluna; o restante (funções,
+    # triggers, índices) pode ser executado de novo
+    inspetor = sa.inspect(op.get_bind())
+    for tabela in TABELAS:
+        colunas = {coluna["name"] for coluna in inspetor.get_columns(tabela)}
+        if "busca" not in colunas:
+            op.add_column(
+                tabela, sa.Column("busca", postgresql.TSVECTOR(), nullable=True))
+
+    for comando in DDL_POSTGRES:
+        op.execute(comando)
+
+    # "SET busca = NULL" dispara o trigger, que calcula o vetor das linhas
+    # que já existiam
+    for tabela in TABELAS:
+        op.execute(f"UPDATE {tabela} SET busca = NULL")
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS ix_{tabela}_busca "
+            f"ON {tabela} USING gin (busca)")
+
+
+def downgrade():
+    for tabela in TABELAS:
+        op.execute(f"DROP INDEX IF EXISTS ix_{tabela}_busca")
+
+    for comando in DDL_REMOCAO_POSTGRES:
+        op.execute(comando)
+
+    for tabela in TABELAS:
+        op.drop_column(tabela, "busca")
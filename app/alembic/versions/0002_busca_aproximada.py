@@ -0,0 +1,28 @@
+"""busca aproximada (pg_trgm) por nome, área e habilidade
+
+Revision ID: 0002_busca_aproximada
+Revises: 0001_busca_textual
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+
+from app.db.utils.busca_aproximada import DDL_POSTGRES, DDL_REMOCAO_POSTGRES
+
+# revision identifiers, used by Alembic.
+revision = '0002_busca_aproximada'
+down_revision = '0001_busca_textual'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # extensões, função e índices usam IF NOT EXISTS / OR REPLACE: bancos
+    # criados pelo create_all já têm tudo
+    for comando in DDL_POSTGRES:
+        op.execute(comando)
+
+
+def downgrade():
+    for comando in DDL_REMOCAO_POSTGRES:
+        op.execute(comando)
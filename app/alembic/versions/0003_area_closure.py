@@ -0,0 +1,55 @@
+"""tabela de closure da hierarquia de áreas
+
+Revision ID: 0003_area_closure
+Revises: 0002_busca_aproximada
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.utils.closure_areas import SQL_PREENCHIMENTO, TABELA
+
+# revision identifiers, used by Alembic.
+revision = '0003_area_closure'
+down_revision = '0002_busca_aproximada'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # bancos criados pelo create_all já têm a tabela, mas ela pode estar
+    # vazia se as áreas são anteriores a ela; em todo caso é preenchida de
+    # novo a partir de area_pai_id
+    if TABELA in sa.inspect(op.get_bind()).get_table_names():
+        op.execute(f"DELETE FROM {TABELA}")
+        op.execute(SQL_PREENCHIMENTO)
+        return
+
+    op.create_table(
+        TABELA,
+        sa.Column(
+            "ancestor_id",
+            sa.Integer(),
+            sa.ForeignKey("tb_area.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column(
+            "descendant_id",
+            sa.Integer(),
+            sa.ForeignKey("tb_area.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("depth", sa.Integer(), nullable=False),
+    )
+    op.create_index(
+        "ix_tb_area_closure_descendant_id",
+        TABELA,
+        ["descendant_id", "ancestor_id"],
+    )
+    op.execute(SQL_PREENCHIMENTO)
+
+
+def downgrade():
+    op.drop_index("ix_tb_area_closure_descendant_id", table_name=TABELA)
+    op.drop_table(TABELA)
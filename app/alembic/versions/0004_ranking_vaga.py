@@ -0,0 +1,61 @@
+"""ranking de candidatos por vaga
+
+Revision ID: 0004_ranking_vaga
+Revises: 0003_area_closure
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004_ranking_vaga'
+down_revision = '0003_area_closure'
+branch_labels = None
+depends_on = None
+
+TABELA = "tb_ranking_vaga"
+
+
+def upgrade():
+    # bancos criados pelo create_all já têm a tabela
+    if TABELA in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        TABELA,
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "pessoa_projeto_id",
+            sa.Integer(),
+            sa.ForeignKey(
+                "tb_pessoa_projeto.id",
+                onupdate="CASCADE",
+                ondelete="CASCADE",
+            ),
+            nullable=False,
+        ),
+        sa.Column(
+            "pessoa_id",
+            sa.Integer(),
+            sa.ForeignKey(
+                "tb_pessoa.id", onupdate="CASCADE", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("posicao", sa.Integer(), nullable=False),
+        sa.Column("similaridade", sa.Float(), nullable=False),
+    )
+    op.create_index("ix_tb_ranking_vaga_id", TABELA, ["id"])
+    op.create_index("ix_tb_ranking_vaga_pessoa_id", TABELA, ["pessoa_id"])
+    op.create_index(
+        "ix_tb_ranking_vaga_posicao",
+        TABELA,
+        ["pessoa_projeto_id", "posicao"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_tb_ranking_vaga_posicao", table_name=TABELA)
+    op.drop_index("ix_tb_ranking_vaga_pessoa_id", table_name=TABELA)
+    op.drop_index("ix_tb_ranking_vaga_id", table_name=TABELA)
+    op.drop_table(TABELA)
@@ -0,0 +1,61 @@
+"""jobs de matchmaking
+
+Revision ID: 0005_job_match
+Revises: 0004_ranking_vaga
+Create Date: 2026-10-18 20:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0005_job_match'
+down_revision = '0004_ranking_vaga'
+branch_labels = None
+depends_on = None
+
+TABELA = "tb_job_match"
+
+
+def upgrade():
+    # bancos criados pelo create_all já têm a tabela
+    if TABELA in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        TABELA,
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "projeto_id",
+            sa.Integer(),
+            sa.ForeignKey(
+                "tb_projeto.id", onupdate="CASCADE", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "pessoa_id",
+            sa.Integer(),
+            sa.ForeignKey(
+                "tb_pessoa.id", onupdate="CASCADE", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("atribuicao", sa.String(), nullable=False),
+        sa.Column("situacao", sa.String(), nullable=False),
+        sa.Column("resultado", sa.JSON(), nullable=True),
+        sa.Column("erro", sa.String(), nullable=True),
+        sa.Column(
+            "data_criacao",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+        ),
+        sa.Column("data_inicio", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("data_fim", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_tb_job_match_id", TABELA, ["id"])
+    op.create_index("ix_tb_job_match_projeto_id", TABELA, ["projeto_id"])
+
+
+def downgrade():
+    op.drop_index("ix_tb_job_match_projeto_id", table_name=TABELA)
+    op.drop_index("ix_tb_job_match_id", table_name=TABELA)
+    op.drop_table(TABELA)
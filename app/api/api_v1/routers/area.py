@@ -7,9 +7,9 @@ from db.area.crud import (
     delete_area,
     edit_area,
     get_area_by_id,
-    get_areas
 )
 from db.pesquisa.area_habilidade import search_area_by_name
+from db.utils.arvore_areas import arvore_areas
 from db.area.schemas import (
     Area,
     AreaCreate,
@@ -17,27 +17,51 @@ from db.area.schemas import (
     AreasAndSubareas
 )
 from core.auth import get_current_active_pessoa
+from core.executor import executa
 
 area_router = r = APIRouter()
 
 
+def etag_corresponde(if_none_match: t.Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    etags = [
+        valor.strip().replace("W/", "", 1)
+        for valor in if_none_match.split(",")
+    ]
+    return "*" in etags or etag in etags
+
+
 @r.get(
     "/areas",
     response_model=t.List[AreasAndSubareas],
     response_model_exclude_none=True,
 )
 async def areas_list(
-    response: Response,
+    request: Request,
     db=Depends(get_db),
     current_pessoa=Depends(get_current_active_pessoa),
 ):
     """
     Get all areas
+
+    Served from an in-memory copy of the area tree. The response carries an
+    ETag; a request sending it back in If-None-Match gets a 304 while the
+    tree is unchanged.
     """
-    areas = await get_areas(db)
+    arvore = arvore_areas.atual()
+    if arvore is None:
+        arvore = await executa(arvore_areas.garante_atualizada, db)
+
+    etag = f'"{arvore.versao}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_corresponde(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
     # This is necessary for react-admin to work
-    response.headers["Content-Range"] = f"0-9/{len(areas)}"
-    return areas
+    headers["Content-Range"] = f"0-9/{len(arvore.areas)}"
+    return Response(
+        content=arvore.corpo, media_type="application/json", headers=headers)
 
 
 @r.get(
@@ -65,13 +89,20 @@ async def area_details_id(
 async def area_details_name(
     request: Request,
     area_name: str,
+    aproximada: bool = False,
+    skip: int = 0,
+    limit: int = 100,
     db=Depends(get_db),
     current_pessoa=Depends(get_current_active_pessoa),
 ):
     """
     Get any area details by its name
+
+    With aproximada=true, also matches misspelled or unaccented names,
+    ranked by similarity
     """
-    area = search_area_by_name(db, area_name)
+    area = search_area_by_name(
+        db, area_name, aproximada, skip, limit)
     return area
 
 
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Request, Depends
+import typing as t
+
+from db.session import get_db
+from db.pesquisa.schemas import Sugestao
+from db.utils.autocompletar import indice_areas, indice_habilidades
+from core.executor import executa
+
+autocompletar_router = r = APIRouter()
+
+MAX_SUGESTOES = 50
+
+
+async def sugestoes(indice, db, q: str, limit: int) -> t.List[Sugestao]:
+    # o banco só é usado para montar o índice ou quando ele expira; a
+    # sessão de get_db não abre conexão até ser usada
+    if indice.expirado():
+        await executa(indice.garante_atualizado, db)
+    limite = max(1, min(limit, MAX_SUGESTOES))
+    return [
+        Sugestao(id=id, nome=nome, uso=uso)
+        for id, nome, uso in indice.busca(q, limite)
+    ]
+
+
+@r.get("/autocompletar/areas", response_model=t.List[Sugestao])
+async def autocompletar_areas(
+    request: Request,
+    q: str = "",
+    limit: int = 10,
+    db=Depends(get_db)
+):
+    """
+    Suggest areas with a word starting with q, ignoring accents and case,
+    most used first
+    """
+    return await sugestoes(indice_areas, db, q, limit)
+
+
+@r.get("/autocompletar/habilidades", response_model=t.List[Sugestao])
+async def autocompletar_habilidades(
+    request: Request,
+    q: str = "",
+    limit: int = 10,
+    db=Depends(get_db)
+):
+    """
+    Suggest habilidades with a word starting with q, ignoring accents and
+    case, most used first
+    """
+    return await sugestoes(indice_habilidades, db, q, limit)
@@ -48,14 +48,21 @@ async def habilidades_list(
 async def habilidades_details_name(
     request: Request,
     habilidades_name: str,
+    aproximada: bool = False,
+    skip: int = 0,
+    limit: int = 100,
     db=Depends(get_db),
     current_pessoa=Depends(get_current_active_pessoa),
 ):
     """
     Get any habilidades details by its name
+
+    With aproximada=true, also matches misspelled or unaccented names,
+    ranked by similarity
     """
 
-    habilidades = search_habilidade_by_name(db, habilidades_name)
+    habilidades = search_habilidade_by_name(
+        db, habilidades_name, aproximada, skip, limit)
 
     return habilidades
 
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+import typing as t
+
+from core import config, metricas
+from core.auth import get_current_active_superuser
+
+metricas_router = r = APIRouter()
+prometheus_router = APIRouter()
+
+
+@r.get("/metricas", response_model=t.Dict[str, t.Dict[str, t.Any]])
+async def metricas_get(
+    request: Request,
+    current_pessoa=Depends(get_current_active_superuser),
+):
+    """
+    Get the metrics of this worker process (thread pool usage and queue
+    depth, slowest SQL statement per route, among others)
+    """
+    return metricas.coleta()
+
+
+@prometheus_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics_prometheus(request: Request):
+    """
+    Request duration, DB time and query count histograms per route, in the
+    Prometheus text format. Only available with INSTRUMENTACAO_ATIVA; when
+    METRICAS_TOKEN is set it must be sent as a Bearer token
+    """
+    if not config.INSTRUMENTACAO_ATIVA:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    if config.METRICAS_TOKEN and request.headers.get("authorization") != \
+            f"Bearer {config.METRICAS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Não autorizado")
+
+    from core.instrumentacao import exporta_prometheus
+    return exporta_prometheus()
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Request, Depends
 from app.db.pessoa_projeto.crud import edit_pessoa_projeto, get_pessoa_projeto
 import typing as t
 
-from app.db.session import get_db
+from db.session import get_db
 from app.db.pessoa_projeto import schemas
 from app.db.notificacao.crud import (
     notificacao_pendente_idealizador,
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Request, Depends, Response
 import typing as t
 
-from app.db.session import get_db
+from db.session import get_db
 from app.db.papel.crud import (
     get_papel,
     get_papel_by_id,
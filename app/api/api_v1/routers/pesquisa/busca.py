@@ -0,0 +1,47 @@
+from fastapi import (APIRouter, Request, Depends, Query)
+import typing as t
+
+from db.session import get_db
+from db.pesquisa.busca import MAX_PAGINA, PROJETO, TAMANHO_PAGINA, busca
+from db.pesquisa.schemas import PaginaBusca
+from core.executor import executa
+
+busca_router = r = APIRouter()
+
+
+@r.get(
+    "/busca", response_model=PaginaBusca, response_model_exclude_none=True,
+)
+async def busca_unificada(
+    request: Request,
+    q: str = "",
+    tipo: str = PROJETO,
+    area_id: t.List[int] = Query([]),
+    subareas: bool = True,
+    habilidade_id: t.List[int] = Query([]),
+    papel: t.Optional[str] = None,
+    remunerado: t.Optional[bool] = None,
+    visibilidade: t.Optional[bool] = None,
+    cursor: t.Optional[str] = None,
+    limit: int = TAMANHO_PAGINA,
+    db=Depends(get_db)
+):
+    """
+    Search pessoas (tipo=pessoa) or projetos (tipo=projeto) by free text
+    and facet filters, ranked by relevance
+
+    Repeated area_id and habilidade_id match any of the given ids; areas
+    include their subareas unless subareas=false. Pages are fetched with
+    the cursor returned as "proximo"; facet counts come with the first page.
+    """
+    return await executa(
+        busca, db, tipo, q,
+        areas_ids=area_id,
+        subareas=subareas,
+        habilidades_ids=habilidade_id,
+        papel=papel,
+        remunerado=remunerado,
+        visibilidade=visibilidade,
+        cursor=cursor,
+        limit=max(1, min(limit, MAX_PAGINA)),
+    )
@@ -1,16 +1,28 @@
 from fastapi import (APIRouter, Request, Depends)
 import typing as t
 
-from app.db.session import get_db
+from db.session import get_db
 from app.db.pesquisa.pessoa import (
    get_pessoa_by_name,
    get_pessoa_by_area,
    get_pessoa_by_habilidade,
 )
 from app.db.pessoa.schemas import Pessoa
+from core.executor import executa
 
 pesquisa_pessoa_router = r = APIRouter()
 
+
+def pesquisa(funcao, *args):
+
+    '''
+        Roda a pesquisa e a conversão para o schema (que pode disparar
+        carregamentos de relacionamentos) no pool do executor
+    '''
+
+    return [Pessoa.from_orm(resultado) for resultado in funcao(*args)]
+
+
 @r.get(
     "/pessoa/nome/{pessoa_name}", response_model=t.List[Pessoa], response_model_exclude_none=True,
 )
@@ -18,13 +30,19 @@ async def pessoa_by_name(
     request: Request,
     pessoa_name: str,
     area_id: int = 0,
+    aproximada: bool = False,
+    skip: int = 0,
+    limit: int = 100,
     db=Depends(get_db)
 ):
     """
     Search pessoa by name
+
+    With aproximada=true, also matches misspelled or unaccented names,
+    ranked by similarity
     """
-    pessoa = get_pessoa_by_name(db, pessoa_name, area_id)
-    return pessoa
+    return await executa(
+        pesquisa, get_pessoa_by_name, db, pessoa_name, area_id, aproximada, skip, limit)
 
 
 @r.get(
@@ -33,13 +51,14 @@ async def pessoa_by_name(
 async def pessoa_by_area(
     request: Request,
     pessoa_area: str,
+    skip: int = 0,
+    limit: int = 100,
     db=Depends(get_db)
 ):
     """
     Search pessoa by area
     """
-    pessoa = get_pessoa_by_area(db, pessoa_area)
-    return pessoa
+    return await executa(pesquisa, get_pessoa_by_area, db, pessoa_area, skip, limit)
 
 @r.get(
     "/pessoa/habilidade/{pessoa_habilidade}", response_model=t.List[Pessoa], response_model_exclude_none=True,
@@ -47,10 +66,11 @@ async def pessoa_by_area(
 async def pessoa_by_habilidade(
     request: Request,
     pessoa_habilidade: str,
+    skip: int = 0,
+    limit: int = 100,
     db=Depends(get_db)
 ):
     """
     Search pessoa by habilidade
     """
-    pessoa = get_pessoa_by_habilidade(db, pessoa_habilidade)
-    return pessoa
+    return await executa(pesquisa, get_pessoa_by_habilidade, db, pessoa_habilidade, skip, limit)
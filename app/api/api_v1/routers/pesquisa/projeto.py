@@ -1,7 +1,7 @@
 from fastapi import (APIRouter, Request, Depends)
 import typing as t
 
-from app.db.session import get_db
+from db.session import get_db
 from app.db.pesquisa.projeto import (
     get_projeto_by_area,
     get_projeto_by_habilidade,
@@ -9,9 +9,21 @@ from app.db.pesquisa.projeto import (
     get_projeto_by_objective,
 )
 from app.db.projeto.schemas import Projeto
+from core.executor import executa
 
 pesquisa_projeto_router = r = APIRouter()
 
+
+def pesquisa(funcao, *args):
+
+    '''
+        Roda a pesquisa e a conversão para o schema (que pode disparar
+        carregamentos de relacionamentos) no pool do executor
+    '''
+
+    return [Projeto.from_orm(resultado) for resultado in funcao(*args)]
+
+
 @r.get(
     "/projeto/nome/{projeto_name}", response_model=t.List[Projeto], response_model_exclude_none=True,
 )
@@ -19,13 +31,19 @@ async def projeto_by_name(
     request: Request,
     projeto_name: str,
     area_id: int = 0,
+    aproximada: bool = False,
+    skip: int = 0,
+    limit: int = 100,
     db=Depends(get_db)
 ):
     """
     Search project by name
+
+    With aproximada=true, also matches misspelled or unaccented names,
+    ranked by similarity
     """
-    projetos = get_projeto_by_name(db, projeto_name, area_id)
-    return projetos
+    return await executa(
+        pesquisa, get_projeto_by_name, db, projeto_name, area_id, aproximada, skip, limit)
 
 @r.get(
     "/projeto/objetivo/{projeto_objective}", response_model=t.List[Projeto], response_model_exclude_none=True,
@@ -33,13 +51,14 @@ async def projeto_by_name(
 async def projeto_by_objective(
     request: Request,
     projeto_objective: str,
+    skip: int = 0,
+    limit: int = 100,
     db=Depends(get_db)
 ):
     """
     Search project by objective
     """
-    projetos = get_projeto_by_objective(db, projeto_objective)
-    return projetos
+    return await executa(pesquisa, get_projeto_by_objective, db, projeto_objective, skip, limit)
 
 @r.get(
     "/projeto/area/{projeto_area}", response_model=t.List[Projeto], response_model_exclude_none=True,
@@ -47,13 +66,14 @@ async def projeto_by_objective(
 async def projeto_by_area(
     request: Request,
     projeto_area: str,
+    skip: int = 0,
+    limit: int = 100,
     db=Depends(get_db)
 ):
     """
     Search project by area
     """
-    projetos = get_projeto_by_area(db, projeto_area)
-    return projetos
+    return await executa(pesquisa, get_projeto_by_area, db, projeto_area, skip, limit)
 
 @r.get(
     "/projeto/habilidade/{projeto_habilidade}", response_model=t.List[Projeto], response_model_exclude_none=True,
@@ -61,10 +81,11 @@ async def projeto_by_area(
 async def projeto_by_habilidades(
     request: Request,
     projeto_habilidade: str,
+    skip: int = 0,
+    limit: int = 100,
     db=Depends(get_db)
 ):
     """
     Search project by habilidade
     """
-    projetos = get_projeto_by_habilidade(db, projeto_habilidade)
-    return projetos
\ No newline at end of file
+    return await executa(pesquisa, get_projeto_by_habilidade, db, projeto_habilidade, skip, limit)
\ No newline at end of file
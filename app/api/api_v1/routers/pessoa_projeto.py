@@ -6,7 +6,7 @@ from fastapi import (
 )
 import typing as t
 
-from app.db.session import get_db
+from db.session import get_db
 from app.db.pessoa_projeto.crud import (
     create_pessoa_projeto,
     get_pessoa_projeto,
@@ -25,12 +25,47 @@ from app.db.pessoa_projeto.schemas import (
     PessoaProjetoPessoaOut,
 )
 from app.db.pessoa.schemas import Pessoa
+from db.job_match.crud import (
+    create_job_match,
+    get_job_match,
+    get_pessoas_job_match,
+)
+from db.job_match.schemas import JobMatchOut
+from db.utils.carregamento import perfil_de
 
 from core.auth import get_current_active_pessoa
+from core.executor import executa
+from core.jobs import enfileira_job_match
 
 pessoa_projeto_router = r = APIRouter()
 
 
+async def sugere_projeto(db, pessoa_logada, projeto_id, assignment):
+
+    '''
+        Roda o matchmaking e a conversão para o schema no pool do executor:
+        depois do commit os objetos do ORM estão expirados, e recarregá-los
+        no event loop usaria a sessão fora da thread que a usou
+    '''
+
+    pessoas = await get_similaridade_projeto(
+        db, pessoa_logada, projeto_id, assignment)
+    return {
+        vaga_id: Pessoa.from_orm(pessoa) for vaga_id, pessoa in pessoas.items()
+    }
+
+
+async def sugere_vaga(db, pessoa_projeto_id):
+
+    '''
+        Como sugere_projeto, para uma só vaga
+    '''
+
+    pessoa = await get_similaridade_vaga(db, pessoa_projeto_id)
+    # vaga já preenchida: nada a converter
+    return Pessoa.from_orm(pessoa) if pessoa else pessoa
+
+
 @r.post(
     "/pessoa_projeto",
     response_model=PessoaProjeto,
@@ -73,7 +108,8 @@ async def get_pessoas_projeto(
     Get all pessoa_projeto
     """
 
-    pessoas_projeto = await get_all_pessoas_projeto(db)
+    pessoas_projeto = await get_all_pessoas_projeto(
+        db, perfil_de(PessoaProjeto))
     return pessoas_projeto
 
 @r.get(
@@ -88,7 +124,8 @@ async def get_pessoas_projeto_convite(
     pessoa=Depends(get_current_active_pessoa),
 ):
 
-    pessoas_projeto = await get_vagas_convite(db, qtd, pessoa.id)
+    pessoas_projeto = await get_vagas_convite(
+        db, qtd, pessoa.id, perfil_de(PessoaProjeto))
     
     return pessoas_projeto
 
@@ -100,19 +137,79 @@ async def get_pessoas_projeto_convite(
 async def similaridade_projeto(
     request: Request,
     projeto_id: int,
+    assignment: str = "greedy",
     db=Depends(get_db),
     pessoa_logada=Depends(get_current_active_pessoa),
 ):
 
     """
     Get pessoas mais similares dado um projeto específico
+
+    assignment: "greedy" fills the vagas in order; "optimal" maximizes
+    the total similarity across all vagas
     """
 
-    pessoas = await get_similaridade_projeto(db, pessoa_logada, projeto_id)
+    pessoas = await executa(
+        sugere_projeto, db, pessoa_logada, projeto_id, assignment)
 
     return pessoas
 
 
+@r.post(
+    "/pessoa_projeto/similaridade_projeto/{projeto_id}/job",
+    response_model=JobMatchOut,
+    response_model_exclude_none=True,
+    status_code=202,
+)
+async def similaridade_projeto_job(
+    request: Request,
+    projeto_id: int,
+    assignment: str = "greedy",
+    db=Depends(get_db),
+    pessoa_logada=Depends(get_current_active_pessoa),
+):
+
+    """
+    Queue the matchmaking of a projeto instead of running it in the
+    request. Poll /pessoa_projeto/similaridade_projeto/job/{job_id} for the
+    result; a notificacao is also sent when the job ends
+    """
+
+    job = create_job_match(db, pessoa_logada.id, projeto_id, assignment)
+
+    # A pending job that was already queued is queued again in case the
+    # process holding it went down; only one worker can pick it up
+    if job.situacao == "PENDENTE":
+        enfileira_job_match(job.id)
+
+    return job
+
+
+@r.get(
+    "/pessoa_projeto/similaridade_projeto/job/{job_id}",
+    response_model=JobMatchOut,
+    response_model_exclude_none=True,
+)
+async def similaridade_projeto_job_get(
+    request: Request,
+    job_id: int,
+    db=Depends(get_db),
+    pessoa_logada=Depends(get_current_active_pessoa),
+):
+
+    """
+    Get the state of a matchmaking job and, once it is CONCLUIDO, the
+    selected pessoa for each vaga
+    """
+
+    job = get_job_match(db, job_id, pessoa_logada.id)
+
+    resposta = JobMatchOut.from_orm(job)
+    resposta.pessoas = get_pessoas_job_match(db, job) or None
+
+    return resposta
+
+
 @r.get(
     "/pessoa_projeto/similaridade_vaga/{pessoa_projeto_id}",
     response_model=Pessoa,
@@ -129,7 +226,7 @@ async def similaridade_vaga(
     Get similaridade to only one vaga
     """
 
-    pessoa = await get_similaridade_vaga(db, pessoa_logada, pessoa_projeto_id)
+    pessoa = await executa(sugere_vaga, db, pessoa_projeto_id)
 
     return pessoa
 
@@ -148,7 +245,8 @@ async def get_all_pessoa_projeto_by_projeto(
     """
     Get all pessoa_projeto on projeto
     """
-    pessoa_projeto = await get_pessoa_projeto_by_projeto(db, projeto_id)
+    pessoa_projeto = await get_pessoa_projeto_by_projeto(
+        db, projeto_id, perfil_de(PessoaProjetoPessoaOut))
     return pessoa_projeto
 
 
@@ -166,7 +264,8 @@ async def pessoa_projeto_get(
     """
     Get pessoa_projeto by id
     """
-    pessoa_projeto = get_pessoa_projeto(db, pessoa_projeto_id)
+    pessoa_projeto = get_pessoa_projeto(
+        db, pessoa_projeto_id, perfil_de(PessoaProjeto))
     return pessoa_projeto
 
 
@@ -18,6 +18,7 @@ from db.pessoa.crud import (
     edit_foto_pessoa,
 )
 from db.pessoa.schemas import PessoaCreate, PessoaEdit, Pessoa, PessoaOut
+from db.utils.carregamento import perfil_de
 from core.auth import (
     get_current_active_pessoa,
     get_current_active_superuser,
@@ -38,7 +39,7 @@ async def pessoas_list(
     """
     Get all pessoas
     """
-    pessoas = get_pessoas(db)
+    pessoas = get_pessoas(db, perfil=perfil_de(Pessoa))
     # This is necessary for react-admin to work
     response.headers["Content-Range"] = f"0-9/{len(pessoas)}"
     return pessoas
@@ -66,9 +67,10 @@ async def pessoa_details(
     Get any pessoa details
     """
     if identificador.isnumeric():
-        pessoa = get_pessoa_by_id(db, identificador)
+        pessoa = get_pessoa_by_id(db, identificador, perfil_de(PessoaOut))
     else:
-        pessoa = get_pessoa_by_username(db, identificador)
+        pessoa = get_pessoa_by_username(
+            db, identificador, perfil_de(PessoaOut))
     return pessoa
     # return encoders.jsonable_encoder(
     #     pessoa, skip_defaults=True, exclude_none=True,
@@ -85,7 +87,7 @@ async def gera_curriculo(
     current_pessoa=Depends(get_current_active_pessoa),
 ):
 
-    pessoa = get_pessoa_by_id(db, pessoa_id)
+    pessoa = get_pessoa_by_id(db, pessoa_id, perfil_de(PessoaOut))
 
     return FileResponse(createPDFcurriculo(db, pessoa))
 
@@ -108,7 +110,7 @@ async def projetos_destaque(
 
     for projeto in projetos:
         pessoa_id = projeto.pessoa_id
-        pessoa = get_pessoa_by_id(db, pessoa_id)
+        pessoa = get_pessoa_by_id(db, pessoa_id, perfil_de(Pessoa))
         if pessoa not in pessoas:
             pessoas.append(pessoa)
         if len(pessoas) == qtd_pessoas:
@@ -128,7 +130,7 @@ async def random_pessoas(
     Get random pessoas
     """
 
-    pessoas = get_rand_pessoas(db, qtde)
+    pessoas = get_rand_pessoas(db, qtde, perfil_de(Pessoa))
 
     return pessoas
 
@@ -24,6 +24,7 @@ from db.projeto.crud import (
     get_projeto_participando,
 )
 from db.projeto.schemas import Projeto, ProjetoEdit
+from db.utils.carregamento import perfil_de
 from core.auth import get_current_active_pessoa
 
 projeto_router = r = APIRouter()
@@ -45,7 +46,8 @@ async def projetos_list(
     """
     Get all projetos
     """
-    projetos = get_projetos(db, skip, limit, visibilidade, pessoa_id)
+    projetos = get_projetos(
+        db, skip, limit, visibilidade, pessoa_id, perfil_de(Projeto))
     # This is necessary for react-admin to work
     # response.headers["Content-Range"] = f"0-9/{len(projetos)}"
     return projetos
@@ -65,7 +67,7 @@ async def projeto_details(
     """
     Get any pessoa details
     """
-    projeto = get_projeto(db, projeto_id)
+    projeto = get_projeto(db, projeto_id, perfil_de(Projeto))
     return projeto
 
 @r.get(
@@ -80,7 +82,8 @@ async def projeto_colaborador(
     current_pessoa=Depends(get_current_active_pessoa),
 ):
     
-    return await get_projeto_participando(db, participante_id)
+    return await get_projeto_participando(
+        db, participante_id, perfil_de(Projeto))
 
 
 @r.get(
@@ -97,7 +100,7 @@ async def projetos_destaque(
     """
     Get N projetos destaque
     """
-    projetos = get_projetos_destaque(db, qtd_projetos)    
+    projetos = get_projetos_destaque(db, qtd_projetos, perfil_de(Projeto))
     return projetos
 
 @r.get(
@@ -113,7 +116,7 @@ async def projeto_reacoes(
     current_pessoa=Depends(get_current_active_pessoa),
 ):
     
-    projetos = get_projeto_reacao(db, pessoa_id, reacao)
+    projetos = get_projeto_reacao(db, pessoa_id, reacao, perfil_de(Projeto))
     
     return projetos
 
@@ -1,5 +1,6 @@
     projeto = models.Projeto(
 import pytest
+import typing as t
 from db import models 
 
 @pytest.fixture
@@ -59,4 +60,20 @@ def test_projeto(test_db) -> models.Projeto:
     )
     test_db.add(projeto)
     test_db.commit()
-    return projeto
\ No newline at end of file
+    return projeto
+
+
+@pytest.fixture
+def test_papeis(test_db) -> t.List[models.Papel]:
+    """
+    Papeis with the ids the matching code expects
+    """
+
+    papeis = [
+        models.Papel(id=1, descricao="aliado"),
+        models.Papel(id=2, descricao="colaborador"),
+        models.Papel(id=3, descricao="idealizador"),
+    ]
+    test_db.add_all(papeis)
+    test_db.commit()
+    return papeis
@@ -153,3 +153,51 @@ def test_delete_area_not_found(client, fake_login_superuser):
 
     assert response.status_code == 404
     assert response.json() == {'detail': 'area não encontrada'}
+
+
+def test_autocompletar_area_created(client, fake_login_superuser):
+    response = client.post(
+        "/api/v1/areas",
+        json={
+            'descricao': 'Ciência de Dados'
+        }
+    )
+    assert response.status_code == 200
+    area_id = response.json()["id"]
+
+    response = client.get("/api/v1/autocompletar/areas?q=DAD")
+
+    assert response.status_code == 200
+    assert {"id": area_id, "nome": "Ciência de Dados", "uso": 0} \
+        in response.json()
+
+
+def test_get_areas_not_modified(client, test_area, fake_login_superuser):
+    response = client.get("/api/v1/areas")
+    etag = response.headers["etag"]
+
+    assert response.status_code == 200
+
+    response = client.get(
+        "/api/v1/areas", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+
+    client.post("/api/v1/areas", json={'descricao': 'Botânica'})
+    response = client.get(
+        "/api/v1/areas", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_edit_area_parent_cycle(
+    client, test_area, test_area_with_parent, fake_login_superuser
+):
+    response = client.put(
+        f"/api/v1/areas/{test_area.id}",
+        json={"area_pai_id": test_area_with_parent.id}
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "area pai inválida"}
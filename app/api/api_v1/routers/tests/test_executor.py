@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+from sqlalchemy import event
+
+from core import executor as executor_module
+from core.executor import ExecutorLimitado
+from db import models
+from db.utils.pesos_tags import estatisticas_tags
+
+COLABORADOR = 2
+
+
+def test_full_executor_returns_503(client, fake_login_superuser, monkeypatch):
+    cheio = ExecutorLimitado(max_workers=1, max_fila=0)
+    monkeypatch.setattr(executor_module, "executor", cheio)
+
+    liberado = threading.Event()
+    ocupando = threading.Thread(
+        target=asyncio.run, args=(cheio.executa(liberado.wait),))
+    ocupando.start()
+    try:
+        while cheio.estatisticas()["em_execucao"] < 1:
+            pass
+
+        response = client.get("/api/v1/pessoa_projeto/similaridade_vaga/1")
+        assert response.status_code == 503
+        assert cheio.estatisticas()["recusadas"] == 1
+    finally:
+        liberado.set()
+        ocupando.join()
+
+    assert cheio.estatisticas()["concluidas"] == 1
+
+
+def test_similaridade_vaga_serializes_in_worker(
+    client, test_db, test_papeis, test_projeto, test_habilidade,
+    fake_login_superuser
+):
+    pessoa = models.Pessoa(
+        usuario="candidata",
+        email="candidata@email.com",
+        senha="senha",
+        colaborador=True,
+    )
+    pessoa.habilidades = [test_habilidade]
+    vaga = models.PessoaProjeto(
+        projeto_id=test_projeto.id, papel_id=COLABORADOR, remunerado=False)
+    vaga.habilidades = [test_habilidade]
+    test_db.add_all([pessoa, vaga])
+    test_db.commit()
+    estatisticas_tags.invalida()
+    url = f"/api/v1/pessoa_projeto/similaridade_vaga/{vaga.id}"
+    esperado = (pessoa.id, test_habilidade.id)
+
+    threads = []
+
+    def registra(conn, cursor, statement, *args):
+        threads.append(threading.current_thread().name)
+
+    engine = test_db.get_bind()
+    event.listen(engine, "before_cursor_execute", registra)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, "before_cursor_execute", registra)
+
+    assert response.status_code == 200
+    resposta = response.json()
+    assert (resposta["id"], resposta["habilidades"][0]["id"]) == esperado
+
+    # Authentication queries on the event loop, then the worker; the
+    # committed objects are reloaded for the response there too, never
+    # back on the event loop
+    no_worker = [nome.startswith("executor") for nome in threads]
+    assert True in no_worker
+    assert all(no_worker[no_worker.index(True):]), threads
@@ -0,0 +1,96 @@
+from core import config
+from db import models
+from db.utils import indice_texto
+from db.utils.indice_texto import IndiceTexto
+
+DOCUMENTOS = {
+    1: ["Aplicativos de telemedicina para hospitais"],
+    2: ["Manejo do solo e plantio direto", "Pesquisa em agronomia"],
+    3: ["Aplicativos móveis para o varejo"],
+    4: ["Gestão de hospitais públicos"],
+}
+
+
+def _pessoas(indice, descricao, vaga_id=1):
+    ids, cossenos = indice.similaridades(vaga_id, descricao)
+    return dict(zip(ids.tolist(), cossenos.tolist()))
+
+
+def test_similaridades_rank_by_description():
+    indice = IndiceTexto()
+    indice.carrega(DOCUMENTOS.items())
+
+    pessoas = _pessoas(indice, "Desenvolver aplicativos de telemedicina")
+
+    # Only people sharing a term, the rarer terms weighing more
+    assert set(pessoas) == {1, 3}
+    assert pessoas[1] > pessoas[3] > 0
+    assert pessoas[1] <= 1.0
+
+    assert _pessoas(indice, "de para o") == {}
+    assert _pessoas(indice, None) == {}
+
+
+def test_atualiza_pessoa_matches_rebuild():
+    indice = IndiceTexto()
+    indice.carrega(DOCUMENTOS.items())
+    documentos = dict(DOCUMENTOS)
+
+    # Enough rewrites to compact the arrays along the way
+    for rodada in range(5):
+        for pessoa_id in (1, 3):
+            textos = ["Telemedicina rural"] if rodada % 2 else \
+                ["Aplicativos de agronomia"]
+            indice.atualiza_pessoa(pessoa_id, textos)
+            documentos[pessoa_id] = textos
+    indice.atualiza_pessoa(4, [])
+    del documentos[4]
+    indice.atualiza_pessoa(5, ["Hospitais e telemedicina"])
+    documentos[5] = ["Hospitais e telemedicina"]
+
+    reconstruido = IndiceTexto()
+    reconstruido.carrega(documentos.items())
+
+    for descricao in ("telemedicina", "aplicativos hospitais", "agronomia"):
+        atualizado = _pessoas(indice, descricao)
+        assert set(atualizado) == set(_pessoas(reconstruido, descricao))
+        # The norms keep the IDF of when each row was written, so only the
+        # order is compared
+        assert sorted(atualizado, key=atualizado.get) == sorted(
+            atualizado, key=_pessoas(reconstruido, descricao).get)
+
+
+def test_experiencia_routes_update_text_index(
+    client, test_db, test_superuser, fake_login_superuser, monkeypatch
+):
+    monkeypatch.setattr(config, "SIMILARIDADE_TEXTO_ATIVA", True)
+    indice = IndiceTexto()
+    monkeypatch.setattr(indice_texto, "indice_texto", indice)
+    indice.garante_atualizado(test_db)
+    pessoa_id = test_superuser.id
+
+    response = client.post(
+        "/api/v1/experiencias/profissional",
+        json={
+            "descricao": "Plataforma de telemedicina",
+            "data_inicio": "2020-01-01",
+        },
+    )
+    assert response.status_code == 200
+    assert pessoa_id in _pessoas(indice, "telemedicina")
+
+    experiencia_id = test_db.query(models.ExperienciaProf.id)\
+        .filter_by(pessoa_id=pessoa_id).scalar()
+
+    response = client.put(
+        f"/api/v1/experiencias/profissional/{experiencia_id}",
+        json={"descricao": "Pesquisa em agronomia"},
+    )
+    assert response.status_code == 200
+    assert pessoa_id not in _pessoas(indice, "telemedicina")
+    assert pessoa_id in _pessoas(indice, "agronomia")
+
+    response = client.delete(
+        f"/api/v1/experiencias/profissional/{experiencia_id}")
+    assert response.status_code == 200
+    assert pessoa_id not in _pessoas(indice, "agronomia")
@@ -0,0 +1,59 @@
+import re
+
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.testclient import TestClient
+
+from core import instrumentacao
+from core.instrumentacao import instala_eventos, mede_requisicao
+
+
+@pytest.fixture
+def client_medido(test_db):
+    # The middleware is only installed in main.py with INSTRUMENTACAO_ATIVA,
+    # so it wraps an app of its own here
+    app = FastAPI()
+    app.middleware("http")(mede_requisicao)
+
+    @app.get("/consultas/{quantidade}")
+    async def consultas(quantidade: int):
+        for _ in range(quantidade):
+            test_db.execute("SELECT 1")
+        return {}
+
+    # The test transaction's savepoint is opened before measuring
+    test_db.execute("SELECT 1")
+    instala_eventos()
+    yield TestClient(app)
+    event.remove(Engine, "before_cursor_execute", instrumentacao._antes_consulta)
+    event.remove(Engine, "after_cursor_execute", instrumentacao._depois_consulta)
+
+
+def test_server_timing_counts_queries(client_medido):
+    response = client_medido.get("/consultas/3")
+    assert response.status_code == 200
+
+    timing = response.headers["Server-Timing"]
+    assert re.fullmatch(
+        r'db;dur=[\d.]+;desc="3 consultas", db-lenta;dur=[\d.]+, '
+        r'total;dur=[\d.]+',
+        timing,
+    )
+    banco, total = (
+        float(valor) for valor in re.findall(r"(?:^db|total);dur=([\d.]+)", timing))
+    assert banco <= total
+
+    # Labelled by the route template, not the path
+    rotulos = 'method="GET",route="/consultas/{quantidade}"'
+    metricas = instrumentacao.exporta_prometheus()
+    assert f"conectar_db_queries_sum{{{rotulos}}} 3" in metricas
+    assert f"conectar_request_duration_seconds_count{{{rotulos}}} 1" in metricas
+    assert "/consultas/{quantidade}" in instrumentacao.consultas_mais_lentas()
+
+
+def test_server_timing_without_queries(client_medido):
+    response = client_medido.get("/consultas/0")
+    assert response.headers["Server-Timing"].startswith(
+        'db;dur=0.0;desc="0 consultas", db-lenta;dur=0.0, ')
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.api.api_v1.routers import pessoa_projeto as pessoa_projeto_router
+from db import models
+from db.job_match.crud import executa_job_match
+from db.utils.pesos_tags import estatisticas_tags
+
+COLABORADOR = 2
+
+
+@pytest.fixture
+def fila(monkeypatch):
+    # Jobs are queued here and run by the test, on the test session
+    enfileirados = []
+    monkeypatch.setattr(
+        pessoa_projeto_router, "enfileira_job_match", enfileirados.append)
+    return enfileirados
+
+
+def _job(client, projeto_id, **params):
+    return client.post(
+        f"/api/v1/pessoa_projeto/similaridade_projeto/{projeto_id}/job",
+        params=params,
+    )
+
+
+def _consulta(client, job_id):
+    return client.get(
+        f"/api/v1/pessoa_projeto/similaridade_projeto/job/{job_id}")
+
+
+def test_job_match_polling(
+    client, test_db, test_papeis, test_projeto, test_habilidade,
+    test_superuser, fake_login_superuser, fila
+):
+    pessoa = models.Pessoa(
+        usuario="candidata",
+        email="candidata@email.com",
+        senha="senha",
+        colaborador=True,
+    )
+    pessoa.habilidades = [test_habilidade]
+    vaga = models.PessoaProjeto(
+        projeto_id=test_projeto.id, papel_id=COLABORADOR, remunerado=False)
+    vaga.habilidades = [test_habilidade]
+    test_db.add_all([pessoa, vaga])
+    test_db.commit()
+    estatisticas_tags.invalida()
+
+    response = _job(client, test_projeto.id)
+    assert response.status_code == 202
+    job = response.json()
+    assert job["situacao"] == "PENDENTE"
+    assert "pessoas" not in job
+    assert fila == [job["id"]]
+
+    # Asking again while it waits returns the same job, queued again
+    response = _job(client, test_projeto.id)
+    assert response.json()["id"] == job["id"]
+    assert fila == [job["id"], job["id"]]
+
+    response = _consulta(client, job["id"])
+    assert response.status_code == 200
+    assert response.json()["situacao"] == "PENDENTE"
+
+    assert asyncio.run(executa_job_match(test_db, job["id"])) is not None
+    # A repeated delivery finds the job already taken
+    assert asyncio.run(executa_job_match(test_db, job["id"])) is None
+
+    response = _consulta(client, job["id"])
+    assert response.status_code == 200
+    resultado = response.json()
+    assert resultado["situacao"] == "CONCLUIDO"
+    assert resultado["data_fim"]
+    assert {
+        int(vaga_id): candidata["id"]
+        for vaga_id, candidata in resultado["pessoas"].items()
+    } == {vaga.id: pessoa.id}
+
+    # The requester is told the job ended
+    notificacao = test_db.query(models.Notificacao)\
+        .filter(models.Notificacao.destinatario_id == test_superuser.id)\
+        .one()
+    assert notificacao.projeto_id == test_projeto.id
+
+    # Once finished, a new request gets a new job
+    assert _job(client, test_projeto.id).json()["id"] != job["id"]
+
+
+def test_job_match_invalid(client, test_projeto, fake_login_superuser, fila):
+    response = _job(client, test_projeto.id, assignment="random")
+    assert response.status_code == 400
+
+    response = _job(client, 999)
+    assert response.status_code == 404
+
+    assert _consulta(client, 999).status_code == 404
+    assert fila == []
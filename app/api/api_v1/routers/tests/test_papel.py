@@ -0,0 +1,97 @@
+import pytest
+
+from db import models
+from db.utils.cache_referencias import cache_papeis
+
+
+@pytest.fixture(autouse=True)
+def cache_vazio():
+    # The copy outlives the test transaction: start and end without one
+    cache_papeis.invalida_local()
+    yield
+    cache_papeis.invalida_local()
+
+
+def _consultas_papel(statements):
+    return [s for s in statements if "tb_papel" in s]
+
+
+def test_get_papel_reads_through_cache(
+    client, test_db, test_papeis, query_budget, fake_login_superuser
+):
+    with query_budget(10) as statements:
+        response = client.get("/api/v1/papel/2")
+    assert response.status_code == 200
+    assert response.json() == {"id": 2, "descricao": "colaborador"}
+    assert len(_consultas_papel(statements)) == 1
+
+    with query_budget(10) as statements:
+        response = client.get("/api/v1/papel/2")
+    assert response.json() == {"id": 2, "descricao": "colaborador"}
+    assert _consultas_papel(statements) == []
+
+    # Created behind the cache's back, as by another worker: looked up on
+    # its own and added to the copy, without reloading the table
+    novo = models.Papel(id=10, descricao="mentor")
+    test_db.add(novo)
+    test_db.commit()
+    recargas = cache_papeis.recargas
+
+    response = client.get(f"/api/v1/papel/{novo.id}")
+    assert response.json() == {"id": novo.id, "descricao": "mentor"}
+    assert cache_papeis.recargas == recargas
+
+    with query_budget(10) as statements:
+        assert client.get(f"/api/v1/papel/{novo.id}").status_code == 200
+    assert _consultas_papel(statements) == []
+
+    assert client.get("/api/v1/papel/999").status_code == 404
+
+
+def _papel(test_db, descricao):
+    papel = models.Papel(descricao=descricao)
+    test_db.add(papel)
+    test_db.commit()
+    return papel
+
+
+def test_create_papel_updates_cache(
+    client, test_db, query_budget, fake_login_superuser
+):
+    client.get(f"/api/v1/papel/{_papel(test_db, 'aliado').id}")
+
+    response = client.post("/api/v1/papel", json={"descricao": "mentor"})
+    assert response.status_code == 200
+    papel_id = response.json()["id"]
+
+    with query_budget(10) as statements:
+        response = client.get(f"/api/v1/papel/{papel_id}")
+    assert response.json() == {"id": papel_id, "descricao": "mentor"}
+    assert _consultas_papel(statements) == []
+
+
+def test_edit_papel_updates_cache(
+    client, test_papeis, query_budget, fake_login_superuser
+):
+    client.get("/api/v1/papel/3")
+
+    response = client.put("/api/v1/papel/3", json={"descricao": "fundador"})
+    assert response.status_code == 200
+
+    with query_budget(10) as statements:
+        response = client.get("/api/v1/papel/3")
+    assert response.json() == {"id": 3, "descricao": "fundador"}
+    assert _consultas_papel(statements) == []
+
+
+def test_delete_papel_updates_cache(
+    client, test_db, fake_login_superuser
+):
+    papel_id = _papel(test_db, "mentor").id
+
+    assert client.get(f"/api/v1/papel/{papel_id}").status_code == 200
+
+    response = client.delete(f"/api/v1/papel/{papel_id}")
+    assert response.status_code == 200
+
+    assert client.get(f"/api/v1/papel/{papel_id}").status_code == 404
@@ -115,3 +115,38 @@ def test_unauthenticated_routes(client):
     assert response.status_code == 403
     response = client.delete("/api/v1/pessoas")
     assert response.status_code == 403
+
+
+def test_get_pessoas_query_budget(client, test_db, test_area, test_habilidade, query_budget):
+    for i in range(10):
+        pessoa = models.Pessoa(
+            email=f"pessoa{i}",
+            senha="pessoa",
+            usuario=f"pessoa{i}",
+        )
+        pessoa.areas = [test_area]
+        pessoa.habilidades = [test_habilidade]
+        test_db.add(pessoa)
+    test_db.commit()
+
+    # pessoas + habilidades + areas, whatever the number of pessoas
+    with query_budget(3):
+        response = client.get("/api/v1/pessoas")
+
+    assert response.status_code == 200
+    assert len(response.json()) == 10
+
+
+def test_edit_pessoa_unknown_habilidade(
+    client, test_superuser, test_habilidade, fake_login_superuser
+):
+    response = client.put(
+        f"/api/v1/admin/pessoas/{test_superuser.id}",
+        json={"habilidades": [{"id": test_habilidade.id}, {"id": 123143}]},
+    )
+
+    assert response.status_code == 404
+    assert response.json()["detail"]["nao_encontradas"] == [{"id": 123143}]
+
+    response = client.get(f"/api/v1/pessoas/{test_superuser.id}")
+    assert response.json().get("habilidades", []) == []
@@ -0,0 +1,114 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.pool import NullPool
+
+from core import config
+from db import pool
+from db.session import get_db
+from main import app
+
+
+@pytest.mark.parametrize("max_conexoes, reservadas, workers, esperado", [
+    # Heroku hobby plan: 20 connections, 4 kept for celery and psql
+    (20, 4, 4, (2, 2)),
+    (20, 4, 3, (3, 2)),
+    (100, 10, 2, (23, 22)),
+    # Never less than one connection per worker
+    (5, 4, 8, (1, 0)),
+    (20, 4, 0, (8, 8)),
+])
+def test_dimensiona(max_conexoes, reservadas, workers, esperado):
+    pool_size, max_overflow = pool.dimensiona(max_conexoes, reservadas, workers)
+
+    assert (pool_size, max_overflow) == esperado
+    if max_conexoes - reservadas >= workers > 0:
+        assert (pool_size + max_overflow) * workers <= max_conexoes - reservadas
+
+
+@pytest.fixture
+def estatisticas(monkeypatch):
+    # Engines and settings registered here are dropped after the test
+    for atributo in ("modo", "pool_size", "max_overflow"):
+        monkeypatch.setattr(
+            pool.estatisticas, atributo, getattr(pool.estatisticas, atributo))
+    monkeypatch.setattr(pool.estatisticas, "_engines", [])
+    return pool.estatisticas
+
+
+def test_argumentos_engine(estatisticas, monkeypatch):
+    url = "postgresql://usuario@localhost/conectar"
+    monkeypatch.setattr(config, "DB_PGBOUNCER", False)
+    monkeypatch.setattr(config, "WEB_CONCURRENCY", 4)
+    monkeypatch.setattr(config, "DB_MAX_CONEXOES", 20)
+    monkeypatch.setattr(config, "DB_CONEXOES_RESERVADAS", 4)
+    monkeypatch.setattr(config, "DB_POOL_SIZE", None)
+    monkeypatch.setattr(config, "DB_MAX_OVERFLOW", None)
+
+    argumentos = pool.argumentos_engine(url)
+    assert argumentos["poolclass"] is pool.QueuePoolMedido
+    assert (argumentos["pool_size"], argumentos["max_overflow"]) == (2, 2)
+    assert estatisticas.coleta()["modo"] == pool.MODO_FILA
+
+    # The explicit settings win over the computed ones
+    monkeypatch.setattr(config, "DB_POOL_SIZE", 5)
+    monkeypatch.setattr(config, "DB_MAX_OVERFLOW", 0)
+    argumentos = pool.argumentos_engine(url)
+    assert (argumentos["pool_size"], argumentos["max_overflow"]) == (5, 0)
+
+    assert "poolclass" not in pool.argumentos_engine("sqlite://")
+
+    monkeypatch.setattr(config, "DB_PGBOUNCER", True)
+    assert pool.argumentos_engine(url) == {"poolclass": NullPool}
+    assert estatisticas.coleta()["modo"] == pool.MODO_PGBOUNCER
+
+
+def test_pool_metrics(test_db, estatisticas, monkeypatch):
+    monkeypatch.setattr(config, "DB_PGBOUNCER", False)
+    monkeypatch.setattr(config, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(config, "DB_MAX_OVERFLOW", 1)
+    monkeypatch.setattr(config, "DB_POOL_TIMEOUT", 1)
+
+    url = str(test_db.get_bind().engine.url)
+    engine = create_engine(url, **pool.argumentos_engine(url))
+    pool.instala(engine)
+    antes = estatisticas.coleta()
+
+    try:
+        conexoes = [engine.connect(), engine.connect()]
+        with pytest.raises(sa_exc.TimeoutError):
+            engine.connect()
+
+        durante = estatisticas.coleta()
+        assert durante["checkouts"] - antes["checkouts"] == 2
+        assert durante["em_uso"] - antes["em_uso"] == 2
+        assert durante["overflows"] - antes["overflows"] == 1
+        assert durante["timeouts"] - antes["timeouts"] == 1
+        assert durante["ociosas"] == 0
+
+        for conexao in conexoes:
+            conexao.close()
+
+        # The overflow connection is closed, the other one goes back
+        depois = estatisticas.coleta()
+        assert depois["em_uso"] == antes["em_uso"]
+        assert depois["ociosas"] == 1
+    finally:
+        engine.dispose()
+
+
+def test_pool_timeout_returns_503(client, fake_login_superuser, monkeypatch):
+    def sem_conexao():
+        raise sa_exc.TimeoutError("QueuePool limit reached")
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, sem_conexao)
+
+    response = client.get("/api/v1/papel")
+    assert response.status_code == 503
+
+
+def test_metricas_include_pool(client, fake_login_superuser):
+    response = client.get("/api/v1/metricas")
+    assert response.status_code == 200
+    assert {"checkouts", "em_uso", "overflows", "timeouts"} <= \
+        response.json()["pool_conexoes"].keys()
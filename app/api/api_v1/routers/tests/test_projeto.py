@@ -1,3 +1,6 @@
+from db import models
+
+
 def test_get_projeto_by_id(client, test_projeto, fake_login_superuser):
     response = client.get(f"/api/v1/projeto/{test_projeto.id}")
 
@@ -116,3 +119,131 @@ def test_delete_projeto_not_found(client, fake_login_superuser):
 
     assert response.status_code == 404
     assert response.json() == {'detail': 'projeto não encontrado'}
+
+
+def test_get_projetos_query_budget(client, test_db, test_area, test_habilidade, query_budget):
+    for i in range(10):
+        projeto = models.Projeto(
+            nome=f"Projeto {i}",
+            descricao="Vamos conectar",
+            objetivo="Conectar pessoas",
+            visibilidade=True,
+        )
+        projeto.areas = [test_area]
+        projeto.habilidades = [test_habilidade]
+        test_db.add(projeto)
+    test_db.commit()
+
+    # projetos + habilidades + areas + reacoes, whatever the number of projetos
+    with query_budget(4):
+        response = client.get("/api/v1/projetos")
+
+    assert response.status_code == 200
+    assert len(response.json()) == 10
+
+
+def test_search_projeto_by_name(client, test_db, test_projeto):
+    test_db.add_all([
+        models.Projeto(
+            nome="Conectando Saúde",
+            descricao="Telemedicina",
+            objetivo="Atender pessoas",
+        ),
+        models.Projeto(
+            nome="Hortas urbanas",
+            descricao="Conectar vizinhos",
+            objetivo="Plantar",
+        ),
+    ])
+    test_db.commit()
+
+    # Prefix of any word in the name only, ignoring accents and case
+    response = client.get("/api/v1/projeto/nome/CONECT")
+    assert response.status_code == 200
+    assert [p["nome"] for p in response.json()] == [
+        "Conectar", "Conectando Saúde"]
+
+    response = client.get("/api/v1/projeto/nome/saude")
+    assert [p["nome"] for p in response.json()] == ["Conectando Saúde"]
+
+
+def test_search_projeto_by_name_aproximada(client, test_db, test_projeto):
+    test_db.add(
+        models.Projeto(
+            nome="Hortas urbanas",
+            descricao="Conectar vizinhos",
+            objetivo="Plantar",
+        )
+    )
+    test_db.commit()
+
+    # Misspelled words only match in the fuzzy mode
+    response = client.get("/api/v1/projeto/nome/hortaz urbnas")
+    assert response.status_code == 200
+    assert response.json() == []
+
+    response = client.get(
+        "/api/v1/projeto/nome/hortaz urbnas", params={"aproximada": True})
+    assert response.status_code == 200
+    assert [p["nome"] for p in response.json()] == ["Hortas urbanas"]
+
+
+def test_search_projeto_by_name_aproximada_area(
+        client, test_db, test_area):
+    subarea = models.Area(descricao="Agricultura", area_pai_id=test_area.id)
+    test_db.add(subarea)
+    test_db.commit()
+
+    for nome, area in (
+        ("Hortas urbanas", subarea),
+        ("Hortas rurais", None),
+    ):
+        projeto = models.Projeto(
+            nome=nome, descricao="Projeto", objetivo="Plantar")
+        projeto.areas = [area] if area else []
+        test_db.add(projeto)
+    test_db.commit()
+
+    # The area filter includes its subareas in the fuzzy mode too
+    response = client.get(
+        "/api/v1/projeto/nome/hortaz",
+        params={"aproximada": True, "area_id": test_area.id})
+    assert response.status_code == 200
+    assert [p["nome"] for p in response.json()] == ["Hortas urbanas"]
+
+def test_search_projetos_by_area_with_facets(client, test_db, test_area):
+    subarea = models.Area(descricao="Banco de dados", area_pai_id=test_area.id)
+    test_db.add(subarea)
+    test_db.commit()
+
+    for nome, area in (
+        ("Compiladores", test_area),
+        ("Índices", subarea),
+        ("Hortas urbanas", None),
+    ):
+        projeto = models.Projeto(
+            nome=nome, descricao="Projeto", objetivo="Testar",
+            visibilidade=True)
+        projeto.areas = [area] if area else []
+        test_db.add(projeto)
+    test_db.commit()
+
+    # The area filter includes its subareas; one result per page
+    params = {"tipo": "projeto", "area_id": test_area.id, "limit": 1}
+    response = client.get("/api/v1/busca", params=params)
+    assert response.status_code == 200
+    pagina = response.json()
+    assert [p["nome"] for p in pagina["itens"]] == ["Compiladores"]
+    assert pagina["facetas"]["areas"] == {
+        str(test_area.id): 1, str(subarea.id): 1}
+
+    response = client.get(
+        "/api/v1/busca", params={**params, "cursor": pagina["proximo"]})
+    pagina = response.json()
+    assert [p["nome"] for p in pagina["itens"]] == ["Índices"]
+    assert "proximo" not in pagina
+    assert "facetas" not in pagina
+
+    response = client.get(
+        "/api/v1/busca", params={**params, "subareas": False, "limit": 20})
+    assert [p["nome"] for p in response.json()["itens"]] == ["Compiladores"]
@@ -0,0 +1,266 @@
+import pytest
+
+from core import config
+from db import models
+from db.utils.pesos_tags import estatisticas_tags
+
+COLABORADOR = 2
+
+
+def _vaga_com_ranking(test_db, projeto, candidato, areas=()):
+    vaga = models.PessoaProjeto(
+        projeto_id=projeto.id,
+        remunerado=False,
+        situacao="PENDENTE_IDEALIZADOR",
+    )
+    vaga.areas = list(areas)
+    test_db.add(vaga)
+    test_db.commit()
+
+    test_db.add(models.RankingVaga(
+        pessoa_projeto_id=vaga.id,
+        pessoa_id=candidato.id,
+        posicao=0,
+        similaridade=1.0,
+    ))
+    test_db.commit()
+    return vaga
+
+
+def _ranking(test_db, vaga):
+    return [
+        pessoa_id for pessoa_id, in test_db.query(models.RankingVaga.pessoa_id)
+        .filter(models.RankingVaga.pessoa_projeto_id == vaga.id)
+        .order_by(models.RankingVaga.posicao)
+    ]
+
+
+def test_edit_pessoa_invalidates_rankings_of_related_areas(
+    client, test_db, test_projeto, test_pessoa, test_superuser,
+    test_area, test_area_with_parent, fake_login_superuser
+):
+    outra_area = models.Area(descricao="Agronomia")
+    test_db.add(outra_area)
+    test_db.commit()
+
+    vaga_area_pai = _vaga_com_ranking(
+        test_db, test_projeto, test_pessoa, [test_area])
+    vaga_outra_area = _vaga_com_ranking(
+        test_db, test_projeto, test_pessoa, [outra_area])
+
+    # The subarea scores against a vaga that asks for its parent area
+    response = client.put(
+        f"/api/v1/admin/pessoas/{test_superuser.id}",
+        json={"areas": [{"id": test_area_with_parent.id}]},
+    )
+    assert response.status_code == 200
+
+    assert _ranking(test_db, vaga_area_pai) == []
+    assert _ranking(test_db, vaga_outra_area) == [test_pessoa.id]
+
+
+def test_edit_area_parent_invalidates_rankings(
+    client, test_db, test_projeto, test_pessoa,
+    test_area, test_area_with_parent, fake_login_superuser
+):
+    vaga = _vaga_com_ranking(
+        test_db, test_projeto, test_pessoa, [test_area_with_parent])
+
+    # Renaming keeps the tree, so the ranking stays
+    response = client.put(
+        f"/api/v1/areas/{test_area_with_parent.id}",
+        json={"descricao": "Estruturas de dados"},
+    )
+    assert response.status_code == 200
+    assert _ranking(test_db, vaga) == [test_pessoa.id]
+
+    response = client.put(
+        f"/api/v1/areas/{test_area_with_parent.id}",
+        json={"area_pai_id": None},
+    )
+    assert response.status_code == 200
+    assert _ranking(test_db, vaga) == []
+
+
+def test_delete_area_invalidates_rankings(
+    client, test_db, test_projeto, test_pessoa,
+    test_area, test_area_with_parent, fake_login_superuser
+):
+    vaga = _vaga_com_ranking(test_db, test_projeto, test_pessoa, [test_area])
+
+    response = client.delete(f"/api/v1/areas/{test_area_with_parent.id}")
+    assert response.status_code == 200
+    assert _ranking(test_db, vaga) == []
+
+
+def _candidato(test_db, usuario, habilidades=(), areas=()):
+    pessoa = models.Pessoa(
+        usuario=usuario,
+        nome=usuario,
+        email=f"{usuario}@email.com",
+        senha="senha",
+        colaborador=True,
+    )
+    pessoa.habilidades = list(habilidades)
+    pessoa.areas = list(areas)
+    test_db.add(pessoa)
+    test_db.commit()
+    return pessoa
+
+
+@pytest.fixture
+def vaga_com_candidatos(
+    test_db, test_papeis, test_projeto, test_habilidade, test_area,
+    monkeypatch
+):
+    monkeypatch.setattr(config, "RANKING_VAGA_TAMANHO", 50)
+
+    melhor = _candidato(test_db, "melhor", [test_habilidade], [test_area])
+    outros = [
+        _candidato(test_db, f"outro{i}", [test_habilidade]) for i in range(2)]
+
+    vaga = models.PessoaProjeto(
+        projeto_id=test_projeto.id,
+        papel_id=COLABORADOR,
+        remunerado=False,
+        titulo="Backend",
+    )
+    vaga.habilidades = [test_habilidade]
+    vaga.areas = [test_area]
+    test_db.add(vaga)
+    test_db.commit()
+    estatisticas_tags.invalida()
+
+    return vaga, melhor, outros
+
+
+def _sugere(client, vaga):
+    return client.get(f"/api/v1/pessoa_projeto/similaridade_vaga/{vaga.id}")
+
+
+def test_similaridade_vaga_pops_stored_ranking(
+    client, test_db, test_habilidade, test_area, vaga_com_candidatos,
+    fake_login_superuser
+):
+    vaga, melhor, outros = vaga_com_candidatos
+
+    response = _sugere(client, vaga)
+    assert response.status_code == 200
+    assert response.json()["id"] == melhor.id
+    assert sorted(_ranking(test_db, vaga)) == sorted(o.id for o in outros)
+
+    test_db.refresh(vaga)
+    assert vaga.pessoa_id == melhor.id
+    assert vaga.situacao == "PENDENTE_IDEALIZADOR"
+
+    # Someone better added behind the hooks' back is not seen until the
+    # stored ranking is dropped
+    _candidato(test_db, "novo", [test_habilidade], [test_area])
+
+    response = _sugere(client, vaga)
+    assert response.status_code == 200
+    assert response.json()["id"] in [o.id for o in outros]
+    assert len(_ranking(test_db, vaga)) == 1
+
+
+def test_similaridade_vaga_recomputes_when_used_up(
+    client, test_db, vaga_com_candidatos, fake_login_superuser, monkeypatch
+):
+    vaga, melhor, outros = vaga_com_candidatos
+    monkeypatch.setattr(config, "RANKING_VAGA_TAMANHO", 1)
+
+    sugeridas = []
+    for _ in range(3):
+        response = _sugere(client, vaga)
+        assert response.status_code == 200
+        sugeridas.append(response.json()["id"])
+        assert _ranking(test_db, vaga) == []
+
+    # Each recomputation skips the people already suggested
+    assert sugeridas[0] == melhor.id
+    assert sorted(sugeridas[1:]) == sorted(o.id for o in outros)
+
+    response = _sugere(client, vaga)
+    assert response.status_code == 404
+
+
+def test_similaridade_vaga_skips_ignored(
+    client, test_db, vaga_com_candidatos, fake_login_superuser
+):
+    vaga, melhor, outros = vaga_com_candidatos
+
+    assert _sugere(client, vaga).json()["id"] == melhor.id
+
+    # The next one in the stored ranking was ignored meanwhile
+    ignorado, restante = _ranking(test_db, vaga)
+    test_db.add(models.PessoaIgnoradaVaga(
+        pessoa_projeto_id=vaga.id, pessoa_id=ignorado))
+    test_db.commit()
+
+    assert _sugere(client, vaga).json()["id"] == restante
+    assert _ranking(test_db, vaga) == []
+
+
+def test_edit_pessoa_invalidates_ranking(
+    client, test_db, test_area, vaga_com_candidatos, fake_login_superuser
+):
+    vaga, melhor, outros = vaga_com_candidatos
+
+    _sugere(client, vaga)
+    assert _ranking(test_db, vaga)
+
+    response = client.put(
+        f"/api/v1/admin/pessoas/{outros[0].id}",
+        json={"areas": [{"id": test_area.id}]},
+    )
+    assert response.status_code == 200
+    assert _ranking(test_db, vaga) == []
+
+    # The recomputed ranking sees the new area
+    assert _sugere(client, vaga).json()["id"] == outros[0].id
+
+
+def test_edit_pessoa_projeto_invalidates_ranking(
+    client, test_db, vaga_com_candidatos, fake_login_superuser
+):
+    vaga, melhor, outros = vaga_com_candidatos
+
+    _sugere(client, vaga)
+    ranking = _ranking(test_db, vaga)
+
+    # The title plays no part in the similarity
+    response = client.put(
+        f"/api/v1/pessoa_projeto/{vaga.id}", json={"titulo": "Frontend"})
+    assert response.status_code == 200
+    assert _ranking(test_db, vaga) == ranking
+
+    response = client.put(
+        f"/api/v1/pessoa_projeto/{vaga.id}", json={"areas": []})
+    assert response.status_code == 200
+    assert _ranking(test_db, vaga) == []
+
+
+def test_interesse_invalidates_ranking(
+    client, test_db, test_projeto, vaga_com_candidatos, fake_login_superuser
+):
+    vaga, melhor, outros = vaga_com_candidatos
+    reacao = {
+        "pessoa_id": outros[0].id,
+        "projeto_id": test_projeto.id,
+        "reacao": "INTERESSE",
+    }
+
+    _sugere(client, vaga)
+    assert _ranking(test_db, vaga)
+
+    response = client.post("/api/v1/reacoes", json=reacao)
+    assert response.status_code == 202
+    assert _ranking(test_db, vaga) == []
+
+    # The interest bonus breaks the tie between the remaining people
+    assert _sugere(client, vaga).json()["id"] == outros[0].id
+    assert _ranking(test_db, vaga)
+
+    response = client.delete("/api/v1/reacoes", params=reacao)
+    assert response.status_code == 200
+    assert _ranking(test_db, vaga) == []
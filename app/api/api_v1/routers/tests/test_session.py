@@ -0,0 +1,56 @@
+import pytest
+
+from db import session
+from db.session import get_db
+from main import app
+
+
+class _Sessao:
+    # Stands in for a SessionLocal() session: the work goes to the test
+    # session, closing is only counted
+    def __init__(self, test_db):
+        self._test_db = test_db
+        self.fechada = 0
+
+    def close(self):
+        self.fechada += 1
+
+    def __getattr__(self, nome):
+        return getattr(self._test_db, nome)
+
+
+@pytest.fixture
+def sessoes(client, test_db, fake_login_superuser, monkeypatch):
+    criadas = []
+
+    def fabrica():
+        criadas.append(_Sessao(test_db))
+        return criadas[-1]
+
+    monkeypatch.setattr(session, "SessionLocal", fabrica)
+    monkeypatch.delitem(app.dependency_overrides, get_db)
+    return criadas
+
+
+def test_request_shares_one_session(client, test_papeis, sessoes):
+    # Authentication and the route both use the database
+    response = client.get("/api/v1/papel")
+    assert response.status_code == 200
+
+    assert len(sessoes) == 1
+    assert sessoes[0].fechada == 1
+
+
+def test_session_closed_on_error(client, sessoes):
+    response = client.get("/api/v1/papel/999")
+    assert response.status_code == 404
+
+    assert len(sessoes) == 1
+    assert sessoes[0].fechada == 1
+
+
+def test_request_without_database_creates_no_session(client, sessoes):
+    response = client.get("/api/health")
+    assert response.status_code == 200
+
+    assert sessoes == []
@@ -0,0 +1,406 @@
+from datetime import date
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from core import config
+from db import models
+from db.reacoes.crud import get_ids_pessoas_interessadas
+from db.utils import indice_texto
+from db.utils.indice_tags import AREA, HABILIDADE
+from db.utils.indice_texto import IndiceTexto
+from db.utils.matriz_similaridade import (
+    INELEGIVEL,
+    MatrizSimilaridade,
+    _hungaro,
+    atribui_gulosa,
+    atribui_otima,
+    calcula_matriz_projeto,
+)
+from db.utils.pesos_tags import estatisticas_tags
+from db.utils.similaridade import pontua_candidatos_sql
+
+COLABORADOR = 2
+
+
+def _pessoa(test_db, usuario, habilidades=(), areas=(), colaborador=True):
+    pessoa = models.Pessoa(
+        usuario=usuario,
+        email=f"{usuario}@email.com",
+        senha="senha",
+        colaborador=colaborador,
+        aliado=not colaborador,
+    )
+    pessoa.habilidades = list(habilidades)
+    pessoa.areas = list(areas)
+    test_db.add(pessoa)
+    test_db.commit()
+    return pessoa
+
+
+def test_pontua_candidatos_sql(
+    test_db, test_papeis, test_projeto, test_habilidade,
+    test_area, test_area_with_parent
+):
+    outra_area = models.Area(descricao="Agronomia")
+    test_db.add(outra_area)
+    test_db.commit()
+
+    ambas = _pessoa(test_db, "ambas", [test_habilidade], [test_area])
+    habilidade = _pessoa(test_db, "habilidade", [test_habilidade])
+    subarea = _pessoa(test_db, "subarea", areas=[test_area_with_parent])
+    sem_coincidencia = _pessoa(test_db, "sem", areas=[outra_area])
+    ignorada = _pessoa(test_db, "ignorada", [test_habilidade], [test_area])
+    _pessoa(test_db, "aliada", [test_habilidade], colaborador=False)
+    _pessoa(test_db, "sem_tags")
+
+    test_db.add(models.Reacoes(
+        pessoa_id=habilidade.id, projeto_id=test_projeto.id,
+        reacao="INTERESSE"))
+
+    vaga = models.PessoaProjeto(
+        projeto_id=test_projeto.id, papel_id=COLABORADOR, remunerado=False)
+    vaga.habilidades = [test_habilidade]
+    vaga.areas = [test_area]
+    test_db.add(vaga)
+    test_db.commit()
+
+    estatisticas_tags.invalida()
+    estatisticas_tags.garante_atualizado(test_db)
+    peso_habilidade = estatisticas_tags.peso((HABILIDADE, test_habilidade.id))
+    peso_area = estatisticas_tags.peso((AREA, test_area.id))
+
+    candidatos = dict(pontua_candidatos_sql(test_db, vaga, [ignorada.id]))
+
+    # Other papeis, people without tags and ignored people never show up;
+    # people without matches only fill the list
+    assert candidatos == {
+        ambas.id: pytest.approx(peso_habilidade + peso_area),
+        habilidade.id: pytest.approx(
+            peso_habilidade * (1 + config.BONUS_INTERESSE)),
+        subarea.id: pytest.approx(
+            peso_area * config.DESCONTO_HIERARQUIA_AREAS),
+        sem_coincidencia.id: 0.0,
+    }
+
+    melhores = pontua_candidatos_sql(test_db, vaga, [ignorada.id], limite=1)
+    assert [pessoa_id for pessoa_id, _ in melhores] == [ambas.id]
+
+
+def test_pontua_candidatos_sql_texto(
+    test_db, test_papeis, test_projeto, test_habilidade, test_area,
+    monkeypatch
+):
+    monkeypatch.setattr(config, "SIMILARIDADE_TEXTO_ATIVA", True)
+    monkeypatch.setattr(indice_texto, "indice_texto", IndiceTexto())
+
+    habilidade = _pessoa(test_db, "habilidade", [test_habilidade])
+    texto = _pessoa(test_db, "texto", areas=[test_area])
+    sem_tags = _pessoa(test_db, "sem_tags")
+    for pessoa in (texto, sem_tags):
+        test_db.add(models.ExperienciaProf(
+            pessoa_id=pessoa.id,
+            descricao="Aplicativos de telemedicina para hospitais",
+            data_inicio=date(2020, 1, 1),
+        ))
+
+    vaga = models.PessoaProjeto(
+        projeto_id=test_projeto.id,
+        papel_id=COLABORADOR,
+        remunerado=False,
+        descricao="Desenvolver aplicativos de telemedicina",
+    )
+    vaga.habilidades = [test_habilidade]
+    test_db.add(vaga)
+    test_db.commit()
+
+    estatisticas_tags.invalida()
+    estatisticas_tags.garante_atualizado(test_db)
+    peso_habilidade = estatisticas_tags.peso((HABILIDADE, test_habilidade.id))
+
+    candidatos = dict(pontua_candidatos_sql(test_db, vaga, []))
+
+    # Text alone brings in candidates, but only people with some tag
+    assert candidatos[habilidade.id] == pytest.approx(peso_habilidade)
+    assert candidatos[texto.id] > 0
+    assert sem_tags.id not in candidatos
+
+
+def test_calcula_matriz_projeto_limita_candidatos(
+    test_db, test_papeis, test_projeto, test_habilidade, test_area,
+    monkeypatch
+):
+    monkeypatch.setattr(config, "MATCH_CANDIDATOS_POR_VAGA", 2)
+
+    habilidade = _pessoa(test_db, "habilidade", [test_habilidade])
+    sem_coincidencia = [
+        _pessoa(test_db, f"sem{i}", areas=[test_area]) for i in range(5)]
+    aliada = _pessoa(test_db, "aliada", [test_habilidade], colaborador=False)
+
+    vaga = models.PessoaProjeto(
+        projeto_id=test_projeto.id, papel_id=COLABORADOR, remunerado=False)
+    vaga.habilidades = [test_habilidade]
+    test_db.add(vaga)
+    test_db.commit()
+
+    estatisticas_tags.invalida()
+    matriz = calcula_matriz_projeto(test_db, test_projeto.id, [vaga])
+    pessoas_ids = matriz.pessoas_ids.tolist()
+
+    # Everyone with a matching tag, plus a bounded sample of the rest
+    assert habilidade.id in pessoas_ids
+    assert aliada.id not in pessoas_ids
+    sorteadas = set(pessoas_ids) & {pessoa.id for pessoa in sem_coincidencia}
+    assert 1 <= len(sorteadas) <= 2
+
+
+def _matriz(similaridades, vagas_ids=None):
+    similaridades = np.array(similaridades, dtype=float)
+    pessoas, vagas = similaridades.shape
+    return MatrizSimilaridade(
+        np.arange(100, 100 + pessoas),
+        vagas_ids or list(range(1, vagas + 1)),
+        similaridades,
+    )
+
+
+def test_atribui_gulosa_fills_vagas_in_order():
+    # Person 100 is the best for both vagas: the first one takes it
+    matriz = _matriz([
+        [3.0, 5.0],
+        [1.0, 4.0],
+        [2.0, 0.0],
+    ])
+
+    assert atribui_gulosa(matriz) == {1: 100, 2: 101}
+
+
+def test_atribui_gulosa_rectangular():
+    # More vagas than people: the last vaga is left out
+    matriz = _matriz([
+        [1.0, 2.0, 3.0],
+        [2.0, 1.0, 0.0],
+    ])
+    assert atribui_gulosa(matriz) == {1: 101, 2: 100}
+
+    # More people than vagas: only the best ones are picked
+    matriz = _matriz([
+        [1.0, 0.0],
+        [0.0, 2.0],
+        [3.0, 1.0],
+        [0.0, 0.0],
+    ])
+    assert atribui_gulosa(matriz) == {1: 102, 2: 101}
+
+
+def test_atribui_gulosa_skips_ineligible():
+    matriz = _matriz([
+        [INELEGIVEL, 1.0, INELEGIVEL],
+        [INELEGIVEL, 2.0, INELEGIVEL],
+    ])
+
+    assert atribui_gulosa(matriz) == {2: 101}
+
+
+def _melhor_atribuicao(similaridades):
+    # Brute force: the most vagas filled, then the highest total
+    pessoas, vagas = similaridades.shape
+    melhor = (0, 0.0)
+    for escolha in permutations(list(range(pessoas)) + [None] * vagas, vagas):
+        validas = [
+            similaridades[i, j] for j, i in enumerate(escolha)
+            if i is not None and similaridades[i, j] != INELEGIVEL
+        ]
+        melhor = max(melhor, (len(validas), sum(validas)))
+    return melhor
+
+
+@pytest.mark.parametrize("n, m", [(3, 3), (4, 5)])
+def test_hungaro_matches_brute_force(n, m):
+    gerador = np.random.default_rng(42)
+    for _ in range(20):
+        custos = gerador.integers(0, 10, size=(n, m)).astype(float)
+        colunas = _hungaro(custos)
+
+        assert len(set(colunas.tolist())) == n
+        assert custos[np.arange(n), colunas].sum() == min(
+            sum(custos[i, j] for i, j in enumerate(escolha))
+            for escolha in permutations(range(m), n)
+        )
+
+
+@pytest.mark.parametrize("forma", [(3, 3), (4, 5), (5, 4)])
+def test_atribui_otima_matches_brute_force(forma):
+    gerador = np.random.default_rng(7)
+    for _ in range(20):
+        similaridades = gerador.integers(0, 10, size=forma).astype(float)
+        similaridades[gerador.random(forma) < 0.3] = INELEGIVEL
+        matriz = _matriz(similaridades)
+
+        selecionadas = atribui_otima(matriz, candidatos_por_vaga=10)
+
+        # no person fills two vagas, and no ineligible pair is picked
+        assert len(set(selecionadas.values())) == len(selecionadas)
+        linhas = [pessoa_id - 100 for pessoa_id in selecionadas.values()]
+        colunas = [vaga_id - 1 for vaga_id in selecionadas]
+        valores = similaridades[linhas, colunas]
+        assert (valores != INELEGIVEL).all()
+
+        assert (len(selecionadas), valores.sum()) == \
+            _melhor_atribuicao(similaridades)
+
+
+def test_atribui_otima_beats_greedy_order():
+    # Greedy gives person 100 to vaga 1 and leaves vaga 2 with 0
+    matriz = _matriz([
+        [2.0, 2.0],
+        [1.0, 0.0],
+    ])
+
+    assert atribui_gulosa(matriz) == {1: 100, 2: 101}
+    assert atribui_otima(matriz) == {1: 101, 2: 100}
+
+
+def test_similaridade_projeto_optimal(
+    client, test_db, test_papeis, test_projeto, fake_login_superuser,
+    monkeypatch
+):
+    monkeypatch.setattr(config, "SIMILARIDADE_PONDERADA", False)
+
+    h1, h2, h3 = habilidades = [
+        models.Habilidades(nome=nome) for nome in ("Python", "SQL", "React")]
+    test_db.add_all(habilidades)
+    test_db.commit()
+
+    completa = _pessoa(test_db, "completa", [h1, h2, h3])
+    parcial = _pessoa(test_db, "parcial", [h1])
+
+    vagas = []
+    for tags in ([h1, h2], [h2, h3]):
+        vaga = models.PessoaProjeto(
+            projeto_id=test_projeto.id, papel_id=COLABORADOR,
+            remunerado=False)
+        vaga.habilidades = tags
+        test_db.add(vaga)
+        vagas.append(vaga)
+    test_db.commit()
+    estatisticas_tags.invalida()
+
+    response = client.get(
+        f"/api/v1/pessoa_projeto/similaridade_projeto/{test_projeto.id}",
+        params={"assignment": "optimal"},
+    )
+    assert response.status_code == 200
+
+    # The first vaga gives up its best person so the second gets a match
+    esperado = {vagas[0].id: parcial.id, vagas[1].id: completa.id}
+    assert {
+        int(vaga_id): pessoa["id"]
+        for vaga_id, pessoa in response.json().items()
+    } == esperado
+
+    for vaga in vagas:
+        test_db.refresh(vaga)
+        assert vaga.pessoa_id == esperado[vaga.id]
+        assert vaga.situacao == "PENDENTE_IDEALIZADOR"
+
+
+def test_similaridade_projeto_invalid_assignment(
+    client, test_projeto, fake_login_superuser
+):
+    response = client.get(
+        f"/api/v1/pessoa_projeto/similaridade_projeto/{test_projeto.id}",
+        params={"assignment": "random"},
+    )
+    assert response.status_code == 400
+
+
+def test_get_ids_pessoas_interessadas(test_db, test_projeto):
+    interessada, favorita, outro_projeto = [
+        _pessoa(test_db, usuario)
+        for usuario in ("interessada", "favorita", "outro_projeto")]
+    outro = models.Projeto(nome="Outro", descricao="Outro", objetivo="Outro")
+    test_db.add(outro)
+    test_db.commit()
+
+    test_db.add_all([
+        models.Reacoes(
+            pessoa_id=interessada.id, projeto_id=test_projeto.id,
+            reacao="INTERESSE"),
+        models.Reacoes(
+            pessoa_id=favorita.id, projeto_id=test_projeto.id,
+            reacao="FAVORITO"),
+        models.Reacoes(
+            pessoa_id=outro_projeto.id, projeto_id=outro.id,
+            reacao="INTERESSE"),
+    ])
+    test_db.commit()
+
+    assert get_ids_pessoas_interessadas(test_db, test_projeto.id) == \
+        {interessada.id}
+    assert get_ids_pessoas_interessadas(
+        test_db, test_projeto.id, [favorita.id, outro_projeto.id]) == set()
+    assert get_ids_pessoas_interessadas(test_db, test_projeto.id, []) == set()
+
+
+def test_similaridade_projeto_interest_in_one_query(
+    client, test_db, test_papeis, test_projeto, test_habilidade,
+    query_budget, fake_login_superuser
+):
+    candidatas = [
+        _pessoa(test_db, f"candidata{i}", [test_habilidade]) for i in range(6)]
+    interessada = candidatas[3]
+    test_db.add(models.Reacoes(
+        pessoa_id=interessada.id, projeto_id=test_projeto.id,
+        reacao="INTERESSE"))
+
+    vaga = models.PessoaProjeto(
+        projeto_id=test_projeto.id, papel_id=COLABORADOR, remunerado=False)
+    vaga.habilidades = [test_habilidade]
+    test_db.add(vaga)
+    test_db.commit()
+    estatisticas_tags.invalida()
+    url = f"/api/v1/pessoa_projeto/similaridade_projeto/{test_projeto.id}"
+    esperado = {str(vaga.id): interessada.id}
+
+    with query_budget(100) as statements:
+        response = client.get(url)
+
+    # The bonus breaks the tie between equally matching people
+    assert response.status_code == 200
+    assert {
+        vaga_id: pessoa["id"] for vaga_id, pessoa in response.json().items()
+    } == esperado
+    assert len([s for s in statements if "FROM tb_reacoes" in s]) == 1
+
+
+def test_similaridade_vaga_queries_do_not_grow_with_candidates(
+    client, test_db, test_papeis, test_projeto, test_habilidade, test_area,
+    query_budget, fake_login_superuser
+):
+    consultas = []
+    for quantidade in (2, 10):
+        for i in range(quantidade):
+            _pessoa(
+                test_db, f"candidata{quantidade}_{i}",
+                [test_habilidade], [test_area] if i % 2 else [])
+
+        vaga = models.PessoaProjeto(
+            projeto_id=test_projeto.id, papel_id=COLABORADOR,
+            remunerado=False)
+        vaga.habilidades = [test_habilidade]
+        vaga.areas = [test_area]
+        test_db.add(vaga)
+        test_db.commit()
+        estatisticas_tags.invalida()
+        estatisticas_tags.garante_atualizado(test_db)
+        url = f"/api/v1/pessoa_projeto/similaridade_vaga/{vaga.id}"
+
+        with query_budget(100) as statements:
+            response = client.get(url)
+        assert response.status_code == 200
+        consultas.append(len(statements))
+
+    # Candidates are scored in one aggregate query, however many there are
+    assert consultas[0] == consultas[1]
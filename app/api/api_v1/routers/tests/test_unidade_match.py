@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+
+from db import models
+from db.ignorados.crud import add_pessoa_ignorada
+from db.pessoa_projeto.crud import edit_pessoa_projeto, get_similaridade_vaga
+from db.pessoa_projeto.schemas import PessoaProjetoEdit
+from db.projeto.crud import edit_finalizado_projeto
+from db.utils.unidade_match import UnidadeMatch
+
+COLABORADOR = 2
+
+
+def _pessoa(test_db, usuario, habilidades=()):
+    pessoa = models.Pessoa(
+        usuario=usuario,
+        nome=usuario,
+        email=f"{usuario}@email.com",
+        senha="senha",
+        colaborador=True,
+    )
+    pessoa.habilidades = list(habilidades)
+    test_db.add(pessoa)
+    test_db.commit()
+    return pessoa
+
+
+def _projeto_finalizado(test_db, nome, habilidades=(), vagas=2):
+    projeto = models.Projeto(
+        nome=nome, descricao="Projeto", objetivo="Testar", finalizado=True)
+    test_db.add(projeto)
+    test_db.commit()
+
+    criadas = []
+    for _ in range(vagas):
+        vaga = models.PessoaProjeto(
+            projeto_id=projeto.id,
+            papel_id=COLABORADOR,
+            remunerado=False,
+            situacao="CRIADO",
+        )
+        vaga.habilidades = list(habilidades)
+        test_db.add(vaga)
+        criadas.append(vaga)
+    test_db.commit()
+
+    return projeto, criadas
+
+
+def _estado(test_db, projeto, vagas):
+    test_db.expire_all()
+    posicoes = {vaga.id: i for i, vaga in enumerate(vagas)}
+    ignoradas = test_db.query(
+        models.PessoaIgnoradaVaga.pessoa_projeto_id,
+        models.PessoaIgnoradaVaga.pessoa_id,
+    ).filter(models.PessoaIgnoradaVaga.pessoa_projeto_id.in_(posicoes))
+
+    return (
+        test_db.query(models.Projeto).get(projeto.id).finalizado,
+        [(vaga.situacao, vaga.pessoa_id) for vaga in vagas],
+        sorted((posicoes[vaga_id], pessoa_id) for vaga_id, pessoa_id in ignoradas),
+    )
+
+
+def test_unidade_match_matches_per_vaga_writes(test_db, test_papeis):
+    pessoas = [_pessoa(test_db, f"pessoa{i}") for i in range(2)]
+
+    anterior, vagas_anterior = _projeto_finalizado(test_db, "Anterior")
+    unidade, vagas_unidade = _projeto_finalizado(test_db, "Unidade")
+
+    # The first person was already ignored for the first vaga
+    for vagas in (vagas_anterior, vagas_unidade):
+        test_db.add(models.PessoaIgnoradaVaga(
+            pessoa_projeto_id=vagas[0].id, pessoa_id=pessoas[0].id))
+    test_db.commit()
+
+    async def por_vaga():
+        for vaga, pessoa in zip(vagas_anterior, pessoas):
+            await edit_pessoa_projeto(
+                test_db,
+                vaga.id,
+                PessoaProjetoEdit(
+                    situacao="PENDENTE_IDEALIZADOR", pessoa_id=pessoa.id),
+                pessoa.id,
+            )
+            add_pessoa_ignorada(test_db, pessoa.id, vaga.id)
+        await edit_finalizado_projeto(test_db, anterior.id, False)
+
+    asyncio.run(por_vaga())
+
+    match = UnidadeMatch(test_db, unidade.id)
+    for vaga, pessoa in zip(vagas_unidade, pessoas):
+        match.seleciona(vaga, pessoa.id)
+    assert match.pessoas() == {pessoa.id: pessoa for pessoa in pessoas}
+    match.aplica()
+
+    esperado = (
+        False,
+        [("PENDENTE_IDEALIZADOR", pessoa.id) for pessoa in pessoas],
+        [(0, pessoas[0].id), (1, pessoas[1].id)],
+    )
+    assert _estado(test_db, anterior, vagas_anterior) == esperado
+    assert _estado(test_db, unidade, vagas_unidade) == esperado
+
+
+@pytest.mark.parametrize("com_habilidade", [False, True])
+def test_similaridade_vaga_not_found_keeps_projeto(
+    client, test_db, test_papeis, test_habilidade, fake_login_superuser,
+    com_habilidade
+):
+    # Without tags, or with tags nobody has, nothing is written
+    habilidades = [test_habilidade] if com_habilidade else []
+    projeto, vagas = _projeto_finalizado(
+        test_db, "Sem candidatos", habilidades, vagas=1)
+    antes = _estado(test_db, projeto, vagas)
+
+    response = client.get(
+        f"/api/v1/pessoa_projeto/similaridade_vaga/{vagas[0].id}")
+    assert response.status_code == 404
+    assert _estado(test_db, projeto, vagas) == antes
+    assert antes[0] is True
+
+
+def test_similaridade_projeto_not_found_keeps_projeto(
+    client, test_db, test_papeis, test_habilidade, fake_login_superuser
+):
+    projeto, vagas = _projeto_finalizado(
+        test_db, "Sem candidatos", [test_habilidade])
+    antes = _estado(test_db, projeto, vagas)
+
+    response = client.get(
+        f"/api/v1/pessoa_projeto/similaridade_projeto/{projeto.id}")
+    assert response.status_code == 404
+    assert _estado(test_db, projeto, vagas) == antes
+
+
+def test_similaridade_vaga_filled_reopens_projeto(test_db, test_papeis):
+    pessoa = _pessoa(test_db, "aceita")
+    projeto, vagas = _projeto_finalizado(test_db, "Preenchido", vagas=1)
+    vagas[0].situacao = "ACEITO"
+    vagas[0].pessoa_id = pessoa.id
+    test_db.commit()
+
+    # As before, asking for a filled vaga only reopens the projeto
+    assert asyncio.run(get_similaridade_vaga(test_db, vagas[0].id)) == {}
+    assert _estado(test_db, projeto, vagas) == (
+        False, [("ACEITO", pessoa.id)], [])
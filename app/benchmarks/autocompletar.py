@@ -0,0 +1,99 @@
+'''
+    Benchmark do índice de prefixos do autocompletar
+    (db/utils/autocompletar.py) contra a varredura de todos os nomes
+
+    Monta o índice com N tags sintéticas e mede, para prefixos de uma a
+    algumas letras, a latência mediana e o p99 da busca (sem o cache de
+    prefixos, como no primeiro acesso) e da comparação com cada nome. Não
+    usa banco.
+
+    Uso (a partir da pasta app):
+        PYTHONPATH=.. python -m benchmarks.autocompletar [quantidades...]
+'''
+
+import random
+import sys
+import time
+
+import numpy as np
+
+from db.utils.autocompletar import IndicePrefixos, _chaves, chave
+
+QUANTIDADES = [1000, 10000]
+REPETICOES = 50
+LIMITE = 10
+
+PALAVRAS = [
+    "Gestão", "de", "Projetos", "Programação", "Python", "Design",
+    "Gráfico", "Análise", "Dados", "Educação", "Saúde", "Engenharia",
+    "Civil", "Elétrica", "Marketing", "Digital", "Música", "Economia",
+]
+PREFIXOS = ["p", "pro", "anal", "engenharia e", "gestao de p"]
+
+
+def tags(quantidade):
+    gerador = random.Random(1)
+    return [
+        (
+            id,
+            " ".join(gerador.sample(PALAVRAS, gerador.randint(1, 3)))
+            + f" {id}",
+            gerador.randint(0, 500),
+        )
+        for id in range(quantidade)
+    ]
+
+
+def varredura(linhas, prefixo):
+    # nomes já normalizados; só a comparação com cada um fica na medida
+    procurado = chave(prefixo)
+    encontrados = [
+        (id, nome, uso, chaves[0])
+        for id, nome, uso, chaves in linhas
+        if any(chave_nome.startswith(procurado) for chave_nome in chaves)
+    ]
+    encontrados.sort(key=lambda item: (-item[2], item[3], item[0]))
+    return [(id, nome, uso) for id, nome, uso, _ in encontrados[:LIMITE]]
+
+
+def mede(funcao):
+    tempos, resultado = [], None
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(1e6 * (time.perf_counter() - inicio))
+    return np.percentile(tempos, 50), np.percentile(tempos, 99), resultado
+
+
+def main():
+    quantidades = [int(q) for q in sys.argv[1:]] or QUANTIDADES
+
+    print(f"{'tags':>7}  {'prefixo':<14}{'índice p50 µs':>14}{'p99':>8}"
+          f"{'varredura p50 µs':>18}{'p99':>9}  mesmo resultado")
+    for quantidade in quantidades:
+        linhas = tags(quantidade)
+        indice = IndicePrefixos(None, "nome", [])
+        indice.carrega(linhas)
+        normalizadas = [
+            (id, nome, uso, _chaves(nome)) for id, nome, uso in linhas
+        ]
+
+        for prefixo in PREFIXOS:
+            def busca():
+                indice._cache = {}
+                return indice.busca(prefixo, LIMITE)
+
+            indice_p50, indice_p99, resultado = mede(busca)
+            varredura_p50, varredura_p99, completo = mede(
+                lambda: varredura(normalizadas, prefixo))
+
+            print(
+                f"{quantidade:>7}  {prefixo:<14}{indice_p50:>14.1f}"
+                f"{indice_p99:>8.1f}{varredura_p50:>18.1f}"
+                f"{varredura_p99:>9.1f}  "
+                f"{'sim' if resultado == completo else 'não'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+'''
+    Benchmark do índice de trigramas em memória da busca aproximada
+    (db/utils/busca_aproximada.py) contra a comparação de Jaro-Winkler com
+    todos os nomes
+
+    Monta o índice com N nomes sintéticos de pessoas e mede, para consultas
+    com erros de digitação e sem acentos, a latência mediana e o p99 das
+    duas buscas, quantos resultados o índice trouxe e se o primeiro
+    resultado é o mesmo. Não usa banco.
+
+    Uso (a partir da pasta app):
+        PYTHONPATH=.. python -m benchmarks.busca_aproximada [quantidades...]
+'''
+
+import random
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.busca_textual import NOMES, SOBRENOMES
+from db.utils.busca_aproximada import (
+    LIMIAR_JARO_WINKLER,
+    IndiceNgramas,
+    jaro_winkler,
+    palavras,
+)
+
+QUANTIDADES = [10000, 100000]
+REPETICOES = 20
+LIMIAR = 0.4
+ORCAMENTO_MS = 250
+
+CONSULTAS = [
+    "Joao Silva",
+    "Gabriella Olivera",
+    "henrique carvallho",
+    "Natalia Conceicao",
+    "Otavio Araujo Ribiero",
+]
+
+
+def nomes(quantidade):
+    gerador = random.Random(1)
+    return [
+        f"{gerador.choice(NOMES)} {gerador.choice(SOBRENOMES)} "
+        f"{gerador.choice(SOBRENOMES)}"
+        for _ in range(quantidade)
+    ]
+
+
+def varredura(lista_palavras, consulta):
+    termos = palavras(consulta)
+    pontuados = [
+        (id, similaridade)
+        for id, similaridade in (
+            (id, jaro_winkler(termos, texto))
+            for id, texto in enumerate(lista_palavras)
+        )
+        if similaridade >= LIMIAR_JARO_WINKLER
+    ]
+    pontuados.sort(key=lambda item: (-item[1], item[0]))
+    return pontuados
+
+
+def mede(funcao):
+    tempos, resultado = [], None
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(1000 * (time.perf_counter() - inicio))
+    return np.percentile(tempos, 50), np.percentile(tempos, 99), resultado
+
+
+def main():
+    quantidades = [int(q) for q in sys.argv[1:]] or QUANTIDADES
+
+    print(f"{'nomes':>8}  {'consulta':<24}{'índice p50':>11}{'p99':>8}"
+          f"{'varredura p50':>15}{'p99':>8}{'resultados':>12}  mesmo 1º")
+    for quantidade in quantidades:
+        lista = nomes(quantidade)
+        indice = IndiceNgramas()
+        indice.carrega(enumerate(lista))
+        lista_palavras = [palavras(nome) for nome in lista]
+
+        for consulta in CONSULTAS:
+            def busca():
+                prazo = time.monotonic() + ORCAMENTO_MS / 1000
+                return indice.busca(consulta, LIMIAR, prazo)
+
+            indice_p50, indice_p99, (resultado, estourou) = mede(busca)
+            varredura_p50, varredura_p99, completo = mede(
+                lambda: varredura(lista_palavras, consulta))
+
+            mesmo = bool(resultado and completo) and \
+                lista[resultado[0][0]] == lista[completo[0][0]]
+            print(
+                f"{quantidade:>8}  {consulta:<24}{indice_p50:>11.1f}"
+                f"{indice_p99:>8.1f}{varredura_p50:>15.1f}"
+                f"{varredura_p99:>8.1f}{len(resultado):>12}  "
+                f"{'sim' if mesmo else 'não'}"
+                f"{' (estourou)' if estourou else ''}"
+            )
+
+
+if __name__ == "__main__":
+    main()
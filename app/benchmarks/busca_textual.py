@@ -0,0 +1,192 @@
+'''
+    Benchmark da busca textual de pessoas e projetos (db/pesquisa/textual.py)
+    contra o ilike('%termo%') que ela substituiu
+
+    Popula o banco de DATABASE_URL (um Postgres vazio, com a extensão
+    unaccent disponível) com N pessoas e N projetos sintéticos, com áreas e
+    habilidades, e mede para cada consulta a latência mediana das duas
+    buscas e o plano usado pelo Postgres (varredura sequencial ou índice
+    GIN). Em outros bancos a busca textual roda em memória e serve apenas
+    de referência.
+
+    Uso (a partir da pasta app):
+        PYTHONPATH=.. python -m benchmarks.busca_textual [quantidade]
+'''
+
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import func, text
+
+from db import models
+from db.pesquisa import textual
+from db.utils import busca_textual
+from db.session import Base, SessionLocal, engine
+
+QUANTIDADE = 100000
+REPETICOES = 5
+LOTE = 5000
+
+NOMES = [
+    "Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela",
+    "Henrique", "Isabela", "João", "Larissa", "Marcos", "Natália", "Otávio",
+    "Paula", "Rafael", "Sofia", "Thiago", "Vitória", "Lucas",
+]
+SOBRENOMES = [
+    "Silva", "Souza", "Oliveira", "Santos", "Pereira", "Lima", "Carvalho",
+    "Ferreira", "Rodrigues", "Almeida", "Costa", "Gomes", "Martins",
+    "Araújo", "Barbosa", "Ribeiro", "Conceição", "Fernandes",
+]
+PALAVRAS = [
+    "aplicativo", "plataforma", "educação", "saúde", "comunidade", "dados",
+    "inteligência", "artificial", "sustentável", "energia", "agricultura",
+    "programação", "ensino", "mobilidade", "urbana", "acessibilidade",
+    "cultura", "música", "esporte", "finanças", "pessoais", "reciclagem",
+    "voluntariado", "marketplace", "jogos", "robótica", "biblioteca",
+]
+AREAS = [
+    "Tecnologia", "Educação", "Saúde", "Meio Ambiente", "Finanças",
+    "Cultura", "Esportes", "Design", "Marketing", "Engenharia",
+]
+HABILIDADES = [
+    "Python", "JavaScript", "React", "Django", "Figma", "SQL", "Docker",
+    "Liderança", "Comunicação", "Gestão de projetos", "Redação", "Excel",
+]
+
+CONSULTAS = [
+    ("pessoa por nome", models.Pessoa, "nome", "A", "joão"),
+    ("pessoa por nome", models.Pessoa, "nome", "A", "silva santos"),
+    ("projeto por nome", models.Projeto, "nome", "A", "educação"),
+    ("projeto por nome", models.Projeto, "nome", "A", "plataforma dados"),
+    ("projeto por objetivo", models.Projeto, "objetivo", "B", "sustentável"),
+    ("projeto (rara)", models.Projeto, "nome", "A", "robótica biblioteca"),
+]
+
+
+def frase(gerador, minimo, maximo):
+    return " ".join(gerador.sample(PALAVRAS, gerador.randint(minimo, maximo)))
+
+
+def popula(db, quantidade):
+    if db.query(models.Pessoa).count() >= quantidade:
+        return
+
+    gerador = random.Random(1)
+    areas = [models.Area(descricao=descricao) for descricao in AREAS]
+    habilidades = [models.Habilidades(nome=nome) for nome in HABILIDADES]
+    db.add_all(areas + habilidades)
+    db.commit()
+
+    for inicio in range(0, quantidade, LOTE):
+        fim = min(inicio + LOTE, quantidade)
+        db.execute(models.Pessoa.__table__.insert(), [
+            {
+                "email": f"pessoa{i}@conectar",
+                "senha": "x",
+                "usuario": f"pessoa{i}",
+                "nome": f"{gerador.choice(NOMES)} "
+                        f"{gerador.choice(SOBRENOMES)} "
+                        f"{gerador.choice(SOBRENOMES)}",
+            }
+            for i in range(inicio, fim)
+        ])
+        db.execute(models.Projeto.__table__.insert(), [
+            {
+                "nome": frase(gerador, 2, 4).capitalize(),
+                "objetivo": frase(gerador, 3, 6),
+                "descricao": frase(gerador, 8, 15),
+                "visibilidade": True,
+            }
+            for _ in range(inicio, fim)
+        ])
+        db.commit()
+
+    pessoas = [id for id, in db.query(models.Pessoa.id)]
+    projetos = [id for id, in db.query(models.Projeto.id)]
+    for tabela, ids, coluna in (
+        (models.PessoaArea, pessoas, "pessoa_id"),
+        (models.ProjetoArea, projetos, "projeto_id"),
+    ):
+        db.execute(tabela.insert(), [
+            {coluna: id, "area_id": area.id}
+            for id in ids for area in gerador.sample(areas, 2)
+        ])
+    for tabela, ids, coluna in (
+        (models.HabilidadesPessoa, pessoas, "pessoa_id"),
+        (models.HabilidadesProjeto, projetos, "projeto_id"),
+    ):
+        db.execute(tabela.insert(), [
+            {coluna: id, "habilidade_id": habilidade.id}
+            for id in ids for habilidade in gerador.sample(habilidades, 2)
+        ])
+    db.commit()
+
+    if engine.dialect.name == "postgresql":
+        db.execute(text("ANALYZE tb_pessoa"))
+        db.execute(text("ANALYZE tb_projeto"))
+        db.commit()
+
+
+def mediana_ms(funcao):
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return 1000 * statistics.median(tempos), len(resultado)
+
+
+def plano(db, consulta):
+    if engine.dialect.name != "postgresql":
+        return "-"
+    sql = str(consulta.statement.compile(
+        dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    linhas = [linha for linha, in db.execute(text(f"EXPLAIN {sql}"))]
+    for linha in linhas:
+        if "Scan" in linha:
+            return linha.strip().split("  ")[0].replace("->", "").strip()
+    return linhas[0]
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else QUANTIDADE
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    inicio = time.perf_counter()
+    popula(db, quantidade)
+    print(f"banco: {engine.dialect.name}, {quantidade} pessoas e "
+          f"{quantidade} projetos (carga em "
+          f"{time.perf_counter() - inicio:.0f} s)\n")
+
+    print(f"{'consulta':<22}{'termo':<22}{'ilike ms':>10}{'linhas':>8}"
+          f"{'textual ms':>12}{'linhas':>8}  plano ilike / textual")
+    for nome, modelo, campo, pesos, termo in CONSULTAS:
+        # o ilike antigo, com a primeira palavra (como era digitado)
+        antiga = db.query(modelo).filter(
+            getattr(modelo, campo).ilike(f"%{termo.split()[0]}%"))
+        ilike_ms, ilike_linhas = mediana_ms(antiga.all)
+        textual_ms, textual_linhas = mediana_ms(
+            lambda: textual.busca(db.query(modelo), modelo, termo, pesos))
+
+        plano_textual = "-"
+        if engine.dialect.name == "postgresql":
+            tsquery = func.to_tsquery(
+                busca_textual.CONFIGURACAO, busca_textual.tsquery(termo, pesos))
+            plano_textual = plano(
+                db, db.query(modelo.id).filter(modelo.busca.op("@@")(tsquery)))
+
+        print(f"{nome:<22}{termo:<22}{ilike_ms:>10.1f}{ilike_linhas:>8}"
+              f"{textual_ms:>12.1f}{textual_linhas:>8}  "
+              f"{plano(db, antiga.with_entities(modelo.id))} / {plano_textual}")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
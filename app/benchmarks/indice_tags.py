@@ -0,0 +1,162 @@
+'''
+    Benchmark do índice invertido de habilidades/áreas (db/utils/indice_tags)
+
+    Gera pessoas sintéticas (popularidade das tags segue uma distribuição de
+    Zipf), monta o índice e mede o tempo de construção, a memória ocupada
+    pelas listas e a latência de pontuar uma vaga com 3 habilidades e 1 área
+    com pontua_candidatos_indice (pesos, hierarquia de áreas, bônus de
+    interesse e desempate sorteado inclusos). O índice e as estatísticas
+    globais são carregados com os dados sintéticos, sem expirar, e as
+    reações são lidas de um SQLite em memória, vazio. Para as bases menores também mede a varredura antiga (lista em lista por
+    pessoa), como referência.
+
+    Uso (a partir da pasta app):
+        PYTHONPATH=.. python -m benchmarks.indice_tags [quantidades...]
+'''
+
+import os
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from db import models
+from db.utils.indice_tags import HABILIDADE, AREA, PAPEIS, indice_tags
+from db.utils.pesos_tags import estatisticas_tags
+from db.utils.similaridade import pontua_candidatos_indice
+
+QUANTIDADES = [1000, 10000, 50000, 100000, 250000, 500000]
+HABILIDADES = 800
+AREAS = 120
+CONSULTAS = 200
+LIMITE_VARREDURA = 50000
+
+
+def gera_pessoas(quantidade, gerador):
+    pesos_habilidades = 1 / np.arange(1, HABILIDADES + 1)
+    pesos_habilidades /= pesos_habilidades.sum()
+    pesos_areas = 1 / np.arange(1, AREAS + 1)
+    pesos_areas /= pesos_areas.sum()
+
+    pessoas = []
+    for pessoa_id in range(1, quantidade + 1):
+        habilidades = set(gerador.choice(
+            HABILIDADES, gerador.integers(1, 9), p=pesos_habilidades).tolist())
+        areas = set(gerador.choice(
+            AREAS, gerador.integers(0, 4), p=pesos_areas).tolist())
+        papeis = [papel for papel in PAPEIS if gerador.random() < 0.5]
+        pessoas.append((pessoa_id, papeis, habilidades, areas))
+    return pessoas
+
+
+def linhas(pessoas):
+    for pessoa_id, papeis, habilidades, areas in pessoas:
+        for habilidade in habilidades:
+            yield pessoa_id, HABILIDADE, habilidade, papeis
+        for area in areas:
+            yield pessoa_id, AREA, area, papeis
+
+
+def carrega_estatisticas(pessoas):
+    frequencias = {}
+    for _, _, habilidades, areas in pessoas:
+        for habilidade in habilidades:
+            chave = (HABILIDADE, habilidade)
+            frequencias[chave] = frequencias.get(chave, 0) + 1
+        for area in areas:
+            frequencias[(AREA, area)] = frequencias.get((AREA, area), 0) + 1
+
+    total = sum(1 for _, _, habilidades, areas in pessoas if habilidades or areas)
+    estatisticas_tags.carrega(
+        frequencias, total, [(area, None) for area in range(AREAS)])
+
+
+def sessao_reacoes():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    models.Reacoes.__table__.create(engine)
+    return sessionmaker(bind=engine)()
+
+
+def gera_vaga(habilidades, areas):
+    vaga = models.PessoaProjeto(projeto_id=1, papel_id=2)
+    vaga.habilidades = [models.Habilidades(id=h) for h in habilidades]
+    vaga.areas = [models.Area(id=a) for a in areas]
+    return vaga
+
+
+def pontua_indice(db, vaga):
+    return pontua_candidatos_indice(db, vaga, [], 10)
+
+
+def pontua_varredura(pessoas, vaga):
+    habilidades, areas = vaga
+    caracteristicas_vaga = [("h", h) for h in habilidades] + \
+        [("a", a) for a in areas]
+    similaridades = []
+    for pessoa_id, papeis, habilidades_pessoa, areas_pessoa in pessoas:
+        if "colaborador" not in papeis:
+            continue
+        caracteristicas = [("h", h) for h in sorted(habilidades_pessoa)] + \
+            [("a", a) for a in sorted(areas_pessoa)]
+        similaridades.append((
+            len([c for c in caracteristicas_vaga if c in caracteristicas]),
+            pessoa_id
+        ))
+    similaridades.sort(reverse=True)
+    return similaridades[:10]
+
+
+def percentis(tempos):
+    tempos = np.array(tempos) * 1000
+    return np.percentile(tempos, 50), np.percentile(tempos, 95)
+
+
+def main(quantidades):
+    gerador = np.random.default_rng(42)
+    db = sessao_reacoes()
+    indice_tags.ttl = estatisticas_tags.ttl = 0
+    print(f"{'pessoas':>8} {'construção (s)':>15} {'memória (MiB)':>14} "
+          f"{'índice p50/p95 (ms)':>20} {'varredura p50 (ms)':>19}")
+
+    for quantidade in quantidades:
+        pessoas = gera_pessoas(quantidade, gerador)
+        vagas = [
+            (gerador.choice(HABILIDADES, 3, replace=False).tolist(),
+             gerador.choice(AREAS, 1).tolist())
+            for _ in range(CONSULTAS)
+        ]
+
+        inicio = time.perf_counter()
+        indice_tags.carrega(linhas(pessoas))
+        construcao = time.perf_counter() - inicio
+        carrega_estatisticas(pessoas)
+
+        tempos = []
+        for vaga in vagas:
+            vaga = gera_vaga(*vaga)
+            inicio = time.perf_counter()
+            pontua_indice(db, vaga)
+            tempos.append(time.perf_counter() - inicio)
+        p50, p95 = percentis(tempos)
+
+        varredura = "-"
+        if quantidade <= LIMITE_VARREDURA:
+            tempos = []
+            for vaga in vagas[:5]:
+                inicio = time.perf_counter()
+                pontua_varredura(pessoas, vaga)
+                tempos.append(time.perf_counter() - inicio)
+            varredura = f"{percentis(tempos)[0]:.1f}"
+
+        print(f"{quantidade:>8} {construcao:>15.2f} "
+              f"{indice_tags.tamanho_bytes() / 2 ** 20:>14.2f} "
+              f"{p50:>9.2f} / {p95:<8.2f} {varredura:>19}")
+
+
+if __name__ == "__main__":
+    main([int(q) for q in sys.argv[1:]] or QUANTIDADES)
@@ -0,0 +1,137 @@
+'''
+    Benchmark da similaridade ponderada (db/utils/pesos_tags)
+
+    Gera pessoas sintéticas como no benchmark do índice de tags, com uma
+    hierarquia de áreas, e compara a contagem simples de tags com a
+    similaridade ponderada (IDF + hierarquia de áreas) em:
+
+    - latência de pontuar uma vaga com 3 habilidades e 1 área (p50/p95);
+    - estabilidade do ranking: como os empates são sorteados, a mesma vaga
+      pontuada várias vezes pode devolver outro top 10. Mede a interseção
+      média (Jaccard) entre os top 10 de execuções repetidas e quantas
+      pessoas empatam na nota de corte do top 10.
+
+    Uso (a partir da pasta app):
+        PYTHONPATH=.. python -m benchmarks.pesos_tags [quantidades...]
+'''
+
+import os
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from core import config
+from db.utils.indice_tags import IndiceTags, HABILIDADE, AREA
+from db.utils.pesos_tags import EstatisticasTags, pontua_coincidencias
+from benchmarks.indice_tags import AREAS, HABILIDADES, gera_pessoas, linhas
+
+QUANTIDADES = [1000, 10000, 100000]
+VAGAS = 100
+REPETICOES = 20
+TOPO = 10
+# áreas a partir desta são subáreas de uma das anteriores
+AREAS_RAIZ = 20
+
+
+def gera_estatisticas(pessoas):
+    frequencias = {}
+    for _, _, habilidades, areas in pessoas:
+        for habilidade in habilidades:
+            chave = (HABILIDADE, habilidade)
+            frequencias[chave] = frequencias.get(chave, 0) + 1
+        for area in areas:
+            frequencias[(AREA, area)] = frequencias.get((AREA, area), 0) + 1
+
+    total = sum(1 for _, _, habilidades, areas in pessoas if habilidades or areas)
+    hierarquia = [
+        (area, None if area < AREAS_RAIZ else area % AREAS_RAIZ)
+        for area in range(AREAS)
+    ]
+
+    estatisticas = EstatisticasTags()
+    estatisticas.carrega(frequencias, total, hierarquia)
+    return estatisticas
+
+
+def gera_vagas(gerador):
+    pesos_habilidades = 1 / np.arange(1, HABILIDADES + 1)
+    pesos_habilidades /= pesos_habilidades.sum()
+    pesos_areas = 1 / np.arange(1, AREAS + 1)
+    pesos_areas /= pesos_areas.sum()
+
+    return [
+        [(HABILIDADE, int(habilidade)) for habilidade in gerador.choice(
+            HABILIDADES, 3, replace=False, p=pesos_habilidades)] +
+        [(AREA, int(gerador.choice(AREAS, p=pesos_areas)))]
+        for _ in range(VAGAS)
+    ]
+
+
+def ranking(indice, estatisticas, tags):
+    coincidencias = {
+        chave: indice.lista("colaborador", *chave)
+        for chave in estatisticas.expande(tags)
+    }
+    pessoas, similaridades = pontua_coincidencias(
+        coincidencias, tags, estatisticas)
+    ordem = np.lexsort((np.random.random(len(pessoas)), -similaridades))
+    return pessoas, similaridades, ordem[:TOPO]
+
+
+def mede(indice, estatisticas, vagas):
+    tempos, jaccards, empates = [], [], []
+
+    for tags in vagas:
+        inicio = time.perf_counter()
+        pessoas, similaridades, topo = ranking(indice, estatisticas, tags)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+        if not len(topo):
+            continue
+
+        corte = similaridades[topo[-1]]
+        empates.append(int(np.isclose(similaridades, corte).sum()))
+
+        referencia = set(pessoas[topo].tolist())
+        for _ in range(REPETICOES):
+            pessoas, _, topo = ranking(indice, estatisticas, tags)
+            atual = set(pessoas[topo].tolist())
+            jaccards.append(len(referencia & atual) / len(referencia | atual))
+
+    return (
+        np.percentile(tempos, 50),
+        np.percentile(tempos, 95),
+        np.mean(jaccards),
+        np.median(empates),
+    )
+
+
+def main(quantidades):
+    gerador = np.random.default_rng(42)
+    vagas = gera_vagas(gerador)
+
+    print(f"{'pessoas':>8} {'modo':>10} | {'p50 ms':>7} {'p95 ms':>7}"
+          f" | {'jaccard top10':>13} {'empates no corte':>16}")
+
+    for quantidade in quantidades:
+        pessoas = gera_pessoas(quantidade, gerador)
+        indice = IndiceTags()
+        indice.carrega(linhas(pessoas))
+        estatisticas = gera_estatisticas(pessoas)
+
+        for modo, ponderada, desconto in (
+            ("contagem", False, 0.0),
+            ("ponderada", True, 0.5),
+        ):
+            config.SIMILARIDADE_PONDERADA = ponderada
+            config.DESCONTO_HIERARQUIA_AREAS = desconto
+            p50, p95, jaccard, empates = mede(indice, estatisticas, vagas)
+            print(f"{quantidade:>8} {modo:>10} | {p50:>7.2f} {p95:>7.2f}"
+                  f" | {jaccard:>13.3f} {empates:>16.0f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or QUANTIDADES)
@@ -0,0 +1,267 @@
+'''
+    Benchmark da pressão no pool de conexões por requisição
+
+    Compara o ciclo de sessões antigo (middleware abrindo uma sessão para
+    toda requisição e cada cópia de db.session / app.db.session abrindo a
+    sua no get_db) com a sessão única criada sob demanda (db/session.py).
+
+    Cada rota de leitura depende de uma autenticação que consulta a pessoa
+    e faz a própria consulta, como as rotas de /api/v1; as de arquivos
+    estáticos e de saúde não usam o banco. As requisições são disparadas
+    em lotes concorrentes direto no app ASGI, e para cada ciclo são
+    contadas as sessões criadas, os checkouts do pool e o maior número de
+    conexões em uso ao mesmo tempo.
+
+    Uso (a partir da pasta app):
+        PYTHONPATH=.. python -m benchmarks.sessoes [requisicoes] [concorrencia]
+'''
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi import Depends, FastAPI
+from fastapi.staticfiles import StaticFiles
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from starlette.requests import Request
+
+from db import session
+
+REQUISICOES = 400
+CONCORRENCIA = 16
+# tempo que a rota segura a conexão, simulando o resto do trabalho
+TRABALHO = 0.005
+
+
+class Contador:
+
+    def __init__(self):
+        self.sessoes = 0
+        self.checkouts = 0
+        self.em_uso = 0
+        self.maior_em_uso = 0
+        self._trava = threading.Lock()
+
+    def sessao(self):
+        with self._trava:
+            self.sessoes += 1
+
+    def checkout(self, *args):
+        with self._trava:
+            self.checkouts += 1
+            self.em_uso += 1
+            self.maior_em_uso = max(self.maior_em_uso, self.em_uso)
+
+    def checkin(self, *args):
+        with self._trava:
+            self.em_uso -= 1
+
+
+def cria_fabrica(contador):
+    # arquivo em vez de memória para que as threads tenham conexões
+    # próprias; o QueuePool é o mesmo do Postgres em produção
+    arquivo = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+    engine = create_engine(
+        f"sqlite:///{arquivo}", poolclass=QueuePool,
+        pool_size=5, max_overflow=60, pool_timeout=30,
+        connect_args={"check_same_thread": False})
+    event.listen(engine, "checkout", contador.checkout)
+    event.listen(engine, "checkin", contador.checkin)
+
+    fabrica = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def nova_sessao():
+        contador.sessao()
+        return fabrica()
+
+    return nova_sessao, arquivo
+
+
+def consulta(db):
+    db.execute(text("SELECT 1")).scalar()
+    time.sleep(TRABALHO)
+
+
+def app_antes(nova_sessao, estaticos):
+
+    '''
+        Ciclo antigo: o middleware abre uma sessão que ninguém usa, e a
+        autenticação e a rota recebem sessões diferentes por importarem
+        get_db de cópias diferentes do módulo
+    '''
+
+    app = FastAPI()
+
+    def get_db_rota():
+        db = nova_sessao()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def get_db_auth():
+        db = nova_sessao()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def autenticacao(db=Depends(get_db_auth)):
+        consulta(db)
+
+    @app.middleware("http")
+    async def db_session_middleware(request: Request, call_next):
+        request.state.db = nova_sessao()
+        response = await call_next(request)
+        request.state.db.close()
+        return response
+
+    @app.get("/api/v1/pessoas/{pessoa_id}")
+    def pessoa(pessoa_id: int, db=Depends(get_db_rota),
+               _=Depends(autenticacao)):
+        consulta(db)
+        return {"id": pessoa_id}
+
+    @app.get("/api/health")
+    async def health():
+        return {"status": "ok"}
+
+    app.mount("/api/uploads", StaticFiles(directory=estaticos))
+    return app
+
+
+def app_depois(estaticos):
+
+    '''
+        Ciclo atual: get_db e fecha_sessao de db/session.py
+    '''
+
+    app = FastAPI()
+
+    async def autenticacao(db=Depends(session.get_db)):
+        consulta(db)
+
+    @app.middleware("http")
+    async def db_session_middleware(request: Request, call_next):
+        try:
+            return await call_next(request)
+        finally:
+            session.fecha_sessao(request)
+
+    @app.get("/api/v1/pessoas/{pessoa_id}")
+    def pessoa(pessoa_id: int, db=Depends(session.get_db),
+               _=Depends(autenticacao)):
+        consulta(db)
+        return {"id": pessoa_id}
+
+    @app.get("/api/health")
+    async def health():
+        return {"status": "ok"}
+
+    app.mount("/api/uploads", StaticFiles(directory=estaticos))
+    return app
+
+
+async def requisita(app, caminho):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": caminho,
+        "raw_path": caminho.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("localhost", 80),
+    }
+    status = None
+    recebido = False
+
+    async def receive():
+        # depois do corpo, só a desconexão (esperada pelas respostas)
+        nonlocal recebido
+        if recebido:
+            return {"type": "http.disconnect"}
+        recebido = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(mensagem):
+        nonlocal status
+        if mensagem["type"] == "http.response.start":
+            status = mensagem["status"]
+
+    await app(scope, receive, send)
+    assert status == 200, (caminho, status)
+
+
+async def carga(app, caminhos, concorrencia):
+    inicio = time.perf_counter()
+    for i in range(0, len(caminhos), concorrencia):
+        await asyncio.gather(*(
+            requisita(app, caminho)
+            for caminho in caminhos[i:i + concorrencia]
+        ))
+    return time.perf_counter() - inicio
+
+
+def mede(nome, cria_app, caminhos, concorrencia):
+    contador = Contador()
+    nova_sessao, arquivo = cria_fabrica(contador)
+    estaticos = tempfile.mkdtemp()
+    with open(os.path.join(estaticos, "foto.png"), "wb") as foto:
+        foto.write(b"\x89PNG")
+
+    anterior = session.SessionLocal
+    session.SessionLocal = nova_sessao
+    try:
+        app = cria_app(nova_sessao, estaticos)
+        duracao = asyncio.run(carga(app, caminhos, concorrencia))
+    finally:
+        session.SessionLocal = anterior
+        os.remove(arquivo)
+
+    print(
+        f"{nome:<8}{len(caminhos):>8}{contador.sessoes:>10}"
+        f"{contador.checkouts:>11}{contador.maior_em_uso:>13}"
+        f"{1000 * duracao / len(caminhos):>12.2f}"
+    )
+    return contador
+
+
+def main():
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else REQUISICOES
+    concorrencia = int(sys.argv[2]) if len(sys.argv) > 2 else CONCORRENCIA
+
+    ciclos = [
+        ("antes", app_antes),
+        ("depois", lambda nova_sessao, estaticos: app_depois(estaticos)),
+    ]
+    cargas = [
+        ("leitura", ["/api/v1/pessoas/1"] * requisicoes),
+        ("estático", ["/api/uploads/foto.png"] * requisicoes),
+        ("saúde", ["/api/health"] * requisicoes),
+    ]
+
+    print(f"concorrência: {concorrencia}, trabalho por consulta: "
+          f"{1000 * TRABALHO:.0f} ms\n")
+    for carga_nome, caminhos in cargas:
+        print(f"# {carga_nome}")
+        print(f"{'ciclo':<8}{'reqs':>8}{'sessões':>10}{'checkouts':>11}"
+              f"{'maior uso':>13}{'ms/req':>12}")
+        for nome, cria_app in ciclos:
+            mede(nome, cria_app, caminhos, concorrencia)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,11 @@
 from celery import Celery
 
-celery_app = Celery("worker", broker="redis://redis:6379/0")
+from core import config
+
+celery_app = Celery(
+    "worker", broker=config.REDIS_URL or "redis://redis:6379/0")
 
 celery_app.conf.task_routes = {"app.tasks.*": "main-queue"}
+# jobs de matchmaking rodando ao mesmo tempo em cada worker
+celery_app.conf.worker_concurrency = config.JOBS_MATCH_CONCORRENCIA
+celery_app.conf.worker_prefetch_multiplier = 1
@@ -10,3 +10,117 @@ PROJECT_NAME = "conectar"
 
 SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
 API_V1_STR = "/api/v1"
+
+# Pool de conexões (db/pool.py). Workers do gunicorn (o Procfile usa o
+# mesmo valor) e limite de conexões do Postgres (max_connections; 20 no
+# plano hobby do Heroku), do qual DB_CONEXOES_RESERVADAS ficam para o
+# worker do celery, migrações e psql. O restante é dividido entre os
+# workers; DB_POOL_SIZE e DB_MAX_OVERFLOW substituem o valor calculado.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 4))
+DB_MAX_CONEXOES = int(os.getenv("DB_MAX_CONEXOES", 20))
+DB_CONEXOES_RESERVADAS = int(os.getenv("DB_CONEXOES_RESERVADAS", 4))
+DB_POOL_SIZE = \
+    int(os.getenv("DB_POOL_SIZE")) if os.getenv("DB_POOL_SIZE") else None
+DB_MAX_OVERFLOW = \
+    int(os.getenv("DB_MAX_OVERFLOW")) if os.getenv("DB_MAX_OVERFLOW") else None
+# Segundos até uma conexão ociosa ser reaberta, e espera máxima por uma
+# conexão livre antes de falhar
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+# DATABASE_URL aponta para um PgBouncer em modo transaction (por exemplo o
+# buildpack do Heroku): a aplicação não guarda conexões (NullPool) e o
+# número de workers deixa de depender do limite do Postgres
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+
+# Busca aproximada (?aproximada=true) por nome de pessoas e projetos e por
+# área e habilidade (db/pesquisa/aproximada.py). Fração mínima dos
+# trigramas da consulta presentes no texto (word_similarity do pg_trgm),
+# tempo máximo de cada busca e, fora do Postgres, tempo (segundos) até o
+# índice de trigramas em memória ser reconstruído
+BUSCA_APROXIMADA_LIMIAR = float(os.getenv("BUSCA_APROXIMADA_LIMIAR", 0.4))
+BUSCA_APROXIMADA_ORCAMENTO_MS = \
+    int(os.getenv("BUSCA_APROXIMADA_ORCAMENTO_MS", 250))
+BUSCA_APROXIMADA_TTL = int(os.getenv("BUSCA_APROXIMADA_TTL", 300))
+
+# Tempo (segundos) até os índices do autocompletar de áreas e habilidades
+# (db/utils/autocompletar.py) serem reconstruídos, recontando os usos de
+# cada tag. Criações e edições feitas neste worker aparecem na hora; as de
+# outros workers, após a reconstrução. 0 desativa a expiração.
+AUTOCOMPLETAR_TTL = int(os.getenv("AUTOCOMPLETAR_TTL", 300))
+
+# Tempo (segundos) até a árvore de áreas servida por GET /areas
+# (db/utils/arvore_areas.py) ser remontada. Mudanças feitas neste worker
+# aparecem na hora; as de outros workers, após a remontagem. 0 desativa a
+# expiração.
+ARVORE_AREAS_TTL = int(os.getenv("ARVORE_AREAS_TTL", 300))
+
+# Tempo (segundos) até as cópias em memória das tabelas de referência
+# (db/utils/cache_referencias.py) serem relidas: áreas e habilidades, usadas
+# também para resolver as tags recebidas nas edições
+# (db/utils/resolucao_tags.py), papéis e tipos de acordo. 0 desativa a
+# expiração.
+CACHE_TAGS_TTL = int(os.getenv("CACHE_TAGS_TTL", 300))
+CACHE_PAPEL_TTL = int(os.getenv("CACHE_PAPEL_TTL", 3600))
+CACHE_TIPO_ACORDO_TTL = int(os.getenv("CACHE_TIPO_ACORDO_TTL", 3600))
+# Avisa os outros workers, pelo Redis de REDIS_URL, quando uma dessas
+# tabelas muda, para que descartem as suas cópias (e a árvore de áreas e os
+# índices do autocompletar) sem esperar o TTL
+CACHE_REFERENCIAS_REDIS = \
+    os.getenv("CACHE_REFERENCIAS_REDIS", "false").lower() == "true"
+
+# Índice invertido de habilidades/áreas usado no matchmaking
+INDICE_TAGS_ATIVO = os.getenv("INDICE_TAGS_ATIVO", "false").lower() == "true"
+# Tempo (segundos) até o índice ser reconstruído a partir do banco. Cada
+# worker mantém o próprio índice, então edições feitas em outro worker só
+# aparecem aqui após a reconstrução. 0 desativa a expiração.
+INDICE_TAGS_TTL = int(os.getenv("INDICE_TAGS_TTL", 300))
+
+# Ponderação da similaridade do matchmaking: com ela ativa, cada habilidade
+# ou área pesa conforme sua raridade (IDF), em vez de todas pesarem 1
+SIMILARIDADE_PONDERADA = \
+    os.getenv("SIMILARIDADE_PONDERADA", "true").lower() == "true"
+# Crédito, por nível, de uma área acima ou abaixo da área pedida na vaga.
+# 0 considera apenas a própria área.
+DESCONTO_HIERARQUIA_AREAS = float(os.getenv("DESCONTO_HIERARQUIA_AREAS", 0.5))
+# Acréscimo proporcional na similaridade de quem demonstrou interesse no
+# projeto
+BONUS_INTERESSE = float(os.getenv("BONUS_INTERESSE", 0.1))
+# Similaridade textual entre a descrição da vaga e as descrições das
+# experiências das pessoas (TF-IDF), somada à das tags com o peso abaixo
+SIMILARIDADE_TEXTO_ATIVA = \
+    os.getenv("SIMILARIDADE_TEXTO_ATIVA", "false").lower() == "true"
+PESO_SIMILARIDADE_TEXTO = float(os.getenv("PESO_SIMILARIDADE_TEXTO", 2.0))
+INDICE_TEXTO_TTL = int(os.getenv("INDICE_TEXTO_TTL", 3600))
+# Tempo (segundos) até as frequências das tags e a hierarquia de áreas
+# serem recalculadas a partir do banco. 0 desativa a expiração.
+ESTATISTICAS_TAGS_TTL = int(os.getenv("ESTATISTICAS_TAGS_TTL", 300))
+
+# Candidatos considerados por vaga na atribuição ótima do matchmaking
+MATCH_CANDIDATOS_POR_VAGA = int(os.getenv("MATCH_CANDIDATOS_POR_VAGA", 50))
+
+# Candidatos guardados no ranking de cada vaga (tb_ranking_vaga); ao se
+# esgotarem, o ranking é recalculado
+RANKING_VAGA_TAMANHO = int(os.getenv("RANKING_VAGA_TAMANHO", 50))
+
+# Pool de threads onde rodam as rotas de matchmaking e pesquisa, para não
+# bloquear o event loop. Com todas as threads ocupadas, até EXECUTOR_FILA
+# chamadas esperam; as seguintes recebem 503.
+EXECUTOR_THREADS = int(os.getenv("EXECUTOR_THREADS", 4))
+EXECUTOR_FILA = int(os.getenv("EXECUTOR_FILA", 32))
+
+# Redis da fila de jobs (Celery). Sem ele, os jobs de matchmaking rodam no
+# próprio processo web.
+REDIS_URL = os.getenv("REDIS_URL")
+# Jobs de matchmaking rodando ao mesmo tempo por worker
+JOBS_MATCH_CONCORRENCIA = int(os.getenv("JOBS_MATCH_CONCORRENCIA", 1))
+# Segundos após os quais um job pendente ou em execução é dado como perdido
+# e um novo pedido para o mesmo projeto cria outro job
+JOBS_MATCH_EXPIRACAO = int(os.getenv("JOBS_MATCH_EXPIRACAO", 600))
+
+# Mede, por requisição, quantas consultas foram feitas, o tempo no banco e a
+# consulta mais lenta (cabeçalho Server-Timing e /api/metrics). Desligada,
+# nada é instalado.
+INSTRUMENTACAO_ATIVA = \
+    os.getenv("INSTRUMENTACAO_ATIVA", "false").lower() == "true"
+# Se definido, /api/metrics exige "Authorization: Bearer <token>"
+METRICAS_TOKEN = os.getenv("METRICAS_TOKEN")
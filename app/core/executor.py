@@ -0,0 +1,117 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import functools
+import threading
+import time
+import typing as t
+
+from fastapi import HTTPException
+
+from core import config, metricas
+
+
+class ExecutorLimitado:
+    '''
+        Pool de threads para rodar, fora do event loop, as rotas que fazem
+        trabalho síncrono pesado (consultas do SQLAlchemy, matchmaking).
+
+        Além das `max_workers` threads, aceita até `max_fila` chamadas
+        esperando; passando disso a chamada é recusada com 503 em vez de
+        acumular requisições no worker.
+    '''
+
+    def __init__(self, max_workers: int, max_fila: int):
+        self.max_workers = max_workers
+        self.max_fila = max_fila
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="executor")
+        self._trava = threading.Lock()
+
+        self._na_fila = 0
+        self._em_execucao = 0
+        self._maior_fila = 0
+        self._concluidas = 0
+        self._recusadas = 0
+        self._espera_total = 0.0
+        self._execucao_total = 0.0
+
+    def _executa(self, funcao, enfileirada_em, *args, **kwargs):
+        inicio = time.monotonic()
+        with self._trava:
+            self._na_fila -= 1
+            self._em_execucao += 1
+            self._espera_total += inicio - enfileirada_em
+
+        try:
+            if asyncio.iscoroutinefunction(funcao):
+                return asyncio.run(funcao(*args, **kwargs))
+            return funcao(*args, **kwargs)
+        finally:
+            with self._trava:
+                self._em_execucao -= 1
+                self._concluidas += 1
+                self._execucao_total += time.monotonic() - inicio
+
+    async def executa(self, funcao: t.Callable, *args, **kwargs):
+
+        '''
+            Executa a função em uma das threads do pool e espera o
+            resultado sem bloquear o event loop. Funções `async def` rodam
+            em um event loop próprio da thread
+
+            Entrada: função e seus argumentos
+
+            Saída: retorno da função
+
+            Exceções: Servidor ocupado (fila cheia)
+        '''
+
+        with self._trava:
+            ocupadas = self._na_fila + self._em_execucao
+            if ocupadas >= self.max_workers + self.max_fila:
+                self._recusadas += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="servidor ocupado, tente novamente")
+            self._na_fila += 1
+            self._maior_fila = max(self._maior_fila, self._na_fila)
+
+        # o contexto vai junto para a thread, para que a instrumentação da
+        # requisição (core/instrumentacao.py) veja as consultas feitas lá
+        contexto = contextvars.copy_context()
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(
+                contexto.run,
+                self._executa, funcao, time.monotonic(), *args, **kwargs),
+        )
+
+    def estatisticas(self) -> t.Dict[str, t.Any]:
+        with self._trava:
+            concluidas = self._concluidas
+            return {
+                "threads": self.max_workers,
+                "fila_maxima": self.max_fila,
+                "na_fila": self._na_fila,
+                "em_execucao": self._em_execucao,
+                "maior_fila": self._maior_fila,
+                "concluidas": concluidas,
+                "recusadas": self._recusadas,
+                "espera_media_ms":
+                    1000 * self._espera_total / concluidas if concluidas else 0.0,
+                "execucao_media_ms":
+                    1000 * self._execucao_total / concluidas if concluidas else 0.0,
+            }
+
+
+executor = ExecutorLimitado(
+    max_workers=config.EXECUTOR_THREADS,
+    max_fila=config.EXECUTOR_FILA,
+)
+metricas.registra("executor", executor.estatisticas)
+
+
+async def executa(funcao: t.Callable, *args, **kwargs):
+    return await executor.executa(funcao, *args, **kwargs)
@@ -0,0 +1,219 @@
+from bisect import bisect_left
+import contextvars
+import threading
+import time
+import typing as t
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+
+from core import metricas
+
+# Instrumentação das requisições: quantas consultas cada uma fez, quanto
+# tempo passou no banco e qual foi a consulta mais lenta, agregados por rota.
+# Só é instalada com INSTRUMENTACAO_ATIVA; desligada, nem o middleware nem
+# os eventos do SQLAlchemy são registrados.
+#
+# Os números são de cada processo: com vários workers do gunicorn, cada
+# coleta de /api/metrics vê apenas o worker que a atendeu.
+
+BALDES_DURACAO = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BALDES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# tamanho máximo do texto guardado da consulta mais lenta
+TAMANHO_CONSULTA = 500
+
+
+class Medicao:
+    '''
+        Números de uma requisição, acumulados pelos eventos do SQLAlchemy
+    '''
+
+    __slots__ = ("consultas", "tempo_banco", "mais_lenta", "sql_mais_lenta")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_banco = 0.0
+        self.mais_lenta = 0.0
+        self.sql_mais_lenta = None
+
+    def registra(self, duracao: float, sql: str):
+        self.consultas += 1
+        self.tempo_banco += duracao
+        if duracao > self.mais_lenta:
+            self.mais_lenta = duracao
+            self.sql_mais_lenta = sql
+
+
+_medicao: contextvars.ContextVar = contextvars.ContextVar(
+    "medicao", default=None)
+
+
+class Histograma:
+    '''
+        Histograma cumulativo no formato do Prometheus, por conjunto de
+        rótulos
+    '''
+
+    def __init__(self, nome: str, ajuda: str, baldes: t.Sequence[float]):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.baldes = tuple(baldes)
+        self._series = {}
+        self._trava = threading.Lock()
+
+    def observa(self, rotulos: t.Tuple[t.Tuple[str, str], ...], valor: float):
+        with self._trava:
+            serie = self._series.get(rotulos)
+            if serie is None:
+                # contagens por balde (o último é o +Inf), soma
+                serie = self._series[rotulos] = [[0] * (len(self.baldes) + 1), 0.0]
+            serie[0][bisect_left(self.baldes, valor)] += 1
+            serie[1] += valor
+
+    def exporta(self) -> t.List[str]:
+        linhas = [
+            f"# HELP {self.nome} {self.ajuda}",
+            f"# TYPE {self.nome} histogram",
+        ]
+
+        with self._trava:
+            series = [
+                (rotulos, list(contagens), soma)
+                for rotulos, (contagens, soma) in self._series.items()
+            ]
+
+        for rotulos, contagens, soma in sorted(series):
+            base = ",".join(f'{chave}="{valor}"' for chave, valor in rotulos)
+            acumulado = 0
+            for limite, contagem in zip(self.baldes + ("+Inf",), contagens):
+                acumulado += contagem
+                linhas.append(
+                    f'{self.nome}_bucket{{{base},le="{limite}"}} {acumulado}')
+            linhas.append(f"{self.nome}_sum{{{base}}} {soma}")
+            linhas.append(f"{self.nome}_count{{{base}}} {acumulado}")
+
+        return linhas
+
+
+duracao_requisicao = Histograma(
+    "conectar_request_duration_seconds",
+    "Tempo total da requisição",
+    BALDES_DURACAO,
+)
+tempo_banco = Histograma(
+    "conectar_db_time_seconds",
+    "Tempo gasto no banco durante a requisição",
+    BALDES_DURACAO,
+)
+consultas_requisicao = Histograma(
+    "conectar_db_queries",
+    "Consultas SQL feitas pela requisição",
+    BALDES_CONSULTAS,
+)
+
+# rota -> (duração, SQL) da consulta mais lenta já vista
+_mais_lentas: t.Dict[str, t.Tuple[float, str]] = {}
+_trava_lentas = threading.Lock()
+
+
+def _antes_consulta(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _medicao.get() is not None:
+        context._inicio_medicao = time.perf_counter()
+
+
+def _depois_consulta(conn, cursor, statement, parameters, context, executemany):
+    medicao = _medicao.get()
+    inicio = getattr(context, "_inicio_medicao", None)
+    if medicao is None or inicio is None:
+        return
+    medicao.registra(time.perf_counter() - inicio, statement)
+
+
+def instala_eventos():
+
+    '''
+        Registra os eventos em todas as engines (db.session e app.db.session
+        criam engines separadas)
+    '''
+
+    if not event.contains(Engine, "before_cursor_execute", _antes_consulta):
+        event.listen(Engine, "before_cursor_execute", _antes_consulta)
+        event.listen(Engine, "after_cursor_execute", _depois_consulta)
+
+
+def _rota(request: Request) -> str:
+
+    '''
+        Template da rota atendida (/api/v1/projeto/{projeto_id}), para que
+        os rótulos não explodam com um valor por ID
+    '''
+
+    endpoint = request.scope.get("endpoint")
+    if endpoint is not None:
+        for rota in request.app.routes:
+            if getattr(rota, "endpoint", None) is endpoint:
+                return rota.path
+    return "desconhecida"
+
+
+async def mede_requisicao(request: Request, call_next):
+
+    '''
+        Middleware que mede a requisição e adiciona o cabeçalho
+        Server-Timing com o tempo no banco e o total
+    '''
+
+    medicao = Medicao()
+    token = _medicao.set(medicao)
+    inicio = time.perf_counter()
+
+    try:
+        response = await call_next(request)
+    finally:
+        _medicao.reset(token)
+
+    duracao = time.perf_counter() - inicio
+    rota = _rota(request)
+    rotulos = (("method", request.method), ("route", rota))
+
+    duracao_requisicao.observa(rotulos, duracao)
+    tempo_banco.observa(rotulos, medicao.tempo_banco)
+    consultas_requisicao.observa(rotulos, medicao.consultas)
+
+    if medicao.sql_mais_lenta is not None:
+        with _trava_lentas:
+            anterior = _mais_lentas.get(rota)
+            if anterior is None or medicao.mais_lenta > anterior[0]:
+                _mais_lentas[rota] = (
+                    medicao.mais_lenta,
+                    medicao.sql_mais_lenta[:TAMANHO_CONSULTA],
+                )
+
+    response.headers["Server-Timing"] = (
+        f'db;dur={medicao.tempo_banco * 1000:.1f};desc="{medicao.consultas} consultas", '
+        f"db-lenta;dur={medicao.mais_lenta * 1000:.1f}, "
+        f"total;dur={duracao * 1000:.1f}"
+    )
+
+    return response
+
+
+def exporta_prometheus() -> str:
+    linhas = []
+    for histograma in (duracao_requisicao, tempo_banco, consultas_requisicao):
+        linhas.extend(histograma.exporta())
+    return "\n".join(linhas) + "\n"
+
+
+def consultas_mais_lentas() -> t.Dict[str, t.Any]:
+    with _trava_lentas:
+        return {
+            rota: {"duracao_ms": 1000 * duracao, "sql": sql}
+            for rota, (duracao, sql) in _mais_lentas.items()
+        }
+
+
+metricas.registra("consultas_mais_lentas", consultas_mais_lentas)
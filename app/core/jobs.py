@@ -0,0 +1,131 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import time
+import typing as t
+
+from core import config, metricas
+
+logger = logging.getLogger(__name__)
+
+# Com REDIS_URL configurado, os jobs de matchmaking vão para a fila do
+# Celery (core/celery_app.py, tasks.py) e rodam no processo worker. Sem
+# Redis, rodam neste mesmo processo, em um pool com
+# JOBS_MATCH_CONCORRENCIA threads.
+
+
+def usa_celery() -> bool:
+    return bool(config.REDIS_URL)
+
+
+class EstatisticasJobs:
+    '''
+        Contadores dos jobs rodados neste processo
+    '''
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.enfileirados = 0
+        self.em_execucao = 0
+        self.concluidos = 0
+        self.falhas = 0
+        self._execucao_total = 0.0
+        self._maior_execucao = 0.0
+
+    def inicio(self):
+        with self._trava:
+            self.em_execucao += 1
+
+    def fim(self, duracao: float, sucesso: t.Optional[bool]):
+        with self._trava:
+            self.em_execucao -= 1
+            # None: o job já tinha sido pego por outro worker
+            if sucesso is None:
+                return
+            if sucesso:
+                self.concluidos += 1
+            else:
+                self.falhas += 1
+            self._execucao_total += duracao
+            self._maior_execucao = max(self._maior_execucao, duracao)
+
+    def enfileirado(self):
+        with self._trava:
+            self.enfileirados += 1
+
+    def dicionario(self) -> t.Dict[str, t.Any]:
+        with self._trava:
+            finalizados = self.concluidos + self.falhas
+            return {
+                "backend": "celery" if usa_celery() else "local",
+                "concorrencia": config.JOBS_MATCH_CONCORRENCIA,
+                "enfileirados": self.enfileirados,
+                "em_execucao": self.em_execucao,
+                "concluidos": self.concluidos,
+                "falhas": self.falhas,
+                "execucao_media_ms":
+                    1000 * self._execucao_total / finalizados
+                    if finalizados else 0.0,
+                "maior_execucao_ms": 1000 * self._maior_execucao,
+            }
+
+
+estatisticas = EstatisticasJobs()
+metricas.registra("jobs_match", estatisticas.dicionario)
+
+_executor = None
+_trava_executor = threading.Lock()
+
+
+def _executor_local() -> ThreadPoolExecutor:
+    global _executor
+    with _trava_executor:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=config.JOBS_MATCH_CONCORRENCIA,
+                thread_name_prefix="job_match",
+            )
+        return _executor
+
+
+def roda_job_match(job_id: int):
+
+    '''
+        Roda um job de matchmaking com uma sessão própria do banco. Usado
+        tanto pelo pool local quanto pela task do Celery
+    '''
+
+    from db.session import SessionLocal
+    from db.job_match.crud import executa_job_match
+
+    db = SessionLocal()
+    estatisticas.inicio()
+    inicio = time.monotonic()
+    sucesso = False
+
+    try:
+        job = asyncio.run(executa_job_match(db, job_id))
+        sucesso = None if job is None else job.situacao != "ERRO"
+    except Exception:
+        logger.exception("job de matchmaking %s falhou", job_id)
+        if usa_celery():
+            raise
+    finally:
+        estatisticas.fim(time.monotonic() - inicio, sucesso)
+        db.close()
+
+
+def enfileira_job_match(job_id: int):
+
+    '''
+        Manda o job para a fila do Celery ou para o pool local
+    '''
+
+    estatisticas.enfileirado()
+
+    if usa_celery():
+        from tasks import job_match_task
+        job_match_task.delay(job_id)
+    else:
+        _executor_local().submit(roda_job_match, job_id)
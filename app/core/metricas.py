@@ -0,0 +1,20 @@
+import threading
+import typing as t
+
+# Registro das fontes de métricas do processo. Cada componente registra uma
+# função que devolve um dicionário com os seus números no momento da
+# coleta; a rota /metricas junta todos eles.
+
+_fontes: t.Dict[str, t.Callable[[], t.Dict[str, t.Any]]] = {}
+_trava = threading.Lock()
+
+
+def registra(nome: str, fonte: t.Callable[[], t.Dict[str, t.Any]]):
+    with _trava:
+        _fontes[nome] = fonte
+
+
+def coleta() -> t.Dict[str, t.Dict[str, t.Any]]:
+    with _trava:
+        fontes = dict(_fontes)
+    return {nome: fonte() for nome, fonte in fontes.items()}
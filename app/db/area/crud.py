@@ -2,6 +2,12 @@ from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
 from db import models
+from db.area.hierarquia import descendentes, eh_descendente
+from db.ranking_vaga.crud import invalida_rankings
+from db.utils.arvore_areas import arvore_areas
+from db.utils.autocompletar import indice_areas
+from db.utils.pesos_tags import estatisticas_tags
+from db.utils.resolucao_tags import cache_areas
 from . import schemas
 
 async def get_area_by_id(
@@ -10,7 +16,7 @@ async def get_area_by_id(
     ) -> schemas.Area:
 
     '''
-        Busca uma Área a partir do ID da mesma
+        Busca uma Área a partir do ID da mesma, pelo cache de áreas
 
         Entrada: ID
 
@@ -19,9 +25,7 @@ async def get_area_by_id(
         Exceções: Não existe Área correspondente ao ID inserido
     '''
 
-    area = db.query(models.Area)\
-        .filter(models.Area.id == area_id)\
-        .first()
+    area = cache_areas.get(db, area_id)
     if not area:
         raise HTTPException(status_code=404, detail="area não encontrada")
     return area
@@ -84,7 +88,8 @@ async def get_areas(
     ):
 
     '''
-        Busca todas as Áreas e subareas
+        Busca todas as Áreas e subareas, a partir da árvore de áreas em
+        memória
 
         Entrada: 
 
@@ -93,13 +98,7 @@ async def get_areas(
         Exceções:
     '''
 
-    areas = db.query(models.Area)\
-        .filter(models.Area.area_pai_id == None)\
-        .all()
-        
-    areasAndSubareas = [await get_area_and_subareas(db, area.id) for area in areas]
-                
-    return areasAndSubareas
+    return arvore_areas.garante_atualizada(db).areas
 
 
 async def create_area(
@@ -139,6 +138,12 @@ async def create_area(
     db.commit()
     db.refresh(db_area)
 
+    # a hierarquia de áreas usada na similaridade mudou
+    estatisticas_tags.invalida()
+    arvore_areas.invalida()
+    indice_areas.atualiza(db_area.id, db_area.descricao)
+    cache_areas.atualiza(db_area)
+
     return db_area
 
 
@@ -148,7 +153,7 @@ async def delete_area(
     ):
 
     '''
-        Apaga uma área existente
+        Apaga uma área existente e todas as suas subáreas
 
         Entrada: ID
 
@@ -159,8 +164,23 @@ async def delete_area(
 
     area = await get_area_by_id(db, area_id)
 
+    # o cascade só apaga as subáreas carregadas na sessão, e o join de
+    # area_pai_rel vai até dois níveis: carrega a subárvore inteira
+    subarvore = db.query(models.Area)\
+        .filter(models.Area.id.in_(descendentes([area_id])))\
+        .all()
+    apagadas = [subarea.id for subarea in subarvore]
+
     db.delete(area)
     db.commit()
+
+    estatisticas_tags.invalida()
+    arvore_areas.invalida()
+    invalida_rankings(db)
+    for apagada in apagadas:
+        indice_areas.remove(apagada)
+        cache_areas.remove(apagada)
+
     return area
 
 
@@ -179,18 +199,31 @@ async def edit_area(
 
         Exceções: Area não encontrada
                 : Area já Cadastrada
+                : Area pai não encontrada ou abaixo da própria área
     '''
 
     db_area = await get_area_by_id(db, area_id)
 
     update_data = area.dict(exclude_unset=True)
 
-    filtro = db.query(models.Area)\
-        .filter(models.Area.descricao == update_data["descricao"])\
-        .first()
-
-    if filtro:
-        raise HTTPException(status_code=409, detail="Area já cadastrada")
+    if "descricao" in update_data:
+        filtro = db.query(models.Area)\
+            .filter(models.Area.descricao == update_data["descricao"])\
+            .first()
+
+        if filtro:
+            raise HTTPException(status_code=409, detail="Area já cadastrada")
+
+    area_pai_id = update_data.get("area_pai_id")
+    if area_pai_id:
+        try:
+            await get_area_by_id(db, area_pai_id)
+        except HTTPException:
+            raise HTTPException(
+                status_code=400, detail="area pai não encontrada")
+        # a área não pode ficar abaixo de uma das suas subáreas
+        if eh_descendente(db, area_pai_id, area_id):
+            raise HTTPException(status_code=400, detail="area pai inválida")
 
     for key, value in update_data.items():
         setattr(db_area, key, value)
@@ -199,4 +232,12 @@ async def edit_area(
     db.commit()
     db.refresh(db_area)
 
+    # a hierarquia de áreas usada na similaridade mudou
+    estatisticas_tags.invalida()
+    arvore_areas.invalida()
+    if "area_pai_id" in update_data:
+        invalida_rankings(db)
+    indice_areas.atualiza(db_area.id, db_area.descricao)
+    cache_areas.atualiza(db_area)
+
     return db_area
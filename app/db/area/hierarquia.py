@@ -0,0 +1,84 @@
+import typing as t
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from db import models
+
+
+def descendentes(
+    areas_ids: t.Iterable[int],
+    profundidade: t.Optional[int] = None
+):
+
+    '''
+        Subconsulta com os IDs das áreas indicadas e de todas as suas
+        subáreas, em qualquer nível, a partir de tb_area_closure. Serve
+        para filtros "area_id IN (...)" ou joins, sem recursão
+
+        Entrada: IDs das áreas, quantidade máxima de níveis abaixo delas
+                 (None para todos)
+
+        Saída: SELECT da coluna descendant_id
+    '''
+
+    closure = models.AreaClosure
+    consulta = select([closure.c.descendant_id])\
+        .where(closure.c.ancestor_id.in_(list(areas_ids)))
+    if profundidade is not None:
+        consulta = consulta.where(closure.c.depth <= profundidade)
+    return consulta
+
+
+def ancestrais(
+    areas_ids: t.Iterable[int],
+    profundidade: t.Optional[int] = None
+):
+
+    '''
+        Subconsulta com os IDs das áreas indicadas e de todas as áreas
+        acima delas
+
+        Entrada: IDs das áreas, quantidade máxima de níveis acima delas
+                 (None para todos)
+
+        Saída: SELECT da coluna ancestor_id
+    '''
+
+    closure = models.AreaClosure
+    consulta = select([closure.c.ancestor_id])\
+        .where(closure.c.descendant_id.in_(list(areas_ids)))
+    if profundidade is not None:
+        consulta = consulta.where(closure.c.depth <= profundidade)
+    return consulta
+
+
+def get_descendentes_ids(db: Session, area_id: int) -> t.List[int]:
+
+    '''
+        IDs da área e de todas as suas subáreas
+
+        Entrada: ID
+
+        Saída: Lista de IDs, a própria área primeiro
+    '''
+
+    closure = models.AreaClosure
+    return [
+        id for id, in db.query(closure.c.descendant_id)
+        .filter(closure.c.ancestor_id == area_id)
+        .order_by(closure.c.depth, closure.c.descendant_id)
+    ]
+
+
+def eh_descendente(db: Session, area_id: int, ancestral_id: int) -> bool:
+
+    '''
+        Se a área é a própria ou está abaixo da área ancestral
+    '''
+
+    closure = models.AreaClosure
+    return db.query(closure)\
+        .filter(closure.c.ancestor_id == ancestral_id)\
+        .filter(closure.c.descendant_id == area_id)\
+        .first() is not None
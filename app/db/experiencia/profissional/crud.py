@@ -5,6 +5,7 @@ import typing as t
 from db import models
 from db.experiencia import schemas
 from db.utils.extract_areas import append_areas
+from db.utils.indice_texto import atualiza_texto_pessoa
 
 
 def get_experiencia_by_id(
@@ -62,6 +63,9 @@ async def create_experiencia(
     db.add(db_experiencia_prof)
     db.commit()
     db.refresh(db_experiencia_prof)
+
+    atualiza_texto_pessoa(db, pessoa_id)
+
     return db_experiencia_prof
 
 
@@ -72,8 +76,12 @@ def delete_experiencia(db: Session, experiencia_id: int):
             status.HTTP_404_NOT_FOUND,
             detail="experiencia profissional não encontrada",
         )
+    pessoa_id = experiencia.pessoa_id
     db.delete(experiencia)
     db.commit()
+
+    atualiza_texto_pessoa(db, pessoa_id)
+
     return experiencia
 
 
@@ -104,6 +112,7 @@ async def edit_experiencia(
 
     Raises:
         HTTPException: No experience corresponds to experiencia_id in the database.
+        HTTPException: Some of the areas sent do not exist.
     """
     db_experiencia = get_experiencia_by_id(db, experiencia_id)
     if not db_experiencia:
@@ -121,4 +130,8 @@ async def edit_experiencia(
     db.add(db_experiencia)
     db.commit()
     db.refresh(db_experiencia)
+
+    if "descricao" in update_data:
+        atualiza_texto_pessoa(db, db_experiencia.pessoa_id)
+
     return db_experiencia
@@ -4,6 +4,8 @@ import typing as t
 
 from db import models
 from db.habilidade import schemas
+from db.utils.autocompletar import indice_habilidades
+from db.utils.resolucao_tags import cache_habilidades
 
 
 def get_habilidade_by_id( 
@@ -12,7 +14,7 @@ def get_habilidade_by_id(
     ) -> schemas.Habilidades:
 
     '''
-        Busca habilidade pelo ID
+        Busca habilidade pelo ID, pelo cache de habilidades
 
         Entrada: ID
 
@@ -21,9 +23,7 @@ def get_habilidade_by_id(
         Exceções: Não existe Habilidade correspondente ao ID inserido
     '''
 
-    habilidades = db.query(models.Habilidades)\
-        .filter(models.Habilidades.id == habilidades_id)\
-        .first()
+    habilidades = cache_habilidades.get(db, habilidades_id)
 
     if not habilidades:
         raise HTTPException(status_code=404, detail="Habilidade não encontrada")
@@ -113,6 +113,9 @@ def create_habilidades(
     db.commit()
     db.refresh(db_habilidades)
 
+    indice_habilidades.atualiza(db_habilidades.id, db_habilidades.nome)
+    cache_habilidades.atualiza(db_habilidades)
+
     return db_habilidades
 
 
@@ -136,6 +139,9 @@ def delete_habilidades(
     db.delete(habilidades)
     db.commit()
 
+    indice_habilidades.remove(habilidades_id)
+    cache_habilidades.remove(habilidades_id)
+
     return habilidades
 
 
@@ -174,4 +180,7 @@ def edit_habilidades(
     db.commit()
     db.refresh(db_habilidades)
 
+    indice_habilidades.atualiza(db_habilidades.id, db_habilidades.nome)
+    cache_habilidades.atualiza(db_habilidades)
+
     return db_habilidades
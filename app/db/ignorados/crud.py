@@ -4,6 +4,7 @@ import typing as t
 
 from app.db import models
 from app.db.ignorados import schemas
+from app.db.ranking_vaga.crud import invalida_ranking_vagas
 
 
 def get_pessoa_ignorada_by_id(
@@ -40,7 +41,37 @@ def get_ids_pessoa_ignorada_by_vaga(
         .filter(models.PessoaIgnoradaVaga.pessoa_projeto_id == pessoa_projeto_id)\
         .all()
 
-    return pessoas_ignoradas_ids
+    return [pessoa_id for pessoa_id, in pessoas_ignoradas_ids]
+
+
+def get_ids_pessoas_ignoradas_by_vagas(
+    db: Session,
+    pessoas_projeto_ids: t.List[int]
+) -> t.Dict[int, t.List[int]]:
+
+    '''
+        Busca, em uma única consulta, as pessoas ignoradas de várias vagas
+
+        Entrada: IDs das vagas
+
+        Saída: Dicionário {pessoa_projeto_id: [pessoa_id, ...]}
+    '''
+
+    if not pessoas_projeto_ids:
+        return {}
+
+    pessoas_ignoradas = db.query(
+            models.PessoaIgnoradaVaga.pessoa_projeto_id,
+            models.PessoaIgnoradaVaga.pessoa_id
+        )\
+        .filter(models.PessoaIgnoradaVaga.pessoa_projeto_id.in_(pessoas_projeto_ids))\
+        .all()
+
+    ignoradas_por_vaga = {}
+    for pessoa_projeto_id, pessoa_id in pessoas_ignoradas:
+        ignoradas_por_vaga.setdefault(pessoa_projeto_id, []).append(pessoa_id)
+
+    return ignoradas_por_vaga
 
 
 def get_pessoas_ignoradas_by_vaga(
@@ -108,4 +139,7 @@ def delete_pessoas_ignoradas_by_vaga(
         db.delete(pessoa_ignorada)
         db.commit()
 
+    # quem já tinha sido sugerido volta a ser candidato
+    invalida_ranking_vagas(db, [pessoa_projeto_id])
+
     return pessoas_ignoradas
@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from core import config
+from db import models
+from db.pessoa.crud import get_pessoa_by_id
+from db.projeto.crud import get_projeto
+from db.notificacao.crud import notificacao_job_match
+from db.pessoa_projeto.crud import ATRIBUICOES, get_similaridade_projeto
+
+PENDENTE = "PENDENTE"
+EXECUTANDO = "EXECUTANDO"
+CONCLUIDO = "CONCLUIDO"
+ERRO = "ERRO"
+
+
+def create_job_match(
+    db: Session,
+    pessoa_id: int,
+    projeto_id: int,
+    atribuicao: str
+) -> models.JobMatch:
+
+    '''
+        Registra um job de matchmaking do projeto. Se a mesma pessoa já
+        tem um job igual na fila ou em execução, devolve ele em vez de
+        criar outro
+
+        Entrada: ID da pessoa que pediu, ID do projeto, modo de atribuição
+
+        Saída: JobMatch
+
+        Exceções: Modo de atribuição inválido
+                : Projeto não encontrado
+    '''
+
+    if atribuicao not in ATRIBUICOES:
+        raise HTTPException(
+            status_code=400, detail="modo de atribuição inválido")
+
+    get_projeto(db, projeto_id)
+
+    # um job parado há mais que JOBS_MATCH_EXPIRACAO provavelmente teve o
+    # worker derrubado e não bloqueia um novo pedido
+    limite = datetime.now(timezone.utc) - \
+        timedelta(seconds=config.JOBS_MATCH_EXPIRACAO)
+
+    # só reaproveita jobs da própria pessoa: a consulta do resultado e a
+    # notificação são de quem pediu o job
+    existente = db.query(models.JobMatch)\
+        .filter(models.JobMatch.projeto_id == projeto_id)\
+        .filter(models.JobMatch.pessoa_id == pessoa_id)\
+        .filter(models.JobMatch.atribuicao == atribuicao)\
+        .filter(models.JobMatch.situacao.in_([PENDENTE, EXECUTANDO]))\
+        .filter(models.JobMatch.data_criacao > limite)\
+        .order_by(models.JobMatch.id.desc())\
+        .first()
+
+    if existente:
+        return existente
+
+    db_job = models.JobMatch(
+        projeto_id=projeto_id,
+        pessoa_id=pessoa_id,
+        atribuicao=atribuicao,
+        situacao=PENDENTE,
+    )
+
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+
+    return db_job
+
+
+def get_job_match(
+    db: Session,
+    job_id: int,
+    pessoa_id: int
+) -> models.JobMatch:
+
+    '''
+        Busca um job de matchmaking pedido pela pessoa
+
+        Entrada: ID do job, ID da pessoa logada
+
+        Saída: JobMatch
+
+        Exceções: Não existe job da pessoa com o ID inserido
+    '''
+
+    job = db.query(models.JobMatch)\
+        .filter(models.JobMatch.id == job_id)\
+        .filter(models.JobMatch.pessoa_id == pessoa_id)\
+        .first()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="job não encontrado")
+
+    return job
+
+
+def get_pessoas_job_match(db: Session, job: models.JobMatch) -> dict:
+
+    '''
+        Pessoas selecionadas por um job concluído
+
+        Entrada: JobMatch
+
+        Saída: {vaga_id: Pessoa}
+    '''
+
+    if job.situacao != CONCLUIDO or not job.resultado:
+        return {}
+
+    pessoas = db.query(models.Pessoa)\
+        .filter(models.Pessoa.id.in_(set(job.resultado.values())))\
+        .all()
+    pessoas = {pessoa.id: pessoa for pessoa in pessoas}
+
+    # chaves de JSON voltam como texto
+    return {
+        int(vaga_id): pessoas[pessoa_id]
+        for vaga_id, pessoa_id in job.resultado.items()
+        if pessoa_id in pessoas
+    }
+
+
+async def executa_job_match(db: Session, job_id: int) -> models.JobMatch:
+
+    '''
+        Roda o matchmaking de um job, guardando o resultado ou o erro e
+        notificando a pessoa que o pediu
+
+        Entrada: ID do job
+
+        Saída: JobMatch finalizado, ou None se o job não existe ou já foi
+               pego por outro worker
+
+        Exceções: Erros inesperados do matchmaking, depois de registrados
+                  no job
+    '''
+
+    # marca o job como em execução só se ele ainda está pendente, para
+    # que uma entrega repetida da fila não rode o mesmo job duas vezes
+    pegou = db.query(models.JobMatch)\
+        .filter(models.JobMatch.id == job_id)\
+        .filter(models.JobMatch.situacao == PENDENTE)\
+        .update(
+            {"situacao": EXECUTANDO, "data_inicio": func.now()},
+            synchronize_session=False,
+        )
+    db.commit()
+
+    if not pegou:
+        return None
+
+    job = db.query(models.JobMatch).get(job_id)
+    falha = None
+
+    try:
+        pessoa = get_pessoa_by_id(db, job.pessoa_id)
+        pessoas_vagas = await get_similaridade_projeto(
+            db, pessoa, job.projeto_id, job.atribuicao)
+        job.resultado = {
+            vaga_id: pessoa.id for vaga_id, pessoa in pessoas_vagas.items()
+        }
+        job.situacao = CONCLUIDO
+    except HTTPException as erro:
+        db.rollback()
+        job.situacao = ERRO
+        job.erro = erro.detail
+    except Exception as erro:
+        db.rollback()
+        job.situacao = ERRO
+        job.erro = "erro interno"
+        falha = erro
+
+    job.data_fim = func.now()
+    db.commit()
+    db.refresh(job)
+
+    notificacao_job_match(db, job)
+
+    # erros inesperados seguem adiante para aparecerem no log do worker
+    if falha:
+        raise falha
+
+    return job
@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+import typing as t
+from datetime import datetime
+from db.pessoa.schemas import Pessoa
+
+
+class JobMatch(BaseModel):
+    id: int
+    projeto_id: int
+    atribuicao: str
+    situacao: str
+    erro: t.Optional[str] = None
+    data_criacao: t.Optional[datetime] = None
+    data_inicio: t.Optional[datetime] = None
+    data_fim: t.Optional[datetime] = None
+    tempo_espera: t.Optional[float] = None
+    tempo_execucao: t.Optional[float] = None
+
+    class Config:
+        orm_mode = True
+
+
+class JobMatchOut(JobMatch):
+    pessoas: t.Optional[t.Dict[int, Pessoa]] = None
+
+    class Config:
+        orm_mode = True
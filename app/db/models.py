@@ -9,13 +9,21 @@ from sqlalchemy import (
     Table,
     DateTime,
     Date,
+    Float,
+    Index,
+    JSON,
+    DDL,
+    event,
 )
-from sqlalchemy.orm import relationship, backref
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, backref, deferred
 from sqlalchemy.sql import func
 from sqlalchemy.ext.associationproxy import association_proxy
 
 from datetime import date
 
+from .utils import busca_aproximada, busca_textual, closure_areas
+
 # Tables created from M*N relationships
 
 HabilidadesPessoa = Table(
@@ -103,6 +111,26 @@ PessoaAreaProjeto = Table(
     ),
 )
 
+# Every (ancestor, descendant) pair of the area hierarchy, each area
+# included as its own descendant with depth 0. Kept in sync with
+# area_pai_id by the Area mapper events registered at the end of this file
+AreaClosure = Table(
+    closure_areas.TABELA,
+    Base.metadata,
+    Column(
+        "ancestor_id",
+        ForeignKey("tb_area.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column(
+        "descendant_id",
+        ForeignKey("tb_area.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column("depth", Integer, nullable=False),
+    Index("ix_tb_area_closure_descendant_id", "descendant_id", "ancestor_id"),
+)
+
 PessoaHabilidadesProjeto = Table(
     "tb_habilidades_pessoa_projeto",
     Base.metadata,
@@ -151,9 +179,14 @@ class Pessoa(Base):
         experiencia_projetos: relationship
         experiencia_academica: relationship
         projeto: relationship
+        busca: tsvector of nome, usuario, areas and habilidades, kept up
+        to date by database triggers (db/utils/busca_textual.py)
     """
 
     __tablename__ = "tb_pessoa"
+    __table_args__ = (
+        Index("ix_tb_pessoa_busca", "busca", postgresql_using="gin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     usuario = Column(String, unique=True)
@@ -185,6 +218,8 @@ class Pessoa(Base):
 
     projeto = relationship("Projeto", back_populates="dono")
 
+    busca = deferred(Column(TSVECTOR().with_variant(String, "sqlite")))
+
     def __repr__(self):
         return f"<Pessoa {self.id}, {self.email}, {self.superusuario}>"
 
@@ -207,9 +242,14 @@ class Projeto(Base):
         habilidades: relationship
         projeto_pessoa: relationship
         reacoes: association_proxy - extended form of many-to-many relationship
+        busca: tsvector of nome, objetivo, descricao, areas and
+        habilidades, kept up to date by database triggers
     """
 
     __tablename__ = "tb_projeto"
+    __table_args__ = (
+        Index("ix_tb_projeto_busca", "busca", postgresql_using="gin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String)
@@ -228,7 +268,10 @@ class Projeto(Base):
     pessoa_id = Column(Integer, ForeignKey(
         "tb_pessoa.id", onupdate="CASCADE", ondelete="CASCADE"), nullable=True)
     dono = relationship("Pessoa", back_populates="projeto")
+
     reacoes = association_proxy("projeto_reacoes", "pessoa")
+
+    busca = deferred(Column(TSVECTOR().with_variant(String, "sqlite")))
     # publico_alvo = Column(String, nullable=True)
     # monetizacao = Column(String, nullable=True)
 
@@ -528,6 +571,99 @@ class PessoaIgnoradaVaga(Base):
         "tb_pessoa_projeto.id", onupdate="CASCADE", ondelete="CASCADE"))
 
 
+class RankingVaga(Base):
+    """
+    Represents table "tb_ranking_vaga"
+
+    Cached ranking of the candidates of a vaga, from the most to the
+    least similar. Rows are consumed as candidates are suggested and
+    the whole ranking is dropped when it may be stale
+
+
+    Many to One relationship
+    One PessoaProjeto has many RankingVaga rows
+
+
+    Attributes:
+        id: Integer, Primary key
+        pessoa_projeto_id: Integer, Foreign Key
+        pessoa_id: Integer, Foreign Key
+        posicao: Integer
+        similaridade: Float
+    """
+
+    __tablename__ = "tb_ranking_vaga"
+    __table_args__ = (
+        Index("ix_tb_ranking_vaga_posicao", "pessoa_projeto_id", "posicao"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    pessoa_projeto_id = Column(Integer, ForeignKey(
+        "tb_pessoa_projeto.id", onupdate="CASCADE", ondelete="CASCADE"),
+        nullable=False)
+    pessoa_id = Column(Integer, ForeignKey(
+        "tb_pessoa.id", onupdate="CASCADE", ondelete="CASCADE"),
+        nullable=False, index=True)
+    posicao = Column(Integer, nullable=False)
+    similaridade = Column(Float, nullable=False)
+
+
+class JobMatch(Base):
+    """
+    Represents table "tb_job_match"
+
+    Matchmaking of a projeto run outside the HTTP request. The job is
+    queued as PENDENTE, goes to EXECUTANDO when a worker picks it and
+    ends as CONCLUIDO (resultado maps vaga id to pessoa id) or ERRO
+
+
+    Many to One relationship
+    One Projeto has many JobMatch
+
+
+    Attributes:
+        id: Integer, Primary key
+        projeto_id: Integer, Foreign Key
+        pessoa_id: Integer, Foreign Key (who requested it)
+        atribuicao: String
+        situacao: String
+        resultado: JSON
+        erro: String
+        data_criacao: DateTime
+        data_inicio: DateTime
+        data_fim: DateTime
+    """
+
+    __tablename__ = "tb_job_match"
+
+    id = Column(Integer, primary_key=True, index=True)
+    projeto_id = Column(Integer, ForeignKey(
+        "tb_projeto.id", onupdate="CASCADE", ondelete="CASCADE"),
+        nullable=False, index=True)
+    pessoa_id = Column(Integer, ForeignKey(
+        "tb_pessoa.id", onupdate="CASCADE", ondelete="CASCADE"),
+        nullable=False)
+    atribuicao = Column(String, nullable=False)
+    situacao = Column(String, nullable=False, default="PENDENTE")
+    resultado = Column(JSON, nullable=True)
+    erro = Column(String, nullable=True)
+    data_criacao = Column(DateTime(timezone=True), server_default=func.now())
+    data_inicio = Column(DateTime(timezone=True), nullable=True)
+    data_fim = Column(DateTime(timezone=True), nullable=True)
+
+    @property
+    def tempo_espera(self):
+        if self.data_inicio is None or self.data_criacao is None:
+            return None
+        return (self.data_inicio - self.data_criacao).total_seconds()
+
+    @property
+    def tempo_execucao(self):
+        if self.data_fim is None or self.data_inicio is None:
+            return None
+        return (self.data_fim - self.data_inicio).total_seconds()
+
+
 class Reacoes(Base):
     """
     Represents table "tb_reacoes"
@@ -584,3 +720,19 @@ class Seguir(Base):
     seguidor_id = Column(Integer, ForeignKey(
         "tb_pessoa.id", onupdate="CASCADE", ondelete="CASCADE"))
     data_criacao = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Full-text search functions and triggers and the trigram indexes of the
+# fuzzy search (Postgres only), created along with the tables; existing
+# databases get them from the 0001_busca_textual and 0002_busca_aproximada
+# migrations
+for comando in busca_textual.DDL_POSTGRES + busca_aproximada.DDL_POSTGRES:
+    event.listen(
+        Base.metadata,
+        "after_create",
+        DDL(comando).execute_if(dialect="postgresql"),
+    )
+
+# Keeps tb_area_closure in sync with every area insert, move and delete
+for evento, funcao in closure_areas.EVENTOS:
+    event.listen(Area, evento, funcao)
@@ -381,6 +381,43 @@ def notificacao_seguindo(
     db.commit()
     db.refresh(db_notificacao)
 
+def notificacao_job_match(
+    db: Session,
+    job: models.JobMatch
+):
+    '''
+        Avisa a pessoa que pediu o matchmaking do projeto que ele terminou
+
+        Entrada: JobMatch concluído ou com erro
+
+        Saída:
+
+        Exceções:
+    '''
+
+    projeto = get_projeto(db, job.projeto_id)
+
+    if job.situacao == "CONCLUIDO":
+        situacao = "O time sugerido para o projeto <strong>" + \
+            projeto.nome + "</strong> está pronto!"
+    else:
+        situacao = "Não foi possível sugerir um time para o projeto <strong>" + \
+            projeto.nome + "</strong>."
+
+    db_notificacao = models.Notificacao(
+        remetente_id=job.pessoa_id,
+        destinatario_id=job.pessoa_id,
+        projeto_id=projeto.id,
+        situacao=situacao,
+        foto=projeto.foto_capa,
+        lido=False,
+        link='/projeto/{}'.format(projeto.id)
+    )
+
+    db.add(db_notificacao)
+    db.commit()
+
+
 def notificacao_checagem(
     db: Session
 ):
@@ -4,6 +4,7 @@ import typing as t
 
 from app.db import models
 from app.db.papel import schemas
+from db.utils.cache_referencias import cache_papeis
 
 
 def get_papel_by_id(
@@ -12,7 +13,7 @@ def get_papel_by_id(
     ) -> schemas.Papel:
 
     '''
-        Busca um papel a partir do ID da mesma
+        Busca um papel a partir do ID da mesma, pelo cache de papéis
 
         Entrada: ID
 
@@ -21,9 +22,7 @@ def get_papel_by_id(
         Exceções: Não existe papel correspondente ao ID inserido
     '''
 
-    papel = db.query(models.Papel)\
-        .filter(models.Papel.id == papel_id)\
-        .first()
+    papel = cache_papeis.get(db, papel_id)
 
     if not papel:
         raise HTTPException(status_code=404, detail="papel não encontrado")
@@ -76,6 +75,8 @@ def create_papel(
     db.commit()
     db.refresh(db_papel)
 
+    cache_papeis.atualiza(db_papel)
+
     return db_papel
 
 
@@ -99,6 +100,8 @@ def delete_papel(
     db.delete(papel)
     db.commit()
 
+    cache_papeis.remove(papel_id)
+
     return papel
 
 
@@ -128,4 +131,6 @@ def edit_papel(
     db.add(db_papel)
     db.commit()
     db.refresh(db_papel)
+
+    cache_papeis.atualiza(db_papel)
     return db_papel
@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+import typing as t
+
+from sqlalchemy import func, literal, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Query
+
+from core import config, metricas
+from db.utils import busca_aproximada
+from db.utils.busca_textual import normaliza
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE query_canceled: o statement_timeout cancelou a consulta
+CONSULTA_CANCELADA = "57014"
+
+
+class EstatisticasBusca:
+    '''
+        Contadores da busca aproximada, publicados como "busca_aproximada"
+        no JSON de /api/v1/metricas (superusuários)
+    '''
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.consultas = 0
+        self.estouros = 0
+        self.reconstrucoes = 0
+        self.tempo_total = 0.0
+        self.tempo_maximo = 0.0
+
+    def registra(self, duracao: float, estourou: bool):
+        with self._trava:
+            self.consultas += 1
+            self.estouros += estourou
+            self.tempo_total += duracao
+            self.tempo_maximo = max(self.tempo_maximo, duracao)
+
+    def reconstruiu(self):
+        with self._trava:
+            self.reconstrucoes += 1
+
+    def coleta(self) -> t.Dict[str, t.Any]:
+        with self._trava:
+            return {
+                "consultas": self.consultas,
+                "estouros_orcamento": self.estouros,
+                "reconstrucoes_indice": self.reconstrucoes,
+                "tempo_medio_ms": round(
+                    1000 * self.tempo_total / self.consultas, 2)
+                if self.consultas else 0.0,
+                "tempo_maximo_ms": round(1000 * self.tempo_maximo, 2),
+            }
+
+
+estatisticas = EstatisticasBusca()
+metricas.registra("busca_aproximada", estatisticas.coleta)
+
+
+class IndicesNgramas:
+    '''
+        Um IndiceNgramas por tabela de busca_aproximada.COLUNAS, montados
+        na primeira busca
+    '''
+
+    def __init__(self, ttl: int = 0):
+        self.ttl = ttl
+        self._indices = {}
+        self._trava = threading.Lock()
+
+    def indice(self, db, modelo) -> busca_aproximada.IndiceNgramas:
+
+        '''
+            Índice da coluna pesquisada do modelo, reconstruído se expirado
+        '''
+
+        tabela = modelo.__tablename__
+        with self._trava:
+            indice = self._indices.setdefault(
+                tabela, busca_aproximada.IndiceNgramas(self.ttl))
+            if indice.expirado():
+                coluna = getattr(modelo, busca_aproximada.COLUNAS[tabela])
+                indice.carrega(db.query(modelo.id, coluna).yield_per(10000))
+                estatisticas.reconstruiu()
+        return indice
+
+    def invalida(self):
+        with self._trava:
+            self._indices.clear()
+
+
+indices = IndicesNgramas(ttl=config.BUSCA_APROXIMADA_TTL)
+
+
+def _busca_postgres(
+    consulta: Query, modelo, texto: str, skip: int, limit: int
+) -> t.Tuple[t.List, bool]:
+    coluna = func.sem_acento(
+        getattr(modelo, busca_aproximada.COLUNAS[modelo.__tablename__]))
+    termo = literal(normaliza(texto))
+
+    db = consulta.session
+    # o savepoint desfaz os set_config (locais à transação) e, se o prazo
+    # estourar, o cancelamento, sem abortar a transação da requisição
+    savepoint = db.begin_nested()
+    try:
+        db.execute(
+            text(
+                "SELECT set_config('statement_timeout', :prazo, true), "
+                "set_config('pg_trgm.word_similarity_threshold', :limiar, true)"
+            ),
+            {
+                "prazo": f"{config.BUSCA_APROXIMADA_ORCAMENTO_MS}ms",
+                "limiar": str(config.BUSCA_APROXIMADA_LIMIAR),
+            },
+        )
+        # "coluna %> termo" (o % dobrado é o escape do psycopg2) usa o índice
+        # GIN de trigramas de sem_acento(coluna)
+        resultado = consulta\
+            .filter(coluna.op("%%>")(termo))\
+            .order_by(func.word_similarity(termo, coluna).desc(), modelo.id)\
+            .offset(skip)\
+            .limit(limit)\
+            .all()
+    except OperationalError as erro:
+        savepoint.rollback()
+        # só o cancelamento pelo prazo é estouro do orçamento; conexão
+        # perdida e outras falhas do banco seguem adiante
+        if getattr(erro.orig, "pgcode", None) != CONSULTA_CANCELADA:
+            raise
+        logger.warning("busca aproximada estourou o orçamento: %r", texto)
+        return [], True
+
+    savepoint.rollback()
+    return resultado, False
+
+
+def _busca_memoria(
+    consulta: Query, modelo, texto: str, skip: int, limit: int
+) -> t.Tuple[t.List, bool]:
+    prazo = time.monotonic() + config.BUSCA_APROXIMADA_ORCAMENTO_MS / 1000
+    indice = indices.indice(consulta.session, modelo)
+    pontuados, estourou = indice.busca(
+        texto, config.BUSCA_APROXIMADA_LIMIAR, prazo)
+    if not pontuados:
+        return [], estourou
+
+    # a consulta pode ter outros filtros (área): só os candidatos que
+    # passam por eles contam na paginação
+    ids = [id for id, _ in pontuados]
+    objetos = {
+        objeto.id: objeto
+        for objeto in consulta.filter(modelo.id.in_(ids)).all()
+    }
+    ordenados = [objetos[id] for id in ids if id in objetos]
+    return ordenados[skip:skip + limit], estourou
+
+
+def busca(
+    consulta: Query,
+    modelo,
+    texto: str,
+    skip: int = 0,
+    limit: int = 100,
+) -> t.List:
+
+    '''
+        Busca aproximada pelo nome (ou descrição) de pessoas, projetos,
+        áreas e habilidades, tolerante a erros de digitação e acentos,
+        ordenada da mais à menos parecida. No Postgres usa o pg_trgm com
+        índices GIN de trigramas; nos outros bancos, o índice de trigramas
+        em memória e a similaridade de Jaro-Winkler. Leva no máximo
+        BUSCA_APROXIMADA_ORCAMENTO_MS: no Postgres, uma consulta que passa
+        disso é cancelada e não traz resultados; em memória, os candidatos
+        ainda não reordenados vêm no fim, na ordem dos trigramas
+
+        Entrada: consulta do modelo (com outros filtros já aplicados),
+                 modelo (uma das tabelas de busca_aproximada.COLUNAS),
+                 texto digitado, paginação
+
+        Saída: Lista dos objetos encontrados, do mais parecido ao menos
+    '''
+
+    inicio = time.perf_counter()
+    if consulta.session.get_bind().dialect.name == "postgresql":
+        resultado, estourou = _busca_postgres(
+            consulta, modelo, texto, skip, limit)
+    else:
+        resultado, estourou = _busca_memoria(
+            consulta, modelo, texto, skip, limit)
+    estatisticas.registra(time.perf_counter() - inicio, estourou)
+    return resultado
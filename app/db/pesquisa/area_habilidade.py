@@ -5,25 +5,37 @@ import typing as t
 from app.db import models
 from app.db.area import schemas as schemas_areas
 from app.db.habilidade import schemas as schemas_habilidades
+from db.pesquisa.aproximada import busca as busca_aproximada
 
 def search_area_by_name(
     db: Session,
     area_nome: str,
+    aproximada: bool = False,
+    skip: int = 0,
+    limit: int = 100,
     ) -> t.List[schemas_areas.Area]:
 
     '''
-        Busca Áreas que contenham a string inserida
+        Busca Áreas que contenham a string inserida ou, na busca
+        aproximada, que se pareçam com ela (da mais parecida à menos)
 
-        Entrada: string
+        Entrada: string, se a busca é aproximada, paginação
 
         Saída: Lista de Esquemas da Área correspondente
 
         Exceções: Não existe Área correspondente à string inserida
     '''
 
-    area = db.query(models.Area)\
-        .filter(models.Area.descricao.ilike(f'%{area_nome}%'))\
-        .all()
+    if aproximada:
+        area = busca_aproximada(
+            db.query(models.Area), models.Area, area_nome, skip, limit)
+    else:
+        area = db.query(models.Area)\
+            .filter(models.Area.descricao.ilike(f'%{area_nome}%'))\
+            .order_by(models.Area.id)\
+            .offset(skip)\
+            .limit(limit)\
+            .all()
     
     if not area:
         raise HTTPException(status_code=404, detail="area não encontrada")
@@ -34,21 +46,33 @@ def search_area_by_name(
 def search_habilidade_by_name(
     db: Session,
     habilidade_nome: str,
+    aproximada: bool = False,
+    skip: int = 0,
+    limit: int = 100,
     ) -> t.List[schemas_habilidades.Habilidades]:
 
     '''
-        Busca Habilidades que contenham a string inserida
+        Busca Habilidades que contenham a string inserida ou, na busca
+        aproximada, que se pareçam com ela (da mais parecida à menos)
 
-        Entrada: string
+        Entrada: string, se a busca é aproximada, paginação
 
         Saída: Lista de Esquemas da Habilidades correspondente
 
         Exceções: Não existe Habilidades correspondente à string inserida
     '''
 
-    habilidade = db.query(models.Habilidades)\
-        .filter(models.Habilidades.nome.ilike(f'%{habilidade_nome}%'))\
-        .all()
+    if aproximada:
+        habilidade = busca_aproximada(
+            db.query(models.Habilidades), models.Habilidades,
+            habilidade_nome, skip, limit)
+    else:
+        habilidade = db.query(models.Habilidades)\
+            .filter(models.Habilidades.nome.ilike(f'%{habilidade_nome}%'))\
+            .order_by(models.Habilidades.id)\
+            .offset(skip)\
+            .limit(limit)\
+            .all()
     
     if not habilidade:
         raise HTTPException(status_code=404, detail="habilidade não encontrada")
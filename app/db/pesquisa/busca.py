@@ -0,0 +1,359 @@
+import base64
+import binascii
+import json
+import typing as t
+
+from fastapi import HTTPException
+from sqlalchemy import (
+    Float,
+    Integer,
+    String,
+    and_,
+    cast,
+    distinct,
+    exists,
+    func,
+    literal,
+    null,
+    or_,
+    select,
+    union_all,
+)
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql import ClauseElement
+
+from db import models
+from db.area import hierarquia
+from db.pesquisa import schemas
+from db.utils import busca_textual
+
+# Busca unificada de pessoas e projetos (/api/v1/busca): texto livre e
+# filtros por área (com as subáreas), habilidade, papel, remuneração e
+# visibilidade, em páginas ordenadas por relevância e paginadas por cursor
+# (relevância, id). Cada página, com as contagens das facetas na primeira,
+# é uma única consulta: CTEs com os resultados filtrados e a página, e um
+# UNION ALL das linhas da página com as das facetas. As subáreas vêm de
+# tb_area_closure (db/area/hierarquia.py).
+
+PESSOA = "pessoa"
+PROJETO = "projeto"
+
+PAPEIS = ("aliado", "colaborador", "idealizador")
+
+TAMANHO_PAGINA = 20
+MAX_PAGINA = 100
+
+_TIPOS = {
+    PESSOA: {
+        "tabela": models.Pessoa.__table__,
+        "foto": "foto_perfil",
+        "detalhe": "usuario",
+        "areas": (models.PessoaArea, "pessoa_id"),
+        "habilidades": (models.HabilidadesPessoa, "pessoa_id"),
+        # colunas de cada peso na busca sem o tsvector (fora do Postgres)
+        "campos": {"A": ("nome",), "B": ("usuario",)},
+    },
+    PROJETO: {
+        "tabela": models.Projeto.__table__,
+        "foto": "foto_capa",
+        "detalhe": "objetivo",
+        "areas": (models.ProjetoArea, "projeto_id"),
+        "habilidades": (models.HabilidadesProjeto, "projeto_id"),
+        "campos": {"A": ("nome",), "B": ("objetivo",), "C": ("descricao",)},
+    },
+}
+
+
+def codifica_cursor(relevancia: float, id: int) -> str:
+    return base64.urlsafe_b64encode(
+        json.dumps([relevancia, id]).encode()).decode()
+
+
+def decodifica_cursor(cursor: str) -> t.Tuple[float, int]:
+    try:
+        relevancia, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(relevancia), int(id)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="cursor inválido")
+
+
+def _valor(valor, tipo):
+    # colunas ausentes de um membro do UNION, com o tipo explícito para o
+    # Postgres
+    if isinstance(valor, ClauseElement):
+        return valor
+    if valor is None:
+        return cast(null(), tipo)
+    return cast(literal(valor), tipo)
+
+
+def _linha(
+    linha: str,
+    id=None,
+    relevancia=None,
+    nome=None,
+    foto=None,
+    detalhe=None,
+    quantidade=None,
+) -> list:
+    return [
+        _valor(linha, String).label("linha"),
+        _valor(id, Integer).label("id"),
+        _valor(relevancia, Float).label("relevancia"),
+        _valor(nome, String).label("nome"),
+        _valor(foto, String).label("foto"),
+        _valor(detalhe, String).label("detalhe"),
+        _valor(quantidade, Integer).label("quantidade"),
+    ]
+
+
+def _texto(tipo: str, texto: str, pesos: str, postgres: bool):
+
+    '''
+        Condição e relevância da busca textual. No Postgres, a mesma da
+        db/pesquisa/textual.py (tsvector e ts_rank); nos outros bancos,
+        cada termo em alguma das colunas dos pesos, sem relevância
+
+        Saída: (condição ou None sem termos, relevância)
+    '''
+
+    tabela = _TIPOS[tipo]["tabela"]
+    sem_relevancia = cast(literal(0), Float)
+
+    if postgres:
+        texto_tsquery = busca_textual.tsquery(texto, pesos)
+        if texto_tsquery is None:
+            return None, sem_relevancia
+        tsquery = func.to_tsquery(busca_textual.CONFIGURACAO, texto_tsquery)
+        return (
+            tabela.c.busca.op("@@")(tsquery),
+            cast(func.ts_rank(tabela.c.busca, tsquery), Float),
+        )
+
+    termos = busca_textual.termos(texto, acentos=True)
+    if not termos:
+        return None, sem_relevancia
+    colunas = [
+        tabela.c[coluna]
+        for peso, colunas in _TIPOS[tipo]["campos"].items()
+        if not pesos or peso in pesos
+        for coluna in colunas
+    ]
+    return and_(*(
+        or_(*(coluna.ilike(f"%{termo}%") for coluna in colunas))
+        for termo in termos
+    )), sem_relevancia
+
+
+def busca(
+    db: Session,
+    tipo: str,
+    texto: str = "",
+    pesos: str = "",
+    areas_ids: t.Sequence[int] = (),
+    subareas: bool = True,
+    habilidades_ids: t.Sequence[int] = (),
+    papel: t.Optional[str] = None,
+    remunerado: t.Optional[bool] = None,
+    visibilidade: t.Optional[bool] = None,
+    cursor: t.Optional[str] = None,
+    limit: int = TAMANHO_PAGINA,
+    facetas: bool = True,
+) -> schemas.PaginaBusca:
+
+    '''
+        Uma página da busca de pessoas ou projetos, da mais relevante à
+        menos (sem texto, pela ordem dos IDs), com uma única consulta ao
+        banco. Os filtros se somam; dentro de áreas e de habilidades basta
+        uma das indicadas. As facetas contam, entre todos os resultados,
+        quantos têm cada área, habilidade e papel (nos projetos, papel de
+        alguma vaga)
+
+        Entrada: tipo (PESSOA ou PROJETO), texto digitado, pesos dos
+                 campos do texto ("" para todos), IDs das áreas, se as
+                 subáreas contam, IDs das habilidades, papel, remunerado e
+                 visibilidade (só projetos), cursor da página anterior,
+                 tamanho da página, se as facetas são contadas (só na
+                 primeira página)
+
+        Saída: Esquema da página, com o cursor da seguinte
+
+        Exceções: Tipo, papel, filtro ou cursor inválidos
+    '''
+
+    if tipo not in _TIPOS:
+        raise HTTPException(status_code=400, detail="tipo de busca inválido")
+    if papel is not None and papel not in PAPEIS:
+        raise HTTPException(status_code=400, detail="papel inválido")
+    if tipo == PESSOA and (remunerado is not None or visibilidade is not None):
+        raise HTTPException(
+            status_code=400,
+            detail="remunerado e visibilidade valem apenas para projetos")
+
+    configuracao = _TIPOS[tipo]
+    tabela = configuracao["tabela"]
+    vaga = models.PessoaProjeto.__table__
+    tabela_papel = models.Papel.__table__
+    postgres = db.get_bind().dialect.name == "postgresql"
+
+    condicao_texto, relevancia = _texto(tipo, texto, pesos, postgres)
+    condicoes = [] if condicao_texto is None else [condicao_texto]
+
+    if areas_ids:
+        associacao, coluna = configuracao["areas"]
+        areas = hierarquia.descendentes(areas_ids) \
+            if subareas else list(areas_ids)
+        condicoes.append(exists().where(and_(
+            associacao.c[coluna] == tabela.c.id,
+            associacao.c.area_id.in_(areas),
+        )))
+
+    if habilidades_ids:
+        associacao, coluna = configuracao["habilidades"]
+        condicoes.append(exists().where(and_(
+            associacao.c[coluna] == tabela.c.id,
+            associacao.c.habilidade_id.in_(list(habilidades_ids)),
+        )))
+
+    if papel is not None and tipo == PESSOA:
+        condicoes.append(tabela.c[papel] == True)
+    elif papel is not None:
+        condicoes.append(exists().where(and_(
+            vaga.c.projeto_id == tabela.c.id,
+            vaga.c.papel_id == tabela_papel.c.id,
+            func.lower(tabela_papel.c.descricao) == papel,
+        )))
+
+    if remunerado is not None:
+        condicoes.append(exists().where(and_(
+            vaga.c.projeto_id == tabela.c.id,
+            vaga.c.remunerado == remunerado,
+        )))
+
+    if visibilidade is not None:
+        condicoes.append(tabela.c.visibilidade == visibilidade)
+
+    filtrados = select([tabela.c.id.label("id"), relevancia.label("relevancia")])
+    if condicoes:
+        filtrados = filtrados.where(and_(*condicoes))
+    filtrados = filtrados.cte("filtrados")
+
+    consulta_pagina = select([filtrados.c.id, filtrados.c.relevancia])
+    if cursor:
+        ultima_relevancia, ultimo_id = decodifica_cursor(cursor)
+        consulta_pagina = consulta_pagina.where(or_(
+            filtrados.c.relevancia < ultima_relevancia,
+            and_(filtrados.c.relevancia == ultima_relevancia,
+                 filtrados.c.id > ultimo_id),
+        ))
+    # uma linha a mais indica que há próxima página
+    pagina = consulta_pagina\
+        .order_by(filtrados.c.relevancia.desc(), filtrados.c.id)\
+        .limit(limit + 1)\
+        .cte("pagina")
+
+    membros = [
+        select(_linha(
+            "item",
+            id=tabela.c.id,
+            relevancia=pagina.c.relevancia,
+            nome=tabela.c.nome,
+            foto=tabela.c[configuracao["foto"]],
+            detalhe=tabela.c[configuracao["detalhe"]],
+        )).select_from(pagina.join(tabela, tabela.c.id == pagina.c.id))
+    ]
+
+    contar_facetas = facetas and not cursor
+    if contar_facetas:
+        for faceta, coluna_tag in (("areas", "area_id"),
+                                   ("habilidades", "habilidade_id")):
+            associacao, coluna = configuracao[faceta]
+            membros.append(
+                select(_linha(
+                    faceta,
+                    id=associacao.c[coluna_tag],
+                    quantidade=func.count(),
+                ))
+                .select_from(filtrados.join(
+                    associacao, associacao.c[coluna] == filtrados.c.id))
+                .group_by(associacao.c[coluna_tag])
+            )
+
+        if tipo == PESSOA:
+            membros += [
+                select(_linha("papeis", nome=nome, quantidade=func.count()))
+                .select_from(filtrados.join(
+                    tabela, tabela.c.id == filtrados.c.id))
+                .where(tabela.c[nome] == True)
+                for nome in PAPEIS
+            ]
+        else:
+            nome_papel = func.lower(tabela_papel.c.descricao)
+            membros.append(
+                select(_linha(
+                    "papeis",
+                    nome=nome_papel,
+                    quantidade=func.count(distinct(vaga.c.projeto_id)),
+                ))
+                .select_from(
+                    filtrados
+                    .join(vaga, vaga.c.projeto_id == filtrados.c.id)
+                    .join(tabela_papel, tabela_papel.c.id == vaga.c.papel_id))
+                .group_by(nome_papel)
+            )
+
+    consulta = union_all(*membros) if len(membros) > 1 else membros[0]
+
+    itens = []
+    contagens = schemas.Facetas() if contar_facetas else None
+    for linha in db.execute(consulta):
+        if linha.linha == "item":
+            itens.append(schemas.ResultadoBusca(
+                id=linha.id,
+                nome=linha.nome,
+                foto=linha.foto,
+                detalhe=linha.detalhe,
+                relevancia=linha.relevancia,
+            ))
+        elif linha.linha == "papeis":
+            contagens.papeis[linha.nome] = linha.quantidade
+        else:
+            getattr(contagens, linha.linha)[linha.id] = linha.quantidade
+
+    # a ordem das linhas de um UNION ALL não é garantida
+    itens.sort(key=lambda item: (-item.relevancia, item.id))
+    proximo = None
+    if len(itens) > limit:
+        itens = itens[:limit]
+        proximo = codifica_cursor(itens[-1].relevancia, itens[-1].id)
+
+    return schemas.PaginaBusca(itens=itens, proximo=proximo, facetas=contagens)
+
+
+def ids(db: Session, tipo: str, skip: int, limit: int, **filtros) -> t.List[int]:
+
+    '''
+        IDs dos resultados da busca a partir da posição skip, para as rotas
+        de pesquisa antigas, que devolvem os objetos completos
+
+        Entrada: tipo, paginação por posição, filtros de busca()
+
+        Saída: Lista de IDs, do mais relevante ao menos
+    '''
+
+    pagina = busca(db, tipo, limit=skip + limit, facetas=False, **filtros)
+    return [item.id for item in pagina.itens[skip:]]
+
+
+def em_ordem(consulta: Query, modelo, ids: t.List[int]) -> t.List:
+
+    '''
+        Carrega os objetos dos IDs com uma consulta, na ordem dos IDs
+    '''
+
+    if not ids:
+        return []
+    objetos = {
+        objeto.id: objeto for objeto in consulta.filter(modelo.id.in_(ids))
+    }
+    return [objetos[id] for id in ids if id in objetos]
@@ -4,35 +4,45 @@ import typing as t
 
 from app.db import models
 from app.db.pessoa import schemas
+from db.area import hierarquia
+from db.pesquisa import busca, textual
+from db.pesquisa.aproximada import busca as busca_aproximada
 
 def get_pessoa_by_name(
     db: Session,
     pessoa_name: str,
-    area_id: int
+    area_id: int,
+    aproximada: bool = False,
+    skip: int = 0,
+    limit: int = 100,
     ) -> t.List[schemas.Pessoa]:
 
     '''
-        Busca todas as Pessoas cujo nome contenha a string buscada
+        Busca todas as Pessoas cujo nome contenha as palavras buscadas
+        (busca textual, da mais relevante à menos) ou, na busca
+        aproximada, cujo nome se pareça com elas
 
-        Entrada: string
+        Entrada: string, ID da área (0 para todas; inclui as
+                 subáreas), se a busca é aproximada, paginação
 
         Saída: Lista de Esquemas da Pessoa correspondente
 
         Exceções: Não existe Pessoa correspondente à string inserida
     '''
 
-    if not area_id:
-        pessoa = db.query(models.Pessoa)\
-            .filter(models.Pessoa.nome.ilike(f'%{pessoa_name}%'))\
-            .all()
-    else:
-        pessoa = db.query(models.Pessoa)\
-            .join(models.Area, models.Pessoa.areas)\
-            .filter(models.Pessoa.nome.ilike(f'%{pessoa_name}%'))\
-            .filter(models.Area.id == area_id)\
-            .all()
+    if aproximada:
+        consulta = db.query(models.Pessoa)
+        if area_id:
+            # any() em vez de join: várias subáreas repetiriam a linha
+            consulta = consulta.filter(models.Pessoa.areas.any(
+                models.Area.id.in_(hierarquia.descendentes([area_id]))))
+        return busca_aproximada(
+            consulta, models.Pessoa, pessoa_name, skip, limit)
 
-    return pessoa
+    pessoas_ids = busca.ids(
+        db, busca.PESSOA, skip, limit, texto=pessoa_name, pesos="A",
+        areas_ids=[area_id] if area_id else [])
+    return busca.em_ordem(db.query(models.Pessoa), models.Pessoa, pessoas_ids)
 
 def get_pessoa_by_username(
     db: Session,
@@ -40,7 +50,8 @@ def get_pessoa_by_username(
     ) -> t.List[schemas.Pessoa]:
 
     '''
-        Busca todas as Pessoas cujo usuario contenha a string buscada
+        Busca todas as Pessoas cujo usuario contenha as palavras buscadas
+        (busca textual, da mais relevante à menos)
 
         Entrada: string
 
@@ -49,9 +60,8 @@ def get_pessoa_by_username(
         Exceções: Não existe Pessoa correspondente à string inserida
     '''
 
-    pessoa = db.query(models.Pessoa)\
-        .filter(models.Pessoa.usuario.ilike(f'%{pessoa_usuario}%'))\
-        .all()
+    pessoa = textual.busca(
+        db.query(models.Pessoa), models.Pessoa, pessoa_usuario, pesos="B")
 
     if not pessoa:
         raise HTTPException(status_code=404, detail="pessoa não encontrado")
@@ -61,23 +71,30 @@ def get_pessoa_by_username(
 
 def get_pessoa_by_area(
     db: Session,
-    pessoa_area: str
+    pessoa_area: str,
+    skip: int = 0,
+    limit: int = 100,
     ) -> t.List[schemas.Pessoa]:
     
     '''
         Busca todas as Pessoas que contenham uma área com a string buscada
 
-        Entrada: string
+        Entrada: string, paginação
 
         Saída: Lista de Esquemas da Pessoa correspondente
 
         Exceções: Não existe Pessoa correspondente à string inserida
     '''
     
-    pessoa = db.query(models.Pessoa)\
-        .join(models.Area, models.Pessoa.areas)\
-        .filter(models.Area.descricao.ilike(f'%{pessoa_area}%'))\
-        .all()
+    areas_ids = [
+        id for id, in db.query(models.Area.id)
+        .filter(models.Area.descricao.ilike(f'%{pessoa_area}%'))
+    ]
+    pessoas_ids = busca.ids(
+        db, busca.PESSOA, skip, limit, areas_ids=areas_ids, subareas=False) \
+        if areas_ids else []
+    pessoa = busca.em_ordem(
+        db.query(models.Pessoa), models.Pessoa, pessoas_ids)
     
     if not pessoa:
         raise HTTPException(status_code=404, detail="pessoa não encontrado")
@@ -86,23 +103,30 @@ def get_pessoa_by_area(
 
 def get_pessoa_by_habilidade(
     db: Session,
-    pessoa_habilidade: str
+    pessoa_habilidade: str,
+    skip: int = 0,
+    limit: int = 100,
     ) -> t.List[schemas.Pessoa]:
 
     '''
         Busca todas as Pessoas que contenham uma habilidade com a string buscada
 
-        Entrada: string
+        Entrada: string, paginação
 
         Saída: Lista de Esquemas da Pessoa correspondente
 
         Exceções: Não existe Pessoa correspondente à string inserida
     '''
 
-    pessoa = db.query(models.Pessoa)\
-        .join(models.Habilidades, models.Pessoa.habilidades)\
-        .filter(models.Habilidades.nome.ilike(f'%{pessoa_habilidade}%'))\
-        .all()
+    habilidades_ids = [
+        id for id, in db.query(models.Habilidades.id)
+        .filter(models.Habilidades.nome.ilike(f'%{pessoa_habilidade}%'))
+    ]
+    pessoas_ids = busca.ids(
+        db, busca.PESSOA, skip, limit, habilidades_ids=habilidades_ids) \
+        if habilidades_ids else []
+    pessoa = busca.em_ordem(
+        db.query(models.Pessoa), models.Pessoa, pessoas_ids)
     
     if not pessoa:
         raise HTTPException(status_code=404, detail="pessoa não encontrado")
@@ -4,55 +4,70 @@ import typing as t
 
 from app.db import models
 from app.db.projeto import schemas
+from db.area import hierarquia
+from db.pesquisa import busca
+from db.pesquisa.aproximada import busca as busca_aproximada
 
 def get_projeto_by_name(
     db: Session,
     projeto_name: str,
     area_id: int,
+    aproximada: bool = False,
+    skip: int = 0,
+    limit: int = 100,
     ) -> t.List[schemas.Projeto]:
 
     '''
-        Busca todos os projetos cujo nome contenha a string buscada
+        Busca todos os projetos cujo nome contenha as palavras buscadas
+        (busca textual, do mais relevante ao menos) ou, na busca
+        aproximada, cujo nome se pareça com elas
 
-        Entrada: string
+        Entrada: string, ID da área (0 para todas; inclui as
+                 subáreas), se a busca é aproximada, paginação
 
         Saída: Lista de Esquemas de Projetos correspondente
 
         Exceções: Não existem Projetos correspondentes à string inserida
     '''
 
-    if not area_id:
-        projeto = db.query(models.Projeto)\
-            .filter(models.Projeto.nome.ilike(f'%{projeto_name}%'))\
-            .all()
-    else:
-        projeto = db.query(models.Projeto)\
-            .join(models.Area, models.Projeto.areas)\
-            .filter(models.Projeto.nome.ilike(f'%{projeto_name}%'))\
-            .filter(models.Area.id == area_id)\
-            .all()
+    if aproximada:
+        consulta = db.query(models.Projeto)
+        if area_id:
+            # any() em vez de join: várias subáreas repetiriam a linha
+            consulta = consulta.filter(models.Projeto.areas.any(
+                models.Area.id.in_(hierarquia.descendentes([area_id]))))
+        return busca_aproximada(
+            consulta, models.Projeto, projeto_name, skip, limit)
 
-    return projeto
+    projetos_ids = busca.ids(
+        db, busca.PROJETO, skip, limit, texto=projeto_name, pesos="A",
+        areas_ids=[area_id] if area_id else [])
+    return busca.em_ordem(
+        db.query(models.Projeto), models.Projeto, projetos_ids)
 
 
 def get_projeto_by_objective(
     db: Session,
-    projeto_objective: str
+    projeto_objective: str,
+    skip: int = 0,
+    limit: int = 100,
     ) -> t.List[schemas.Projeto]:
 
     '''
-        Busca todos os projetos cujo objetivo contenha a string buscada
+        Busca todos os projetos cujo objetivo contenha as palavras buscadas
+        (busca textual, do mais relevante ao menos)
 
-        Entrada: string
+        Entrada: string, paginação
 
         Saída: Lista de Esquemas de Projetos correspondente
 
         Exceções: Não existem Projetos correspondentes à string inserida
     '''
 
-    projeto = db.query(models.Projeto)\
-        .filter(models.Projeto.objetivo.ilike(f'%{projeto_objective}%'))\
-        .all()
+    projetos_ids = busca.ids(
+        db, busca.PROJETO, skip, limit, texto=projeto_objective, pesos="B")
+    projeto = busca.em_ordem(
+        db.query(models.Projeto), models.Projeto, projetos_ids)
 
     if not projeto:
         raise HTTPException(status_code=404, detail="projeto não encontrado")
@@ -62,23 +77,30 @@ def get_projeto_by_objective(
 
 def get_projeto_by_area(
     db: Session,
-    projeto_area: str
+    projeto_area: str,
+    skip: int = 0,
+    limit: int = 100,
     ) -> t.List[schemas.Projeto]:
 
     '''
         Busca todos os projetos que contenham uma área com a string buscada
 
-        Entrada: string
+        Entrada: string, paginação
 
         Saída: Lista de Esquemas de Projetos correspondente
 
         Exceções: Não existem Projetos correspondentes à string inserida
     '''
 
-    projeto = db.query(models.Projeto)\
-        .join(models.Area, models.Projeto.areas)\
-        .filter(models.Area.descricao.ilike(f'%{projeto_area}%'))\
-        .all()
+    areas_ids = [
+        id for id, in db.query(models.Area.id)
+        .filter(models.Area.descricao.ilike(f'%{projeto_area}%'))
+    ]
+    projetos_ids = busca.ids(
+        db, busca.PROJETO, skip, limit, areas_ids=areas_ids, subareas=False) \
+        if areas_ids else []
+    projeto = busca.em_ordem(
+        db.query(models.Projeto), models.Projeto, projetos_ids)
     
     if not projeto:
         raise HTTPException(status_code=404, detail="projeto não encontrado")
@@ -88,23 +110,30 @@ def get_projeto_by_area(
 
 def get_projeto_by_habilidade(
     db: Session, 
-    projeto_habilidade: str
+    projeto_habilidade: str,
+    skip: int = 0,
+    limit: int = 100,
     ) -> t.List[schemas.Projeto]:
 
     '''
         Busca todos os projetos que contenham uma habilidade com a string buscada
 
-        Entrada: string
+        Entrada: string, paginação
 
         Saída: Lista de Esquemas de Projetos correspondente
 
         Exceções: Não existem Projetos correspondentes à string inserida
     '''
 
-    projeto = db.query(models.Projeto)\
-        .join(models.Habilidades, models.Projeto.habilidades)\
-        .filter(models.Habilidades.nome.ilike(f'%{projeto_habilidade}%'))\
-        .all()
+    habilidades_ids = [
+        id for id, in db.query(models.Habilidades.id)
+        .filter(models.Habilidades.nome.ilike(f'%{projeto_habilidade}%'))
+    ]
+    projetos_ids = busca.ids(
+        db, busca.PROJETO, skip, limit, habilidades_ids=habilidades_ids) \
+        if habilidades_ids else []
+    projeto = busca.em_ordem(
+        db.query(models.Projeto), models.Projeto, projetos_ids)
     
     if not projeto:
         raise HTTPException(status_code=404, detail="projeto não encontrado")
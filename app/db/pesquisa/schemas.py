@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+import typing as t
+
+
+class ResultadoBusca(BaseModel):
+    id: int
+    nome: t.Optional[str] = None
+    foto: t.Optional[str] = None
+    # usuario da pessoa ou objetivo do projeto
+    detalhe: t.Optional[str] = None
+    relevancia: float
+
+
+class Facetas(BaseModel):
+    # {id ou nome: quantidade de resultados}
+    areas: t.Dict[int, int] = {}
+    habilidades: t.Dict[int, int] = {}
+    papeis: t.Dict[str, int] = {}
+
+
+class PaginaBusca(BaseModel):
+    itens: t.List[ResultadoBusca]
+    # cursor da próxima página, None na última
+    proximo: t.Optional[str] = None
+    # só na primeira página
+    facetas: t.Optional[Facetas] = None
+
+
+class Sugestao(BaseModel):
+    id: int
+    nome: str
+    # em quantas pessoas, projetos e vagas a área ou habilidade aparece
+    uso: int
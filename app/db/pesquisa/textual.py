@@ -0,0 +1,95 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Query, selectinload
+import typing as t
+
+from db.utils import busca_textual
+
+# Campos de cada tabela por peso, usados pela busca em memória; no Postgres
+# a mesma divisão está no tsvector (db/utils/busca_textual.py)
+CAMPOS = {
+    "tb_pessoa": {
+        "A": ("nome",),
+        "B": ("usuario",),
+        "C": ("areas", "habilidades"),
+    },
+    "tb_projeto": {
+        "A": ("nome",),
+        "B": ("objetivo",),
+        "C": ("descricao",),
+        "D": ("areas", "habilidades"),
+    },
+}
+
+TAGS = ("areas", "habilidades")
+
+
+def _texto(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, str):
+        return valor
+    # lista de áreas (descricao) ou de habilidades (nome)
+    return " ".join(
+        getattr(tag, "descricao", None) or getattr(tag, "nome", None) or ""
+        for tag in valor
+    )
+
+
+def _busca_memoria(consulta: Query, modelo, texto: str, pesos: str):
+    campos = {
+        peso: atributos
+        for peso, atributos in CAMPOS[modelo.__tablename__].items()
+        if not pesos or peso in pesos
+    }
+    tags = {atributo for atributos in campos.values()
+            for atributo in atributos if atributo in TAGS}
+    if tags:
+        consulta = consulta.options(
+            *(selectinload(getattr(modelo, tag)) for tag in tags))
+
+    lista = busca_textual.termos(texto)
+    pontuados = []
+    for objeto in consulta.all():
+        pontuacao = busca_textual.pontua(lista, {
+            peso: [_texto(getattr(objeto, atributo)) for atributo in atributos]
+            for peso, atributos in campos.items()
+        })
+        if pontuacao:
+            pontuados.append((-pontuacao, objeto.id, objeto))
+
+    pontuados.sort(key=lambda item: item[:2])
+    return [objeto for _, _, objeto in pontuados]
+
+
+def busca(
+    consulta: Query,
+    modelo,
+    texto: str,
+    pesos: str = "",
+) -> t.List:
+
+    '''
+        Busca textual em pessoas ou projetos, ordenada por relevância. No
+        Postgres usa a coluna busca (tsvector com índice GIN); nos outros
+        bancos filtra em memória com as mesmas regras: todos os termos,
+        como prefixo, sem diferenciar acentos e maiúsculas
+
+        Entrada: consulta de models.Pessoa ou models.Projeto (com outros
+                 filtros já aplicados), modelo, texto digitado, pesos dos
+                 campos considerados ("" para todos)
+
+        Saída: Lista dos objetos encontrados, do mais relevante ao menos
+    '''
+
+    if consulta.session.get_bind().dialect.name != "postgresql":
+        return _busca_memoria(consulta, modelo, texto, pesos)
+
+    texto_tsquery = busca_textual.tsquery(texto, pesos)
+    if texto_tsquery is None:
+        return []
+
+    tsquery = func.to_tsquery(busca_textual.CONFIGURACAO, texto_tsquery)
+    return consulta\
+        .filter(modelo.busca.op("@@")(tsquery))\
+        .order_by(func.ts_rank(modelo.busca, tsquery).desc(), modelo.id)\
+        .all()
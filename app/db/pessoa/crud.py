@@ -1,25 +1,48 @@
 from fastapi import HTTPException, UploadFile
+from itertools import groupby
+from operator import itemgetter
+from sqlalchemy import exists, literal, select, union_all
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
 import typing as t
 import datetime
+import random
 
 from db import models
+from db.utils.carregamento import carrega
 from db.utils.extract_areas import append_areas
 from db.utils.extract_habilidade import append_habilidades
 from . import schemas
 from core.security.passwords import get_password_hash
 from db.utils.salvar_imagem import store_image, delete_file
+from db.ranking_vaga.crud import get_tags_pessoa, invalida_ranking_pessoa
+from db.utils.pesos_tags import atualiza_estatisticas_pessoa
+from db.utils.indice_texto import remove_pessoa_texto
+from db.utils.indice_tags import (
+    AREA,
+    HABILIDADE,
+    retrato_pessoa,
+    atualiza_indice_pessoa,
+    remove_pessoa_indice,
+)
+
+# Refatorar futuramente para não utilizarmos números fixos no código.
+PAPEIS_PESSOA = {
+    1: models.Pessoa.aliado,
+    2: models.Pessoa.colaborador,
+    3: models.Pessoa.idealizador,
+}
 
 def get_rand_pessoas(
     db: Session,
-    qtde: dict
+    qtde: dict,
+    perfil: t.Optional[str] = None
     ) -> t.List[schemas.Pessoa]:
 
     '''
         Busca Pessoas aleatoriamente baseado no tipo de papel
 
-        Entrada: dict {papel: quantidade}
+        Entrada: dict {papel: quantidade}, perfil de carregamento
 
         Saída: Lista de Esquemas de Pessoas 
 
@@ -29,13 +52,13 @@ def get_rand_pessoas(
 
     for key in qtde:
         if key == "aliado":
-            pessoasAliado = db.query(models.Pessoa)\
+            pessoasAliado = carrega(db.query(models.Pessoa), perfil)\
                 .filter(models.Pessoa.aliado == True)\
                 .order_by(func.random())\
                 .limit(qtde[key])\
                 .all()
         elif key == "colaborador":
-            pessoasColab = db.query(models.Pessoa)\
+            pessoasColab = carrega(db.query(models.Pessoa), perfil)\
                 .filter(models.Pessoa.colaborador == True)\
                 .order_by(func.random())\
                 .limit(qtde[key])\
@@ -72,20 +95,21 @@ async def edit_foto_pessoa(
 
 def get_pessoa_by_id(
     db: Session,
-    pessoa_id: int
+    pessoa_id: int,
+    perfil: t.Optional[str] = None
     ) -> schemas.PessoaOut:
 
     '''
         Busca pessoa pelo ID
 
-        Entrada: ID
+        Entrada: ID, perfil de carregamento
 
         Saída: Esquema da Pessoa referente
 
         Exceções: Não existe Pessoa correspondente ao ID inserido
     '''
 
-    pessoa = db.query(models.Pessoa)\
+    pessoa = carrega(db.query(models.Pessoa), perfil)\
         .filter(models.Pessoa.id == pessoa_id)\
         .first()
     
@@ -97,20 +121,21 @@ def get_pessoa_by_id(
 
 def get_pessoa_by_email(
     db: Session,
-    email: str
+    email: str,
+    perfil: t.Optional[str] = None
     ) -> schemas.Pessoa:
 
     '''
         Busca pessoa pelo email exatamente como digitado
 
-        Entrada: string
+        Entrada: string, perfil de carregamento
 
         Saída: Esquema da Pessoa referente
 
         Exceções: Não existe Pessoa correspondente ao email inserido
     '''
 
-    pessoa = db.query(models.Pessoa)\
+    pessoa = carrega(db.query(models.Pessoa), perfil)\
         .filter(models.Pessoa.email == email)\
         .first()
 
@@ -119,20 +144,21 @@ def get_pessoa_by_email(
 
 def get_pessoa_by_username(
     db: Session,
-    usuario: str
+    usuario: str,
+    perfil: t.Optional[str] = None
     ) -> schemas.Pessoa:
     
     '''
         Busca pessoa pelo usuário exatamente como digitado
 
-        Entrada: string
+        Entrada: string, perfil de carregamento
 
         Saída: Esquema da Pessoa referente
 
         Exceções: 
     '''
 
-    pessoa = db.query(models.Pessoa)\
+    pessoa = carrega(db.query(models.Pessoa), perfil)\
         .filter(models.Pessoa.usuario == usuario)\
         .first()
 
@@ -142,20 +168,21 @@ def get_pessoa_by_username(
 def get_pessoas(
     db: Session,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    perfil: t.Optional[str] = None
     ) -> t.List[schemas.Pessoa]:
 
     '''
         Busca todas as pessoas
 
-        Entrada:
+        Entrada: paginação, perfil de carregamento
 
         Saída: Lista de Esquemas de Pessoas
 
         Exceções: 
     '''
 
-    pessoas = db.query(models.Pessoa)\
+    pessoas = carrega(db.query(models.Pessoa), perfil)\
         .offset(skip)\
         .limit(limit)\
         .all()
@@ -163,50 +190,145 @@ def get_pessoas(
     return pessoas
 
 
-def get_pessoas_by_papel(
+def get_candidatos_by_papel(
     db: Session,
     papel_id: int,
-    pessoas_selecionadas_ids: t.List[int]
-    ) -> t.List[schemas.Pessoa]:
+    pessoas_ignoradas_ids: t.Iterable[int] = (),
+    habilidades_ids: t.Iterable[int] = (),
+    areas_ids: t.Iterable[int] = ()
+    ) -> t.List[t.Tuple[int, t.Tuple[t.Tuple[str, int], ...]]]:
 
     '''
-        Busca pessoas pelo papel
+        Busca as pessoas candidatas de um papel que possuem alguma das
+        habilidades ou áreas informadas, junto com as tags coincidentes,
+        sem carregar entidades do ORM. Para completar com pessoas sem
+        coincidência, use get_candidatos_aleatorios
 
-        Entrada: ID 
+        Entrada: ID do papel, IDs das pessoas ignoradas, IDs das
+                 habilidades e das áreas buscadas
 
-        Saída: Lista de Esquemas da Pessoa referente
+        Saída: Lista de (pessoa_id, ((tipo, tag_id), ...)) ordenada pelo
+               ID da pessoa, onde tipo é HABILIDADE ou AREA
 
-        Exceções:
+        Exceções: Papel não encontrado
+    '''
+
+    if papel_id not in PAPEIS_PESSOA:
+        raise HTTPException(status_code=404, detail="papel não encontrado")
+
+    pessoas_ignoradas_ids = list(pessoas_ignoradas_ids)
+    habilidades_ids = list(habilidades_ids)
+    areas_ids = list(areas_ids)
+
+    def candidata(pessoa_id):
+        # semi-join com a pessoa: filtra pelo papel sem multiplicar linhas
+        condicao = exists().where(models.Pessoa.id == pessoa_id)\
+            .where(PAPEIS_PESSOA[papel_id] == True)
+        if pessoas_ignoradas_ids:
+            condicao = condicao.where(
+                models.Pessoa.id.notin_(pessoas_ignoradas_ids))
+        return condicao
+
+    if not habilidades_ids and not areas_ids:
+        return []
+
+    consultas = []
+    if habilidades_ids:
+        tabela = models.HabilidadesPessoa
+        consultas.append(
+            select([
+                tabela.c.pessoa_id.label("pessoa_id"),
+                literal(HABILIDADE).label("tipo"),
+                tabela.c.habilidade_id.label("tag_id"),
+            ])
+            .where(tabela.c.habilidade_id.in_(habilidades_ids))
+            .where(candidata(tabela.c.pessoa_id))
+        )
+    if areas_ids:
+        tabela = models.PessoaArea
+        consultas.append(
+            select([
+                tabela.c.pessoa_id.label("pessoa_id"),
+                literal(AREA).label("tipo"),
+                tabela.c.area_id.label("tag_id"),
+            ])
+            .where(tabela.c.area_id.in_(areas_ids))
+            .where(candidata(tabela.c.pessoa_id))
+        )
+
+    coincidencias = union_all(*consultas).alias("coincidencias")
+    linhas = db.execute(
+        select([coincidencias]).order_by(coincidencias.c.pessoa_id)
+    )
+
+    return [
+        (pessoa_id, tuple((tipo, tag_id) for _, tipo, tag_id in tags))
+        for pessoa_id, tags in groupby(linhas, key=itemgetter(0))
+    ]
+
+
+def get_candidatos_aleatorios(
+    db: Session,
+    papel_id: int,
+    pessoas_excluidas_ids: t.Iterable[int] = (),
+    quantidade: int = 10
+    ) -> t.List[int]:
+
+    '''
+        Sorteia pessoas candidatas de um papel para completar sugestões
+        sem coincidências. Em vez de ordenar todas as candidatas ao acaso,
+        percorre a chave primária a partir de um ID sorteado, voltando ao
+        início se preciso, e para ao juntar a quantidade pedida
+
+        Entrada: ID do papel, IDs das pessoas que não podem ser
+                 sorteadas, quantidade de pessoas
+
+        Saída: Lista de IDs, com no máximo a quantidade pedida
+
+        Exceções: Papel não encontrado
     '''
 
-    # Refatorar futuramente para não utilizarmos números fixos no código.
-    if (papel_id == 1):
-        return db.query(models.Pessoa)\
-            .filter(models.Pessoa.aliado == True)\
-            .filter(models.Pessoa.id.notin_(pessoas_selecionadas_ids))\
-            .filter((models.Area != '') | (models.Habilidades != ''))\
-            .join(models.Habilidades, models.Pessoa.habilidades, full=True, isouter=True)\
-            .join(models.Area, models.Pessoa.areas, full=True, isouter=True)\
-            .order_by(func.random())\
-            .distinct()
-    elif (papel_id == 2):
-        return db.query(models.Pessoa)\
-            .filter(models.Pessoa.colaborador == True)\
-            .filter(models.Pessoa.id.notin_(pessoas_selecionadas_ids))\
-            .filter((models.Area != '') | (models.Habilidades != ''))\
-            .join(models.Habilidades, models.Pessoa.habilidades, full=True, isouter=True)\
-            .join(models.Area, models.Pessoa.areas, full=True, isouter=True)\
-            .order_by(func.random())\
-            .distinct()
-    elif (papel_id == 3):
-        return db.query(models.Pessoa)\
-            .filter(models.Pessoa.idealizador == True)\
-            .filter(models.Pessoa.id.notin_(pessoas_selecionadas_ids))\
-            .filter((models.Area != '') | (models.Habilidades != ''))\
-            .join(models.Habilidades, models.Pessoa.habilidades, full=True, isouter=True)\
-            .join(models.Area, models.Pessoa.areas, full=True, isouter=True)\
-            .order_by(func.random())\
-            .distinct()
+    if papel_id not in PAPEIS_PESSOA:
+        raise HTTPException(status_code=404, detail="papel não encontrado")
+
+    if quantidade <= 0:
+        return []
+
+    menor, maior = db.query(
+        func.min(models.Pessoa.id), func.max(models.Pessoa.id)).one()
+    if menor is None:
+        return []
+
+    tem_habilidade = exists().where(
+        models.HabilidadesPessoa.c.pessoa_id == models.Pessoa.id)
+    tem_area = exists().where(
+        models.PessoaArea.c.pessoa_id == models.Pessoa.id)
+
+    consulta = db.query(models.Pessoa.id)\
+        .filter(PAPEIS_PESSOA[papel_id] == True)\
+        .filter(tem_habilidade | tem_area)
+
+    pessoas_excluidas_ids = list(pessoas_excluidas_ids)
+    if pessoas_excluidas_ids:
+        consulta = consulta.filter(
+            models.Pessoa.id.notin_(pessoas_excluidas_ids))
+
+    inicio = random.randint(menor, maior)
+    sorteadas = [
+        pessoa_id for pessoa_id, in consulta
+        .filter(models.Pessoa.id >= inicio)
+        .order_by(models.Pessoa.id)
+        .limit(quantidade)
+    ]
+    if len(sorteadas) < quantidade:
+        sorteadas += [
+            pessoa_id for pessoa_id, in consulta
+            .filter(models.Pessoa.id < inicio)
+            .order_by(models.Pessoa.id)
+            .limit(quantidade - len(sorteadas))
+        ]
+
+    return sorteadas
 
 
 def create_pessoa(
@@ -245,6 +367,8 @@ def create_pessoa(
     db.commit()
     db.refresh(db_pessoa)
 
+    atualiza_indice_pessoa(db_pessoa)
+
     return db_pessoa
 
 
@@ -264,11 +388,17 @@ def delete_pessoa(
     '''
 
     pessoa = get_pessoa_by_id(db, pessoa_id)
+    retrato_anterior = retrato_pessoa(pessoa)
+    tags_anteriores = get_tags_pessoa(db, pessoa_id)
     
     db.delete(pessoa)
     delete_file(pessoa.foto_perfil)
     db.commit()
 
+    remove_pessoa_indice(pessoa_id, retrato_anterior)
+    atualiza_estatisticas_pessoa(tags_anteriores, ((), ()))
+    remove_pessoa_texto(pessoa_id)
+
     return pessoa
 
 
@@ -287,12 +417,20 @@ async def edit_pessoa(
 
         Exceções: Pessoa não encontrada
                 : Email já cadastrado
+                : Áreas ou habilidades não encontradas
     '''
 
     db_pessoa = get_pessoa_by_id(db, pessoa_id)
+    retrato_anterior = retrato_pessoa(db_pessoa)
     
     update_data = pessoa.dict(exclude_unset=True)
 
+    # tags e papeis alteram a similaridade da pessoa com as vagas
+    altera_ranking = bool(update_data.keys() & {
+        "habilidades", "areas", "aliado", "colaborador", "idealizador"})
+    if altera_ranking:
+        habilidades_anteriores, areas_anteriores = get_tags_pessoa(db, pessoa_id)
+
     if "senha" in update_data.keys():
         update_data["senha"] = get_password_hash(pessoa.senha)
     if "email" in update_data.keys():
@@ -310,6 +448,21 @@ async def edit_pessoa(
     db.commit()
     db.refresh(db_pessoa)
 
+    atualiza_indice_pessoa(db_pessoa, retrato_anterior)
+
+    if altera_ranking:
+        habilidades_atuais, areas_atuais = get_tags_pessoa(db, pessoa_id)
+        atualiza_estatisticas_pessoa(
+            (habilidades_anteriores, areas_anteriores),
+            (habilidades_atuais, areas_atuais),
+        )
+        invalida_ranking_pessoa(
+            db,
+            pessoa_id,
+            habilidades_anteriores | habilidades_atuais,
+            areas_anteriores | areas_atuais,
+        )
+
     return db_pessoa
 
 async def edit_senha_pessoa(
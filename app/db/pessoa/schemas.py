@@ -8,6 +8,7 @@ from db.experiencia.schemas import (
     ExperienciaProf,
     ExperienciaProj,
 )
+from db.utils import carregamento
 
 
 class PessoaBase(BaseModel):
@@ -36,6 +37,7 @@ class PessoaOut(PessoaBase):
     
     class Config:
         orm_mode = True
+        perfil = carregamento.PESSOA_COMPLETA
 
 
 class PessoaCreate(PessoaBase):
@@ -71,6 +73,7 @@ class Pessoa(PessoaBase):
 
     class Config:
         orm_mode = True
+        perfil = carregamento.PESSOA
 
 
 class Token(BaseModel):
@@ -4,12 +4,11 @@ from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
 import typing as t
 
+from core import config
 from db import models
 from db.pessoa.schemas import Pessoa
-from db.reacoes.schemas import ReacoesCreate
 from . import schemas
-from db.reacoes.crud import checa_existe_reacao
-from db.pessoa.crud import get_pessoa_by_id, get_pessoas_by_papel
+from db.pessoa.crud import get_pessoa_by_id
 from db.projeto.crud import get_projeto, edit_finalizado_projeto
 from db.notificacao.crud import (
     notificacao_pendente_colaborador,
@@ -18,26 +17,47 @@ from db.notificacao.crud import (
     get_notificacao_by_pessoa_projeto
 )
 from db.ignorados.crud import add_pessoa_ignorada, get_ids_pessoa_ignorada_by_vaga
+from db.utils.carregamento import carrega, VAGA
 from db.utils.extract_areas import append_areas
 from db.utils.extract_habilidade import append_habilidades
-from db.utils.similaridade import calcula_similaridade_vaga_pessoa
+from db.utils.similaridade import pontua_candidatos_vaga
+from db.utils.indice_texto import indice_texto_ativo
+from db.utils.unidade_match import UnidadeMatch
+from db.ranking_vaga.crud import (
+    get_proximo_candidato,
+    salva_ranking,
+    invalida_ranking_vagas,
+)
+from db.utils.matriz_similaridade import (
+    calcula_matriz_projeto,
+    atribui_gulosa,
+    atribui_otima,
+)
+
+ATRIBUICAO_GULOSA = "greedy"
+ATRIBUICAO_OTIMA = "optimal"
+ATRIBUICOES = {
+    ATRIBUICAO_GULOSA: atribui_gulosa,
+    ATRIBUICAO_OTIMA: atribui_otima,
+}
 
 
 def get_pessoa_projeto(
     db: Session,
-    pessoa_projeto_id: int
+    pessoa_projeto_id: int,
+    perfil: t.Optional[str] = None
 ) -> schemas.PessoaProjeto:
     '''
         Busca pessoa_projeto pelo ID
 
-        Entrada: ID
+        Entrada: ID, perfil de carregamento
 
         Saída: Esquema da PessoaProjeto referente
 
         Exceções: Não existe PessoaProjeto correspondente ao ID inserido
     '''
 
-    pessoa_projeto = db.query(models.PessoaProjeto)\
+    pessoa_projeto = carrega(db.query(models.PessoaProjeto), perfil)\
         .filter(models.PessoaProjeto.id == pessoa_projeto_id)\
         .first()
 
@@ -50,20 +70,21 @@ def get_pessoa_projeto(
 
 
 async def get_all_pessoas_projeto(
-    db: Session
+    db: Session,
+    perfil: t.Optional[str] = None
 ) -> t.List[schemas.PessoaProjeto]:
 
     '''
         Busca todas as PessoasProjeto
 
-        Entrada:
+        Entrada: perfil de carregamento
 
         Saída: Lista de Esquemas de PessoaProjeto
 
         Exceções: Não existem PessoaProjetos cadastrados
     '''
 
-    pessoas_projeto = db.query(models.PessoaProjeto)\
+    pessoas_projeto = carrega(db.query(models.PessoaProjeto), perfil)\
         .all()
 
     if not pessoas_projeto:
@@ -77,198 +98,104 @@ async def get_all_pessoas_projeto(
 async def get_similaridade_projeto(
     db: Session,
     pessoa_logada: Pessoa,
-    id_projeto: int
+    id_projeto: int,
+    atribuicao: str = ATRIBUICAO_GULOSA
 ):
 
     '''
+        Seleciona a pessoa mais similar para cada vaga aberta do projeto,
+        sem repetir pessoas entre as vagas. A atribuição gulosa preenche as
+        vagas em ordem; a ótima maximiza a similaridade total
 
-    '''
-    await edit_finalizado_projeto(db, id_projeto, False)
-    pessoas_vagas = {}
-    pessoas = False
-    # Com o id do projeto, buscar as vagas disponíveis
-    vagas_projeto = await get_vagas_by_projeto(db, id_projeto)
-    similaridades_retorno = {}
+        Entrada: pessoa logada, ID do projeto, modo de atribuição
 
-    # futuramente implementar na nova tabela
-    pessoas_selecionadas = []
+        Saída: Dicionário {vaga_id: Pessoa selecionada}
 
-    # Iterar em cada vaga, buscando o papel
-    for vaga in vagas_projeto:
-
-        # Extração de informações de habilidades e áreas da vaga
-        habilidades_areas_vaga = []
-
-        habilidades_projeto = vaga.habilidades
-
-        areas_projeto = vaga.areas
-
-        for habilidade_projeto in habilidades_projeto:
-            habilidades_areas_vaga.append(habilidade_projeto.nome)
-
-        # organiza somente as habilidades em ordem alfabética
-        habilidades_areas_vaga.sort()
-
-        areas_vaga = []
-
-        for area_projeto in areas_projeto:
-            areas_vaga.append(area_projeto.descricao)
+        Exceções: Modo de atribuição inválido
+                : Areas e Habilidades não encontradas para vaga
+                : Pessoas não encontradas
+    '''
 
-        # organiza somente as areas em ordem alfabética
-        areas_vaga.sort()
+    if atribuicao not in ATRIBUICOES:
+        raise HTTPException(
+            status_code=400, detail="modo de atribuição inválido")
 
-        # junta as áreas e habilidades
-        habilidades_areas_vaga = habilidades_areas_vaga + areas_vaga
+    # Com o id do projeto, buscar as vagas disponíveis
+    vagas_projeto = await get_vagas_by_projeto(db, id_projeto, VAGA)
 
-        if not habilidades_areas_vaga:
+    for vaga in vagas_projeto:
+        if not vaga.habilidades and not vaga.areas:
             raise HTTPException(
                 status_code=404, detail="Areas e Habilidades não encontradas para vaga")
 
-        # ignora o dono da vaga
-        pessoas_ignoradas_ids = get_ids_pessoa_ignorada_by_vaga(db, vaga.id)
-
-        pessoas = get_pessoas_by_papel(
-            db, vaga.papel_id, pessoas_ignoradas_ids)
-
-        similaridades_pessoa = {}
-
-        for pessoa in pessoas:
-            if pessoa not in similaridades_pessoa and pessoa.id not in pessoas_selecionadas:
-                habilidades_areas_pessoa = []
-
-                habilidades = pessoa.habilidades
-                areas = pessoa.areas
-
-                for habilidade in habilidades:
-                    habilidades_areas_pessoa.append(habilidade.nome)
-
-                habilidades_areas_pessoa.sort()
-
-                areas_pessoa = []
-                for area in areas:
-                    areas_pessoa.append(area.descricao)
-
-                areas_pessoa.sort()
-                habilidades_areas_pessoa = habilidades_areas_pessoa + areas_pessoa
-
-                reacao = ReacoesCreate(pessoa_id=pessoa.id, projeto_id=vaga.projeto_id, reacao='INTERESSE')
-                tem_interesse = checa_existe_reacao(db, reacao)
-
-                similaridades_pessoa[pessoa] = calcula_similaridade_vaga_pessoa(
-                    habilidades_areas_vaga,
-                    habilidades_areas_pessoa,
-                    tem_interesse
-                )
-
-        similaridades_retorno = dict(
-            sorted(similaridades_pessoa.items(), key=lambda item: item[1], reverse=True))
+    if not vagas_projeto:
+        raise HTTPException(status_code=404, detail="pessoas não encontradas")
 
-        pessoa_selecionada = next(iter(similaridades_retorno))
-        await atualiza_match_vaga(db, vaga, pessoa_selecionada, pessoa_logada.id)
+    # similaridades de todas as vagas calculadas de uma só vez
+    matriz = calcula_matriz_projeto(db, id_projeto, vagas_projeto)
+    selecionadas = ATRIBUICOES[atribuicao](matriz)
 
-        pessoas_vagas[vaga.id] = pessoa_selecionada
+    if not selecionadas:
+        raise HTTPException(status_code=404, detail="pessoas não encontradas")
 
-        add_pessoa_ignorada(db, pessoa_selecionada.id, vaga.id)
-        pessoas_selecionadas.append(pessoa_selecionada.id)
+    # vagas preenchidas, ignorados e o projeto gravados em um só commit
+    unidade = UnidadeMatch(db, id_projeto)
+    for vaga in vagas_projeto:
+        if vaga.id in selecionadas:
+            unidade.seleciona(vaga, selecionadas[vaga.id])
 
-    if not pessoas:
-        raise HTTPException(status_code=404, detail="pessoas não encontradas")
+    pessoas = unidade.pessoas()
+    unidade.aplica()
 
-    return pessoas_vagas
+    return {
+        vaga_id: pessoas[pessoa_id]
+        for vaga_id, pessoa_id in selecionadas.items()
+    }
 
 
 async def get_similaridade_vaga(
     db: Session,
-    pessoa_logada: Pessoa,
     vaga_id: int
 ):
-    
-    pessoas_vagas = {}
 
     # busca a vaga solicitada
-    vaga = get_pessoa_projeto(db, vaga_id)
-    await edit_finalizado_projeto(db, vaga.projeto_id, False)
+    vaga = get_pessoa_projeto(db, vaga_id, VAGA)
 
     if vaga.situacao == "PENDENTE_COLABORADOR" or vaga.situacao == "ACEITO" or vaga.situacao == "FINALIZADO":
+        # como antes, pedir um candidato reabre o projeto mesmo quando a
+        # vaga já está preenchida; nos outros casos a reabertura vai no
+        # commit da UnidadeMatch
+        await edit_finalizado_projeto(db, vaga.projeto_id, False)
         return {}
 
-    similaridades_retorno = {}
-
-    # ignora o dono da vaga
-    pessoas_ignoradas_ids = get_ids_pessoa_ignorada_by_vaga(db, vaga_id)
-
-    # Extração de informações de habilidades e áreas da vaga
-    habilidades_areas_vaga = []
-
-    habilidades_vaga = vaga.habilidades
-
-    areas_vaga = vaga.areas
-
-    for habilidade_vaga in habilidades_vaga:
-        habilidades_areas_vaga.append(habilidade_vaga.nome)
-
-    # organiza somente as habilidades em ordem alfabética
-    habilidades_areas_vaga.sort()
-
-    areas_vaga = []
-
-    for area_vaga in areas_vaga:
-        areas_vaga.append(area_vaga.descricao)
-
-    # organiza somente as areas em ordem alfabética
-    areas_vaga.sort()
-
-    # junta as áreas e habilidades
-    habilidades_areas_vaga = habilidades_areas_vaga + areas_vaga
-
-    if not habilidades_areas_vaga:
+    if not vaga.habilidades and not vaga.areas:
         raise HTTPException(
             status_code=404, detail="Areas e Habilidades não encontradas para vaga")
 
-    # Precisamos criar um filtro para buscar somente pessoas que ainda não foram selecionadas
-    pessoas = get_pessoas_by_papel(db, vaga.papel_id, pessoas_ignoradas_ids)
-
-    similaridades_pessoa = {}
-
-    for pessoa in pessoas:
-        if pessoa not in similaridades_pessoa:
-            habilidades_areas_pessoa = []
-
-            habilidades = pessoa.habilidades
-            areas = pessoa.areas
-
-            for habilidade in habilidades:
-                habilidades_areas_pessoa.append(habilidade.nome)
-
-            habilidades_areas_pessoa.sort()
-
-            areas_pessoa = []
-            for area in areas:
-                areas_pessoa.append(area.descricao)
-
-            areas_pessoa.sort()
-            habilidades_areas_pessoa = habilidades_areas_pessoa + areas_pessoa
-
-            reacao = ReacoesCreate(pessoa_id=pessoa.id, projeto_id=vaga.projeto_id, reacao='INTERESSE')
-            tem_interesse = checa_existe_reacao(db, reacao)
-
-            similaridades_pessoa[pessoa] = calcula_similaridade_vaga_pessoa(
-                habilidades_areas_vaga,
-                habilidades_areas_pessoa,
-                tem_interesse
-            )
-
-    similaridades_retorno = dict(
-        sorted(similaridades_pessoa.items(), key=lambda item: item[1], reverse=True))
+    # ignora o dono da vaga e as pessoas já sugeridas
+    pessoas_ignoradas_ids = get_ids_pessoa_ignorada_by_vaga(db, vaga_id)
 
-    pessoa_selecionada = next(iter(similaridades_retorno))
-    await atualiza_match_vaga(db, vaga, pessoa_selecionada, pessoa_logada.id)
+    # o próximo candidato sai do ranking guardado; só recalcula quando
+    # ele não existe, foi invalidado ou se esgotou
+    proximo = get_proximo_candidato(
+        db, vaga.id, pessoas_ignoradas_ids, commit=False)
 
-    add_pessoa_ignorada(db, pessoa_selecionada.id, vaga.id)
+    if not proximo:
+        candidatos = pontua_candidatos_vaga(
+            db, vaga, pessoas_ignoradas_ids, limite=config.RANKING_VAGA_TAMANHO)
+        salva_ranking(db, vaga.id, candidatos)
+        proximo = get_proximo_candidato(
+            db, vaga.id, pessoas_ignoradas_ids, commit=False)
 
-    if not pessoas:
+    if not proximo:
         raise HTTPException(status_code=404, detail="pessoas não encontradas")
 
+    # a retirada do candidato do ranking vai no mesmo commit da vaga
+    unidade = UnidadeMatch(db, vaga.projeto_id)
+    unidade.seleciona(vaga, proximo[0])
+    pessoa_selecionada = unidade.pessoas()[proximo[0]]
+    unidade.aplica()
+
     return pessoa_selecionada
 
 
@@ -276,8 +203,9 @@ async def get_vagas_convite(
     db: Session,
     qtd: int,
     pessoa_id: int,
+    perfil: t.Optional[str] = None,
 ):
-    pessoa_projeto = db.query(models.PessoaProjeto)\
+    pessoa_projeto = carrega(db.query(models.PessoaProjeto), perfil)\
         .filter(models.PessoaProjeto.pessoa_id == pessoa_id)\
         .filter(models.PessoaProjeto.situacao == "PENDENTE_COLABORADOR")\
         .order_by(func.random())\
@@ -287,32 +215,14 @@ async def get_vagas_convite(
     return pessoa_projeto
 
 
-async def atualiza_match_vaga(
-    db: Session,
-    vaga: schemas.PessoaProjeto,
-    pessoa: Pessoa,
-    pessoa_logada_id: int
-):
-
-    '''
-    Insere a pessoa selecionada na vaga respectiva E 
-    altera a situação para pendente_idealizador
-    '''
-
-    vagaEdit = schemas.PessoaProjetoEdit()
-    vagaEdit.situacao = "PENDENTE_IDEALIZADOR"
-    vagaEdit.pessoa_id = pessoa.id
-
-    await edit_pessoa_projeto(db, vaga.id, vagaEdit, pessoa_logada_id)
-
-
 async def get_vagas_by_projeto(
     db: Session,
     id_projeto: int,
+    perfil: t.Optional[str] = None,
 ) -> t.List[schemas.PessoaProjetoOut]:
 
     pessoa_projeto = (
-        db.query(models.PessoaProjeto)
+        carrega(db.query(models.PessoaProjeto), perfil)
         .filter(models.PessoaProjeto.projeto_id == id_projeto)
         .filter(models.PessoaProjeto.pessoa_id == None)
         .all()
@@ -322,10 +232,10 @@ async def get_vagas_by_projeto(
 
 
 async def get_pessoa_projeto_by_projeto(
-    db: Session, id_projeto: int
+    db: Session, id_projeto: int, perfil: t.Optional[str] = None
 ) -> t.List[schemas.PessoaProjetoPessoaOut]:
     pessoa_projeto = (
-        db.query(models.PessoaProjeto)
+        carrega(db.query(models.PessoaProjeto), perfil)
         .filter(models.PessoaProjeto.projeto_id == id_projeto)
         .all()
     )
@@ -404,6 +314,14 @@ async def edit_pessoa_projeto(
     db.commit()
     db.refresh(db_pessoa_projeto)
 
+    # o ranking guardado depende das tags e do papel da vaga e, com a
+    # similaridade textual, também da descrição
+    campos_ranking = {"habilidades", "areas", "papel_id"}
+    if indice_texto_ativo():
+        campos_ranking.add("descricao")
+    if update_data.keys() & campos_ranking:
+        invalida_ranking_vagas(db, [db_pessoa_projeto.id])
+
     if "situacao" in update_data.keys():
         if update_data["situacao"] == "PENDENTE_COLABORADOR":
             await edit_finalizado_projeto(db, db_pessoa_projeto.projeto_id, False)
@@ -4,6 +4,7 @@ from datetime import datetime
 from db.area.schemas import PessoaAreaCreate
 from db.habilidade.schemas import PessoaHabilidadeCreate
 from db.pessoa.schemas import Pessoa
+from db.utils import carregamento
 
 
 class PessoaProjetoBase(BaseModel):
@@ -33,6 +34,7 @@ class PessoaProjetoPessoaOut(PessoaProjetoBase):
 
     class Config:
         orm_mode = True
+        perfil = carregamento.VAGA_PESSOA
 
 
 class PessoaProjetoCreate(PessoaProjetoBase):
@@ -58,3 +60,4 @@ class PessoaProjeto(PessoaProjetoOut):
 
     class Config:
         orm_mode = True
+        perfil = carregamento.VAGA
@@ -0,0 +1,190 @@
+import math
+import threading
+import time
+import typing as t
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+
+from core import config, metricas
+
+# Pool de conexões da engine de db/session.py. O tamanho sai do limite de
+# conexões do Postgres dividido entre os workers do gunicorn, para que
+# WEB_CONCURRENCY workers nunca abram, somados, mais do que o banco aceita.
+# Com DB_PGBOUNCER a aplicação não guarda conexões (NullPool) e quem faz o
+# pool é o PgBouncer, em modo transaction.
+
+MODO_PADRAO = "padrao"
+MODO_FILA = "fila"
+MODO_PGBOUNCER = "pgbouncer"
+
+
+def dimensiona(
+    max_conexoes: int, reservadas: int, workers: int
+) -> t.Tuple[int, int]:
+
+    '''
+        Divide as conexões do banco entre os workers: metade das conexões
+        de cada worker fica aberta no pool e a outra metade é overflow,
+        aberto só nos picos e fechado em seguida
+
+        Entrada: limite de conexões do banco, conexões reservadas para
+                 outros processos (celery, migrações, psql), número de
+                 workers
+
+        Saída: (pool_size, max_overflow)
+    '''
+
+    por_worker = max(1, (max_conexoes - reservadas) // max(1, workers))
+    pool_size = math.ceil(por_worker / 2)
+    return pool_size, por_worker - pool_size
+
+
+class EstatisticasPool:
+    '''
+        Contadores das conexões do processo: checkouts, conexões em uso,
+        overflows, timeouts e o tempo esperando por uma conexão livre
+    '''
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.modo = MODO_PADRAO
+        self.pool_size = None
+        self.max_overflow = None
+        self._engines = []
+
+        self._checkouts = 0
+        self._em_uso = 0
+        self._maior_em_uso = 0
+        self._overflows = 0
+        self._timeouts = 0
+        self._esperas = 0
+        self._espera_total = 0.0
+        self._espera_maxima = 0.0
+
+    def checkout(self, *args):
+        with self._trava:
+            self._checkouts += 1
+            self._em_uso += 1
+            self._maior_em_uso = max(self._maior_em_uso, self._em_uso)
+
+    def checkin(self, *args):
+        with self._trava:
+            self._em_uso -= 1
+
+    def espera(self, duracao: float, overflow: bool):
+        with self._trava:
+            self._esperas += 1
+            self._espera_total += duracao
+            self._espera_maxima = max(self._espera_maxima, duracao)
+            if overflow:
+                self._overflows += 1
+
+    def timeout(self):
+        with self._trava:
+            self._timeouts += 1
+
+    def coleta(self) -> t.Dict[str, t.Any]:
+        with self._trava:
+            estatisticas = {
+                "modo": self.modo,
+                "pool_size": self.pool_size,
+                "max_overflow": self.max_overflow,
+                "checkouts": self._checkouts,
+                "em_uso": self._em_uso,
+                "maior_em_uso": self._maior_em_uso,
+                "overflows": self._overflows,
+                "timeouts": self._timeouts,
+                "espera_media_ms":
+                    1000 * self._espera_total / self._esperas
+                    if self._esperas else 0.0,
+                "espera_maxima_ms": 1000 * self._espera_maxima,
+            }
+
+        # engine.pool é trocado quando a engine é descartada (dispose)
+        estatisticas["ociosas"] = sum(
+            engine.pool.checkedin() for engine in self._engines
+            if isinstance(engine.pool, QueuePool))
+        return estatisticas
+
+
+estatisticas = EstatisticasPool()
+metricas.registra("pool_conexoes", estatisticas.coleta)
+
+
+class QueuePoolMedido(QueuePool):
+    '''
+        QueuePool que mede quanto cada checkout esperou por uma conexão e
+        se ela precisou ser aberta como overflow
+    '''
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        # _overflow começa em -pool_size e sobe a cada conexão aberta
+        overflow_antes = self._overflow
+        try:
+            conexao = super()._do_get()
+        except exc.TimeoutError:
+            estatisticas.timeout()
+            raise
+
+        estatisticas.espera(
+            time.perf_counter() - inicio,
+            self._overflow > max(overflow_antes, 0),
+        )
+        return conexao
+
+
+def argumentos_engine(url: str) -> t.Dict[str, t.Any]:
+
+    '''
+        Argumentos do create_engine conforme a configuração: NullPool com
+        DB_PGBOUNCER, QueuePool dimensionado para o Postgres e o padrão
+        do SQLAlchemy para os outros bancos (sqlite dos benchmarks)
+
+        Entrada: URL do banco
+
+        Saída: argumentos nomeados do create_engine
+    '''
+
+    if config.DB_PGBOUNCER:
+        # a conexão volta ao PgBouncer no fim de cada transação; nada de
+        # estado de sessão (SET, advisory locks, LISTEN) entre transações
+        estatisticas.modo = MODO_PGBOUNCER
+        return {"poolclass": NullPool}
+
+    if make_url(url).get_backend_name() != "postgresql":
+        return {"pool_pre_ping": True}
+
+    pool_size, max_overflow = dimensiona(
+        config.DB_MAX_CONEXOES, config.DB_CONEXOES_RESERVADAS,
+        config.WEB_CONCURRENCY)
+    if config.DB_POOL_SIZE is not None:
+        pool_size = config.DB_POOL_SIZE
+    if config.DB_MAX_OVERFLOW is not None:
+        max_overflow = config.DB_MAX_OVERFLOW
+
+    estatisticas.modo = MODO_FILA
+    estatisticas.pool_size = pool_size
+    estatisticas.max_overflow = max_overflow
+
+    return {
+        "poolclass": QueuePoolMedido,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_pre_ping": True,
+    }
+
+
+def instala(engine):
+
+    '''
+        Registra os eventos de checkout/checkin da engine nas estatísticas
+    '''
+
+    event.listen(engine, "checkout", estatisticas.checkout)
+    event.listen(engine, "checkin", estatisticas.checkin)
+    estatisticas._engines.append(engine)
@@ -4,26 +4,62 @@ import typing as t
 from sqlalchemy.sql import func
 from random import shuffle
 from db import models
+from db.utils.carregamento import carrega
 from db.utils.extract_areas import append_areas
 from db.utils.extract_habilidade import append_habilidades
 from db.utils.salvar_imagem import store_image, delete_file
 from . import schemas
 
-def get_projeto_by_username(db: Session, usuario: str) -> schemas.Projeto:
+def get_projeto_by_username(
+    db: Session, usuario: str, perfil: t.Optional[str] = None
+) -> schemas.Projeto:
     return (
-        db.query(models.Projeto).filter(models.Projeto.nome == usuario).first()
+        carrega(db.query(models.Projeto), perfil)
+        .filter(models.Projeto.nome == usuario).first()
     )
 
 
-def get_projeto(db: Session, projeto_id: int) -> schemas.Projeto:
+def get_projeto(
+    db: Session, projeto_id: int, perfil: t.Optional[str] = None
+) -> schemas.Projeto:
     projeto = (
-        db.query(models.Projeto).filter(models.Projeto.id == projeto_id).first()
+        carrega(db.query(models.Projeto), perfil)
+        .filter(models.Projeto.id == projeto_id).first()
     )
     if not projeto:
         raise HTTPException(status_code=404, detail="projeto não encontrado")
     return projeto
 
-def get_projetos_destaque(db: Session, qtd_projetos: int) -> t.List[schemas.Projeto]: 
+def get_projetos_by_ids(
+    db: Session, projetos_ids: t.List[int], perfil: t.Optional[str] = None
+) -> t.List[schemas.Projeto]:
+
+    '''
+        Busca vários projetos em uma consulta, na ordem dos IDs
+
+        Entrada: IDs, perfil de carregamento
+
+        Saída: Lista de Esquemas de Projeto
+
+        Exceções: Algum dos projetos não encontrado
+    '''
+
+    if not projetos_ids:
+        return []
+
+    projetos = carrega(db.query(models.Projeto), perfil)\
+        .filter(models.Projeto.id.in_(projetos_ids))\
+        .all()
+    projetos = {projeto.id: projeto for projeto in projetos}
+
+    if len(projetos) < len(set(projetos_ids)):
+        raise HTTPException(status_code=404, detail="projeto não encontrado")
+
+    return [projetos[projeto_id] for projeto_id in projetos_ids]
+
+def get_projetos_destaque(
+    db: Session, qtd_projetos: int, perfil: t.Optional[str] = None
+) -> t.List[schemas.Projeto]:
     projetos = db.query(models.Reacoes.projeto_id, func.count(models.Reacoes.projeto_id).label('qtd'))\
                 .group_by(models.Reacoes.projeto_id)\
                 .order_by('qtd')\
@@ -31,14 +67,10 @@ def get_projetos_destaque(db: Session, qtd_projetos: int) -> t.List[schemas.Proj
                 .all()
 
     shuffle(projetos)
-    projetos_return = []
 
-    for i in range(qtd_projetos):
-        projeto_id = projetos[i][0]
-        projeto = get_projeto(db, projeto_id)
-        projetos_return.append(projeto)
+    projetos_ids = [projetos[i][0] for i in range(qtd_projetos)]
 
-    return projetos_return
+    return get_projetos_by_ids(db, projetos_ids, perfil)
 
 def get_projetos(
     db: Session,
@@ -46,10 +78,11 @@ def get_projetos(
     limit: int = 100,
     visibilidade: bool = True,
     pessoa_id: t.Optional[int] = None,
+    perfil: t.Optional[str] = None,
 ) -> t.List[schemas.ProjetoOut]:
     if pessoa_id:
         return (
-            db.query(models.Projeto)
+            carrega(db.query(models.Projeto), perfil)
             .filter(
                 models.Projeto.pessoa_id == pessoa_id,
                 models.Projeto.visibilidade == visibilidade,
@@ -60,7 +93,7 @@ def get_projetos(
             .all()
         )
     return (
-        db.query(models.Projeto)
+        carrega(db.query(models.Projeto), perfil)
         .filter(
             models.Projeto.visibilidade == visibilidade,
         )
@@ -73,28 +106,24 @@ def get_projetos(
 def get_projeto_reacao(
     db: Session,
     pessoa_id: int,
-    reacao: str
+    reacao: str,
+    perfil: t.Optional[str] = None
 ):
 
-    reacoes = db.query(models.Reacoes)\
+    return carrega(db.query(models.Projeto), perfil)\
+        .join(models.Reacoes, models.Reacoes.projeto_id == models.Projeto.id)\
         .filter(models.Reacoes.pessoa_id == pessoa_id,
                 models.Reacoes.reacao == reacao)\
         .order_by(models.Reacoes.data_criacao.desc())\
         .all()
 
-    projetos = []
-
-    for reacao in reacoes:
-        projetos.append(get_projeto(db, reacao.projeto_id))
-
-    return projetos
-
 async def get_projeto_participando(
     db: Session,
-    colaborador_id: int
+    colaborador_id: int,
+    perfil: t.Optional[str] = None
 ):
 
-    projeto = db.query(models.Projeto)\
+    projeto = carrega(db.query(models.Projeto), perfil)\
         .join(models.PessoaProjeto, models.Projeto.projeto_pessoa, full=True, isouter=True)\
         .filter(models.PessoaProjeto.pessoa_id == colaborador_id)\
         .filter(models.PessoaProjeto.situacao == "FINALIZADO")\
@@ -4,6 +4,7 @@ from datetime import datetime
 from db.habilidade.schemas import PessoaHabilidadeCreate
 from db.area.schemas import ProjetoAreaCreate
 from db.reacoes.schemas import Reacoes
+from db.utils import carregamento
 
 
 class ProjetoBase(BaseModel):
@@ -46,3 +47,4 @@ class Projeto(ProjetoBase):
 
     class Config:
         orm_mode = True
+        perfil = carregamento.PROJETO
@@ -0,0 +1,208 @@
+from sqlalchemy import select, union
+from sqlalchemy.orm import Session
+import typing as t
+
+from db import models
+from db.area.hierarquia import ancestrais, descendentes
+from db.utils.pesos_tags import PROFUNDIDADE_HIERARQUIA
+
+
+def get_proximo_candidato(
+    db: Session,
+    pessoa_projeto_id: int,
+    pessoas_ignoradas_ids: t.Iterable[int] = (),
+    commit: bool = True
+) -> t.Optional[t.Tuple[int, float]]:
+
+    '''
+        Retira do ranking guardado da vaga o próximo candidato que não foi
+        ignorado, descartando junto as posições anteriores a ele
+
+        Entrada: ID da vaga, IDs das pessoas ignoradas, se faz o commit
+                 (False deixa a remoção para a transação de quem chamou)
+
+        Saída: (pessoa_id, similaridade), ou None se o ranking não existe
+               ou se esgotou
+    '''
+
+    consulta = db.query(models.RankingVaga)\
+        .filter(models.RankingVaga.pessoa_projeto_id == pessoa_projeto_id)
+
+    pessoas_ignoradas_ids = list(pessoas_ignoradas_ids)
+    if pessoas_ignoradas_ids:
+        consulta = consulta.filter(
+            models.RankingVaga.pessoa_id.notin_(pessoas_ignoradas_ids))
+
+    proximo = consulta\
+        .with_entities(
+            models.RankingVaga.pessoa_id,
+            models.RankingVaga.similaridade,
+            models.RankingVaga.posicao,
+        )\
+        .order_by(models.RankingVaga.posicao)\
+        .first()
+
+    if not proximo:
+        return None
+
+    pessoa_id, similaridade, posicao = proximo
+
+    db.query(models.RankingVaga)\
+        .filter(models.RankingVaga.pessoa_projeto_id == pessoa_projeto_id)\
+        .filter(models.RankingVaga.posicao <= posicao)\
+        .delete(synchronize_session=False)
+    if commit:
+        db.commit()
+
+    return pessoa_id, similaridade
+
+
+def salva_ranking(
+    db: Session,
+    pessoa_projeto_id: int,
+    candidatos: t.List[t.Tuple[int, float]]
+):
+
+    '''
+        Substitui o ranking guardado da vaga
+
+        Entrada: ID da vaga, lista de (pessoa_id, similaridade) da maior
+                 para a menor similaridade
+
+        Saída:
+    '''
+
+    db.query(models.RankingVaga)\
+        .filter(models.RankingVaga.pessoa_projeto_id == pessoa_projeto_id)\
+        .delete(synchronize_session=False)
+
+    db.bulk_insert_mappings(models.RankingVaga, [
+        {
+            "pessoa_projeto_id": pessoa_projeto_id,
+            "pessoa_id": pessoa_id,
+            "posicao": posicao,
+            "similaridade": similaridade,
+        }
+        for posicao, (pessoa_id, similaridade) in enumerate(candidatos)
+    ])
+    db.commit()
+
+
+def invalida_ranking_vagas(
+    db: Session,
+    pessoas_projeto_ids: t.Iterable[int]
+):
+
+    '''
+        Descarta os rankings guardados das vagas informadas
+    '''
+
+    pessoas_projeto_ids = list(pessoas_projeto_ids)
+    if not pessoas_projeto_ids:
+        return
+
+    db.query(models.RankingVaga)\
+        .filter(models.RankingVaga.pessoa_projeto_id.in_(pessoas_projeto_ids))\
+        .delete(synchronize_session=False)
+    db.commit()
+
+
+def invalida_rankings(db: Session):
+
+    '''
+        Descarta todos os rankings guardados, por exemplo quando muda a
+        hierarquia de áreas usada na similaridade
+    '''
+
+    db.query(models.RankingVaga).delete(synchronize_session=False)
+    db.commit()
+
+
+def invalida_ranking_projeto(db: Session, projeto_id: int):
+
+    '''
+        Descarta os rankings guardados de todas as vagas do projeto, por
+        exemplo quando muda o interesse de alguém no projeto
+    '''
+
+    vagas = select([models.PessoaProjeto.id])\
+        .where(models.PessoaProjeto.projeto_id == projeto_id)
+
+    db.query(models.RankingVaga)\
+        .filter(models.RankingVaga.pessoa_projeto_id.in_(vagas))\
+        .delete(synchronize_session=False)
+    db.commit()
+
+
+def get_tags_pessoa(
+    db: Session,
+    pessoa_id: int
+) -> t.Tuple[t.Set[int], t.Set[int]]:
+
+    '''
+        Busca os IDs das habilidades e das áreas de uma pessoa direto nas
+        tabelas de associação, sem carregar os relacionamentos
+
+        Entrada: ID da pessoa
+
+        Saída: (IDs das habilidades, IDs das áreas)
+    '''
+
+    habilidades = db.query(models.HabilidadesPessoa.c.habilidade_id)\
+        .filter(models.HabilidadesPessoa.c.pessoa_id == pessoa_id)
+    areas = db.query(models.PessoaArea.c.area_id)\
+        .filter(models.PessoaArea.c.pessoa_id == pessoa_id)
+
+    return (
+        {habilidade_id for habilidade_id, in habilidades},
+        {area_id for area_id, in areas},
+    )
+
+
+def invalida_ranking_pessoa(
+    db: Session,
+    pessoa_id: int,
+    habilidades_ids: t.Iterable[int],
+    areas_ids: t.Iterable[int]
+):
+
+    '''
+        Descarta os rankings que podem ter mudado com a edição de uma
+        pessoa: os que a contêm e os das vagas que pedem alguma das
+        habilidades ou áreas dela, antes ou depois da edição. As áreas
+        valem também pelas áreas acima e abaixo delas na hierarquia, que
+        a similaridade pontua com desconto
+
+        Entrada: ID da pessoa, IDs das habilidades e das áreas anteriores
+                 e atuais da pessoa
+
+        Saída:
+    '''
+
+    habilidades_ids = list(habilidades_ids)
+    areas_ids = list(areas_ids)
+
+    vagas = [
+        select([models.RankingVaga.pessoa_projeto_id])
+        .where(models.RankingVaga.pessoa_id == pessoa_id)
+    ]
+    if habilidades_ids:
+        vagas.append(
+            select([models.PessoaHabilidadesProjeto.c.pessoa_projeto_id])
+            .where(models.PessoaHabilidadesProjeto.c.habilidade_id.in_(
+                habilidades_ids))
+        )
+    if areas_ids:
+        relacionadas = union(
+            ancestrais(areas_ids, PROFUNDIDADE_HIERARQUIA),
+            descendentes(areas_ids, PROFUNDIDADE_HIERARQUIA),
+        )
+        vagas.append(
+            select([models.PessoaAreaProjeto.c.pessoa_projeto_id])
+            .where(models.PessoaAreaProjeto.c.area_id.in_(relacionadas))
+        )
+
+    db.query(models.RankingVaga)\
+        .filter(models.RankingVaga.pessoa_projeto_id.in_(union(*vagas)))\
+        .delete(synchronize_session=False)
+    db.commit()
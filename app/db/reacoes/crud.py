@@ -1,8 +1,10 @@
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
+import typing as t
 from db.notificacao.crud import notificacao_interesse, notificacao_favorito
 
 from db import models
+from db.ranking_vaga.crud import invalida_ranking_projeto
 from . import schemas
 
 
@@ -25,6 +27,39 @@ def checa_existe_reacao(
         return False
 
 
+def get_ids_pessoas_interessadas(
+    db: Session,
+    projeto_id: int,
+    pessoas_ids: t.Optional[t.Iterable[int]] = None
+) -> t.Set[int]:
+
+    '''
+        Busca, em uma única consulta, quais das pessoas informadas
+        demonstraram INTERESSE no projeto
+
+        Entrada: ID do projeto, IDs das pessoas candidatas (todas as
+                 pessoas, se não informado)
+
+        Saída: Conjunto com os IDs das pessoas interessadas
+    '''
+
+    interessados = (
+        db.query(models.Reacoes.pessoa_id)
+        .filter(models.Reacoes.projeto_id == projeto_id,
+                models.Reacoes.reacao == "INTERESSE",)
+        .distinct()
+    )
+
+    if pessoas_ids is not None:
+        pessoas_ids = set(pessoas_ids)
+        if not pessoas_ids:
+            return set()
+        interessados = interessados.filter(
+            models.Reacoes.pessoa_id.in_(pessoas_ids))
+
+    return {pessoa_id for pessoa_id, in interessados.all()}
+
+
 def create_reacao(
     db: Session, reacao: schemas.ReacoesCreate
 ) -> schemas.Reacoes:
@@ -46,6 +81,8 @@ def create_reacao(
         if db_reacao.reacao == 'INTERESSE':
             notificacao_interesse(db, db_reacao.pessoa_id,
                                   db_reacao.projeto_id)
+            # o interesse dá bônus na similaridade com as vagas do projeto
+            invalida_ranking_projeto(db, db_reacao.projeto_id)
 
 
 def get_reacao(
@@ -117,4 +154,8 @@ def delete_reacao(
         )
     db.delete(db_reacao)
     db.commit()
+
+    if reacao == 'INTERESSE':
+        invalida_ranking_projeto(db, projeto_id)
+
     return db_reacao
@@ -1,19 +1,39 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
 
 from app.core import config
+from db import pool
 
-engine = create_engine(config.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
+engine = create_engine(
+    config.SQLALCHEMY_DATABASE_URI,
+    **pool.argumentos_engine(config.SQLALCHEMY_DATABASE_URI))
+pool.instala(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
+def get_db(request: Request):
+    '''
+        Sessão da requisição: criada no primeiro uso e compartilhada por
+        todas as dependências da mesma requisição (rota, autenticação...).
+        Quem fecha é o db_session_middleware, por meio de fecha_sessao;
+        requisições que não usam o banco, como as de /api/uploads, nem
+        chegam a criá-la
+    '''
+
+    # o estado fica no scope, então o middleware enxerga a mesma sessão
+    db = getattr(request.state, "db", None)
+    if db is None:
+        db = request.state.db = SessionLocal()
+    return db
+
+
+def fecha_sessao(request: Request):
+    db = getattr(request.state, "db", None)
+    if db is not None:
         db.close()
+        del request.state.db
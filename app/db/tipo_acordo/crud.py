@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 import typing as t
 
 from app.db import models
+from db.utils.cache_referencias import cache_tipos_acordo
 from . import schemas
 
 def get_all_tipo_acordo(
@@ -35,7 +36,7 @@ def get_tipo_acordo_by_id(
     ) -> schemas.TipoAcordo:
 
     '''
-        Busca tipo_acordo pelo id
+        Busca tipo_acordo pelo id, pelo cache de tipos de acordo
 
         Entrada: ID
 
@@ -44,9 +45,7 @@ def get_tipo_acordo_by_id(
         Exceções: TipoAcordo não encontrado
     '''
 
-    tipo_acordo = db.query(models.TipoAcordo)\
-        .filter(models.TipoAcordo.id == tipo_acordo_id)\
-        .first()
+    tipo_acordo = cache_tipos_acordo.get(db, tipo_acordo_id)
 
     if not tipo_acordo:
         raise HTTPException(
@@ -85,7 +84,9 @@ async def create_tipo_acordo(
         db.add(db_tipo_acordo)
         db.commit()
         db.refresh(db_tipo_acordo)
-        
+
+        cache_tipos_acordo.atualiza(db_tipo_acordo)
+
         return db_tipo_acordo
     except Exception as e:
         raise e
@@ -129,6 +130,8 @@ def edit_tipo_acordo(
     db.add(db_tipo_acordo)
     db.commit()
     db.refresh(db_tipo_acordo)
+
+    cache_tipos_acordo.atualiza(db_tipo_acordo)
     return db_tipo_acordo
 
 
@@ -155,5 +158,7 @@ def delete_tipo_acordo(
 
     db.delete(tipo_acordo)
     db.commit()
-    
+
+    cache_tipos_acordo.remove(tipo_acordo_id)
+
     return tipo_acordo
\ No newline at end of file
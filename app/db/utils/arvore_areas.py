@@ -0,0 +1,151 @@
+from hashlib import sha1
+import json
+import threading
+import time
+import typing as t
+
+from sqlalchemy.orm import Session
+
+from core import config
+from db import models
+from db.utils.cache_referencias import ao_invalidar
+
+# (id, descricao, area_pai_id)
+LinhaArea = t.Tuple[int, str, t.Optional[int]]
+
+
+class Arvore(t.NamedTuple):
+    # hash do conteúdo: igual em todos os workers que têm a mesma árvore,
+    # então serve de ETag
+    versao: str
+    # [{"area": ..., "subareas": [...]}], no formato de AreasAndSubareas
+    areas: t.List[dict]
+    # as mesmas áreas já serializadas em JSON
+    corpo: bytes
+    # area_id: area_pai_id (None nas áreas raiz)
+    pais: t.Dict[int, t.Optional[int]]
+    # area_id: ids das subáreas diretas
+    filhos: t.Dict[int, t.List[int]]
+
+
+def _area(id: int, descricao: str, area_pai_id: t.Optional[int]) -> dict:
+    # mesmo formato do esquema Area com response_model_exclude_none
+    area = {"descricao": descricao, "id": id}
+    if area_pai_id is not None:
+        area["area_pai_id"] = area_pai_id
+    return area
+
+
+class ArvoreAreas:
+    '''
+        Cópia em memória da taxonomia de áreas servida por GET /areas.
+        Montada com uma consulta só de colunas (sem o carregamento em
+        join de area_pai_rel) e trocada inteira a cada reconstrução, então
+        quem a leu continua com uma versão consistente.
+
+        Invalidada pelos hooks de criação, edição e remoção de áreas e
+        reconstruída quando expira o ARVORE_AREAS_TTL, o que leva aos
+        outros workers as mudanças feitas neste.
+    '''
+
+    def __init__(self, ttl: int = 0):
+        self.ttl = ttl
+        self.construida_em = None
+        self._arvore = None
+        # muda a cada invalidação, para descartar reconstruções que leram o
+        # banco antes da mudança
+        self._geracao = 0
+        self._trava = threading.Lock()
+
+    def expirada(self) -> bool:
+        if self.construida_em is None:
+            return True
+        if not self.ttl:
+            return False
+        return time.monotonic() - self.construida_em > self.ttl
+
+    def invalida(self):
+        self._geracao += 1
+        self.construida_em = None
+
+    def atual(self) -> t.Optional[Arvore]:
+
+        '''
+            Árvore em memória, ou None se ainda não foi montada ou expirou
+        '''
+
+        if self.expirada():
+            return None
+        return self._arvore
+
+    def carrega(self, linhas: t.Iterable[LinhaArea]) -> Arvore:
+
+        '''
+            Monta a árvore do zero
+
+            Entrada: linhas (id, descricao, area_pai_id)
+
+            Saída: Árvore montada
+        '''
+
+        linhas = sorted(linhas, key=lambda linha: linha[0])
+
+        pais, filhos = {}, {}
+        for id, _, area_pai_id in linhas:
+            pais[id] = area_pai_id
+            if area_pai_id is not None:
+                filhos.setdefault(area_pai_id, []).append(id)
+
+        subareas = {}
+        for linha in linhas:
+            if linha[2] is not None:
+                subareas.setdefault(linha[2], []).append(_area(*linha))
+        areas = [
+            {"area": _area(*linha), "subareas": subareas.get(linha[0], [])}
+            for linha in linhas
+            if linha[2] is None
+        ]
+
+        corpo = json.dumps(
+            areas, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        arvore = Arvore(
+            versao=sha1(corpo).hexdigest(),
+            areas=areas,
+            corpo=corpo,
+            pais=pais,
+            filhos=filhos,
+        )
+
+        self._arvore = arvore
+        self.construida_em = time.monotonic()
+        return arvore
+
+    def reconstroi(self, db: Session) -> Arvore:
+        geracao = self._geracao
+        linhas = db.query(
+            models.Area.id,
+            models.Area.descricao,
+            models.Area.area_pai_id,
+        ).all()
+        arvore = self.carrega(linhas)
+        if self._geracao != geracao:
+            self.construida_em = None
+        return arvore
+
+    def garante_atualizada(self, db: Session) -> Arvore:
+
+        '''
+            Árvore atual, reconstruindo-a se preciso; só uma thread
+            reconstrói por vez
+        '''
+
+        with self._trava:
+            arvore = self.atual()
+            if arvore is None:
+                arvore = self.reconstroi(db)
+            return arvore
+
+
+arvore_areas = ArvoreAreas(ttl=config.ARVORE_AREAS_TTL)
+ao_invalidar(models.Area.__tablename__, arvore_areas.invalida)
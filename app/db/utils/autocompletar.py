@@ -0,0 +1,269 @@
+from bisect import bisect_left
+import heapq
+import re
+import threading
+import time
+import typing as t
+
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import Session
+
+from core import config
+from db import models
+from db.utils.busca_textual import normaliza
+from db.utils.cache_referencias import ao_invalidar
+
+# (id, nome, uso): uso é em quantas pessoas, projetos e vagas a tag aparece
+Sugestao = t.Tuple[int, str, int]
+
+# prefixos guardados no cache de cada índice
+TAMANHO_CACHE = 2048
+
+
+def chave(texto: str) -> str:
+
+    '''
+        Texto como guardado no índice: minúsculas, sem acentos e com as
+        palavras separadas por um espaço
+    '''
+
+    return " ".join(re.findall(r"\w+", normaliza(texto or "")))
+
+
+def _chaves(nome: str) -> t.List[str]:
+    # o nome a partir de cada palavra, para que "proj" encontre "Gestão de
+    # projetos" e "gestao de p" também
+    palavras = chave(nome).split(" ")
+    return [
+        " ".join(palavras[i:]) for i in range(len(palavras)) if palavras[i]
+    ]
+
+
+class IndicePrefixos:
+    '''
+        Índice de prefixos em memória para o autocompletar de áreas e
+        habilidades. Guarda, em uma lista ordenada, o nome sem acentos de
+        cada tag a partir de cada uma das suas palavras; a busca é um
+        bisect até o prefixo seguido da leitura das chaves que começam com
+        ele, e os resultados vêm das tags mais usadas para as menos.
+
+        Montado a partir do banco, mantido pelos hooks de criação e edição
+        de áreas e habilidades e reconstruído quando expira o
+        AUTOCOMPLETAR_TTL (que também atualiza os usos).
+    '''
+
+    def __init__(self, modelo, campo: str, associacoes, ttl: int = 0):
+        self.modelo = modelo
+        self.campo = campo
+        # (tabela, coluna da tag) de onde vêm os usos
+        self.associacoes = associacoes
+        self.ttl = ttl
+        self.construido_em = None
+        self._chaves = []
+        self._ids = []
+        self._tags = {}
+        # ids das tags das mais usadas para as menos; refeita sob demanda
+        # depois de uma edição
+        self._ordem = None
+        self._cache = {}
+        self._trava = threading.RLock()
+
+    @property
+    def construido(self) -> bool:
+        return self.construido_em is not None
+
+    def expirado(self) -> bool:
+        if not self.construido:
+            return True
+        if not self.ttl:
+            return False
+        return time.monotonic() - self.construido_em > self.ttl
+
+    def carrega(self, linhas: t.Iterable[Sugestao]):
+
+        '''
+            Monta o índice do zero
+
+            Entrada: linhas (id, nome, uso)
+
+            Saída:
+        '''
+
+        tags = {id: (nome, uso, chave(nome)) for id, nome, uso in linhas}
+        entradas = sorted(
+            (chave_nome, id)
+            for id, (nome, _, _) in tags.items()
+            for chave_nome in _chaves(nome)
+        )
+
+        with self._trava:
+            self._chaves = [chave_nome for chave_nome, _ in entradas]
+            self._ids = [id for _, id in entradas]
+            self._tags = tags
+            self._ordem = sorted(tags, key=self._posto)
+            self._cache = {}
+            self.construido_em = time.monotonic()
+
+    def reconstroi(self, db: Session):
+
+        '''
+            Reconstrói o índice com uma consulta: cada tag com a quantidade
+            de linhas que a usam nas tabelas de associação
+        '''
+
+        usos = union_all(*(
+            select([tabela.c[coluna].label("tag_id")])
+            for tabela, coluna in self.associacoes
+        )).alias("usos")
+        contagens = select([usos.c.tag_id, func.count().label("uso")])\
+            .group_by(usos.c.tag_id)\
+            .alias("contagens")
+
+        linhas = db.query(
+            self.modelo.id,
+            getattr(self.modelo, self.campo),
+            func.coalesce(contagens.c.uso, 0),
+        ).outerjoin(contagens, contagens.c.tag_id == self.modelo.id)
+
+        self.carrega(linhas)
+
+    def invalida(self):
+        self.construido_em = None
+
+    def garante_atualizado(self, db: Session):
+        with self._trava:
+            if self.expirado():
+                self.reconstroi(db)
+
+    def atualiza(self, id: int, nome: str):
+
+        '''
+            Hook chamado após criar ou editar uma tag; uma tag nova começa
+            sem usos
+        '''
+
+        if not self.construido:
+            return
+
+        with self._trava:
+            self._remove(id)
+            _, uso, _ = self._tags.get(id, (None, 0, None))
+            self._tags[id] = (nome, uso, chave(nome))
+            for chave_nome in _chaves(nome):
+                posicao = bisect_left(self._chaves, chave_nome)
+                self._chaves.insert(posicao, chave_nome)
+                self._ids.insert(posicao, id)
+            self._ordem = None
+            self._cache = {}
+
+    def remove(self, id: int):
+
+        '''
+            Hook chamado após apagar uma tag
+        '''
+
+        if not self.construido:
+            return
+
+        with self._trava:
+            self._remove(id)
+            self._tags.pop(id, None)
+            self._ordem = None
+            self._cache = {}
+
+    def _remove(self, id: int):
+        anterior = self._tags.get(id)
+        if anterior is None:
+            return
+        for chave_nome in _chaves(anterior[0]):
+            posicao = bisect_left(self._chaves, chave_nome)
+            while posicao < len(self._chaves) and \
+                    self._chaves[posicao] == chave_nome:
+                if self._ids[posicao] == id:
+                    del self._chaves[posicao]
+                    del self._ids[posicao]
+                    break
+                posicao += 1
+
+    def _posto(self, id: int):
+        # das mais usadas para as menos, depois em ordem alfabética
+        _, uso, chave_nome = self._tags[id]
+        return (-uso, chave_nome, id)
+
+    def _mais_usadas(self, procurado: str, limite: int) -> t.List[Sugestao]:
+        if self._ordem is None:
+            self._ordem = sorted(self._tags, key=self._posto)
+
+        inicio_palavra = " " + procurado
+        sugestoes = []
+        for id in self._ordem:
+            nome, uso, chave_nome = self._tags[id]
+            if inicio_palavra in " " + chave_nome:
+                sugestoes.append((id, nome, uso))
+                if len(sugestoes) == limite:
+                    break
+        return sugestoes
+
+    def busca(self, prefixo: str, limite: int) -> t.List[Sugestao]:
+
+        '''
+            Tags com alguma palavra começando pelo prefixo (sem diferenciar
+            acentos e maiúsculas), das mais usadas para as menos
+
+            Entrada: texto digitado, quantidade de sugestões
+
+            Saída: Lista de (id, nome, uso)
+        '''
+
+        procurado = chave(prefixo)
+        with self._trava:
+            sugestoes = self._cache.get((procurado, limite))
+            if sugestoes is not None:
+                return sugestoes
+
+            inicio = bisect_left(self._chaves, procurado)
+            fim = bisect_left(self._chaves, procurado + "\U0010ffff", inicio)
+
+            # prefixos curtos casam com boa parte das tags: aí é mais barato
+            # percorrê-las das mais usadas para as menos até juntar o limite
+            # do que ordenar todas as encontradas
+            if (fim - inicio) ** 2 > len(self._tags) * limite:
+                sugestoes = self._mais_usadas(procurado, limite)
+            else:
+                ids = set(self._ids[inicio:fim])
+                melhores = heapq.nsmallest(limite, ids, key=self._posto)
+                sugestoes = [
+                    (id, self._tags[id][0], self._tags[id][1])
+                    for id in melhores
+                ]
+
+            if len(self._cache) >= TAMANHO_CACHE:
+                self._cache = {}
+            self._cache[(procurado, limite)] = sugestoes
+            return sugestoes
+
+
+indice_areas = IndicePrefixos(
+    models.Area,
+    "descricao",
+    [
+        (models.PessoaArea, "area_id"),
+        (models.ProjetoArea, "area_id"),
+        (models.PessoaAreaProjeto, "area_id"),
+    ],
+    ttl=config.AUTOCOMPLETAR_TTL,
+)
+
+indice_habilidades = IndicePrefixos(
+    models.Habilidades,
+    "nome",
+    [
+        (models.HabilidadesPessoa, "habilidade_id"),
+        (models.HabilidadesProjeto, "habilidade_id"),
+        (models.PessoaHabilidadesProjeto, "habilidade_id"),
+    ],
+    ttl=config.AUTOCOMPLETAR_TTL,
+)
+
+for indice in (indice_areas, indice_habilidades):
+    ao_invalidar(indice.modelo.__tablename__, indice.invalida)
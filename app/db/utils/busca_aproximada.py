@@ -0,0 +1,215 @@
+import re
+import threading
+import time
+import typing as t
+
+import jellyfish
+import numpy as np
+
+from .busca_textual import normaliza
+
+# Busca aproximada (tolerante a erros de digitação e acentos) por nome de
+# pessoas e projetos e por área e habilidade. No Postgres usa o pg_trgm:
+# word_similarity entre a consulta e a coluna sem acentos, com índices GIN
+# de trigramas (gin_trgm_ops) nas expressões sem_acento(coluna). Nos outros
+# bancos (sqlite dos testes e benchmarks) um índice de trigramas em memória
+# seleciona os candidatos, reordenados pela similaridade de Jaro-Winkler
+# entre as palavras.
+
+# Colunas pesquisadas, por tabela
+COLUNAS = {
+    "tb_pessoa": "nome",
+    "tb_projeto": "nome",
+    "tb_area": "descricao",
+    "tb_habilidades": "nome",
+}
+
+# candidatos reordenados por consulta no índice em memória
+MAX_CANDIDATOS = 500
+
+# similaridade de Jaro-Winkler mínima de um resultado em memória
+LIMIAR_JARO_WINKLER = 0.75
+
+
+def palavras(texto: str) -> t.List[str]:
+    return re.findall(r"\w+", normaliza(texto or ""))
+
+
+def trigramas(texto: str) -> t.Set[str]:
+
+    '''
+        Trigramas das palavras do texto, como no pg_trgm: sem acentos, em
+        minúsculas e com dois espaços antes e um depois de cada palavra
+
+        Entrada: texto
+
+        Saída: conjunto de trigramas
+    '''
+
+    conjunto = set()
+    for palavra in palavras(texto):
+        completa = f"  {palavra} "
+        conjunto.update(
+            completa[i:i + 3] for i in range(len(completa) - 2))
+    return conjunto
+
+
+def jaro_winkler(consulta: t.List[str], texto: t.List[str]) -> float:
+
+    '''
+        Similaridade entre as palavras da consulta e as de um texto: média,
+        entre as palavras da consulta, da melhor similaridade de
+        Jaro-Winkler com alguma palavra do texto
+
+        Entrada: palavras da consulta, palavras do texto
+
+        Saída: similaridade entre 0 e 1
+    '''
+
+    if not consulta or not texto:
+        return 0.0
+    return sum(
+        max(jellyfish.jaro_winkler_similarity(termo, palavra)
+            for palavra in texto)
+        for termo in consulta
+    ) / len(consulta)
+
+
+class IndiceNgramas:
+    '''
+        Índice invertido de trigramas de uma coluna, em memória. Para cada
+        trigrama guarda as posições (arrays de 32 bits) dos textos que o
+        contêm; a consulta conta quantos dos seus trigramas cada texto
+        tem, como o word_similarity do pg_trgm, e reordena os melhores
+        candidatos pela similaridade de Jaro-Winkler.
+
+        Reconstruído a partir do banco quando expira o BUSCA_APROXIMADA_TTL.
+    '''
+
+    def __init__(self, ttl: int = 0):
+        self.ttl = ttl
+        self.construido_em = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._palavras = []
+        self._listas = {}
+        self._trava = threading.RLock()
+
+    def expirado(self) -> bool:
+        if self.construido_em is None:
+            return True
+        if not self.ttl:
+            return False
+        return time.monotonic() - self.construido_em > self.ttl
+
+    def carrega(self, linhas: t.Iterable[t.Tuple[int, str]]):
+
+        '''
+            Monta o índice do zero
+
+            Entrada: linhas (id, texto)
+
+            Saída:
+        '''
+
+        ids, lista_palavras, listas = [], [], {}
+        for posicao, (id, texto) in enumerate(linhas):
+            ids.append(id)
+            lista_palavras.append(palavras(texto))
+            for trigrama in trigramas(texto):
+                listas.setdefault(trigrama, []).append(posicao)
+
+        listas = {
+            trigrama: np.array(posicoes, dtype=np.int32)
+            for trigrama, posicoes in listas.items()
+        }
+
+        with self._trava:
+            self._ids = np.array(ids, dtype=np.int64)
+            self._palavras = lista_palavras
+            self._listas = listas
+            self.construido_em = time.monotonic()
+
+    def busca(
+        self,
+        consulta: str,
+        limiar: float,
+        prazo: t.Optional[float] = None,
+    ) -> t.Tuple[t.List[t.Tuple[int, float]], bool]:
+
+        '''
+            Textos parecidos com a consulta, do mais ao menos parecido
+
+            Entrada: texto digitado, fração mínima dos trigramas da
+                     consulta presentes no texto, instante (time.monotonic)
+                     a partir do qual a reordenação é interrompida
+
+            Saída: ([(id, similaridade)], se o prazo estourou). Com o prazo
+                   estourado, os candidatos não reordenados vêm depois,
+                   na ordem dos trigramas
+        '''
+
+        termos = palavras(consulta)
+        procurados = trigramas(consulta)
+        if not procurados:
+            return [], False
+
+        with self._trava:
+            ids, lista_palavras = self._ids, self._palavras
+            encontradas = [
+                self._listas[trigrama] for trigrama in procurados
+                if trigrama in self._listas
+            ]
+        if not encontradas:
+            return [], False
+
+        posicoes, contagens = np.unique(
+            np.concatenate(encontradas), return_counts=True)
+        fracoes = contagens / len(procurados)
+        selecionadas = fracoes >= limiar
+        posicoes, fracoes = posicoes[selecionadas], fracoes[selecionadas]
+        # os mais parecidos pelos trigramas; empates pela ordem dos IDs
+        ordem = np.lexsort((ids[posicoes], -fracoes))[:MAX_CANDIDATOS]
+
+        pontuados, restantes, estourou = [], [], False
+        for indice in ordem:
+            posicao = posicoes[indice]
+            if estourou or (prazo is not None and time.monotonic() > prazo):
+                estourou = True
+                restantes.append(int(ids[posicao]))
+                continue
+            similaridade = jaro_winkler(termos, lista_palavras[posicao])
+            if similaridade >= LIMIAR_JARO_WINKLER:
+                pontuados.append((int(ids[posicao]), similaridade))
+
+        pontuados.sort(key=lambda item: (-item[1], item[0]))
+        return pontuados + [(id, 0.0) for id in restantes], estourou
+
+    def tamanho(self) -> int:
+        with self._trava:
+            return len(self._ids)
+
+
+# DDL do Postgres, executada pelo create_all (db/models.py) e pela migração
+# 0002_busca_aproximada. O unaccent não é IMMUTABLE e não pode ser usado
+# em índices; sem_acento() fixa o dicionário e pode.
+
+DDL_POSTGRES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    CREATE OR REPLACE FUNCTION sem_acento(text) RETURNS text AS $$
+        SELECT public.unaccent('public.unaccent'::regdictionary, lower($1))
+    $$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+    """,
+] + [
+    f"CREATE INDEX IF NOT EXISTS ix_{tabela}_{coluna}_trgm "
+    f"ON {tabela} USING gin (sem_acento({coluna}) gin_trgm_ops)"
+    for tabela, coluna in COLUNAS.items()
+]
+
+DDL_REMOCAO_POSTGRES = [
+    f"DROP INDEX IF EXISTS ix_{tabela}_{coluna}_trgm"
+    for tabela, coluna in COLUNAS.items()
+] + [
+    "DROP FUNCTION IF EXISTS sem_acento(text)",
+]
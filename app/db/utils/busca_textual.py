@@ -0,0 +1,257 @@
+import re
+import typing as t
+import unicodedata
+
+# Busca textual de pessoas e projetos. No Postgres, tb_pessoa.busca e
+# tb_projeto.busca guardam um tsvector (configuração portuguesa sem
+# acentos) mantido por triggers e indexado com GIN; a consulta é um
+# to_tsquery com prefixo em cada termo, ordenada por ts_rank. Nos outros
+# bancos (sqlite dos testes e benchmarks) a mesma busca é feita em memória
+# por db/pesquisa/textual.py, com a normalização e os pesos daqui.
+#
+# Pesos de cada campo no vetor (A é o mais relevante):
+#   tb_pessoa:  nome A, usuario B, áreas e habilidades C
+#   tb_projeto: nome A, objetivo B, descricao C, áreas e habilidades D
+
+CONFIGURACAO = "portugues_sem_acento"
+
+# peso de cada letra no ts_rank (os padrões do Postgres: D, C, B, A)
+PESOS = {"A": 1.0, "B": 0.4, "C": 0.2, "D": 0.1}
+
+# termos considerados por consulta
+MAX_TERMOS = 10
+
+
+def normaliza(texto: str) -> str:
+
+    '''
+        Minúsculas e sem acentos, como o unaccent da configuração do
+        Postgres
+    '''
+
+    decomposto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def termos(consulta: str, acentos: bool = False) -> t.List[str]:
+
+    '''
+        Palavras da consulta, em minúsculas, sem repetição e na ordem em
+        que aparecem
+
+        Entrada: texto digitado, se os acentos devem ser mantidos
+
+        Saída: lista de termos (no máximo MAX_TERMOS)
+    '''
+
+    texto = consulta.lower() if acentos else normaliza(consulta)
+    vistos = []
+    for termo in re.findall(r"\w+", texto):
+        if termo not in vistos:
+            vistos.append(termo)
+    return vistos[:MAX_TERMOS]
+
+
+def tsquery(consulta: str, pesos: str = "") -> t.Optional[str]:
+
+    '''
+        Monta o texto do to_tsquery: todos os termos (&), cada um como
+        prefixo e restrito aos campos dos pesos indicados
+
+        Entrada: texto digitado, pesos ("A" busca só no nome; "" em todos
+                 os campos)
+
+        Saída: texto do tsquery, ou None se a consulta não tem termos
+    '''
+
+    # os acentos ficam para o unaccent da configuração, como no tsvector
+    lista = termos(consulta, acentos=True)
+    if not lista:
+        return None
+    # \w+ não deixa passar os operadores do tsquery (& | ! : ( ) ')
+    return " & ".join(f"{termo}:*{pesos}" for termo in lista)
+
+
+def pontua(
+    consulta: t.List[str], campos: t.Dict[str, t.Iterable[str]]
+) -> float:
+
+    '''
+        Pontuação de um documento na busca em memória: cada termo precisa
+        ser prefixo de alguma palavra e vale o peso do campo mais relevante
+        onde aparece
+
+        Entrada: termos da consulta, {peso: textos do campo}
+
+        Saída: pontuação (0 quando algum termo não aparece)
+    '''
+
+    palavras = {
+        peso: re.findall(r"\w+", normaliza(" ".join(textos)))
+        for peso, textos in campos.items()
+    }
+
+    total = 0.0
+    for termo in consulta:
+        melhor = max(
+            (PESOS[peso] for peso, lista in palavras.items()
+             if any(palavra.startswith(termo) for palavra in lista)),
+            default=0.0,
+        )
+        if not melhor:
+            return 0.0
+        total += melhor
+    return total
+
+
+# DDL do Postgres, executada pelo create_all (db/models.py) e pela migração
+# 0001_busca_textual
+
+_DDL_PESSOA = """
+CREATE OR REPLACE FUNCTION vetor_busca_pessoa(
+    p_id integer, p_nome text, p_usuario text
+) RETURNS tsvector AS $$
+    SELECT
+        setweight(to_tsvector('{config}', coalesce(p_nome, '')), 'A')
+        || setweight(to_tsvector('{config}', coalesce(p_usuario, '')), 'B')
+        || setweight(to_tsvector('{config}', concat_ws(' ',
+            (SELECT string_agg(a.descricao, ' ')
+               FROM tb_pessoa_area pa JOIN tb_area a ON a.id = pa.area_id
+              WHERE pa.pessoa_id = p_id),
+            (SELECT string_agg(h.nome, ' ')
+               FROM tb_habilidades_pessoa hp
+               JOIN tb_habilidades h ON h.id = hp.habilidade_id
+              WHERE hp.pessoa_id = p_id)
+        )), 'C')
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION atualiza_busca_pessoa() RETURNS trigger AS $$
+BEGIN
+    NEW.busca := vetor_busca_pessoa(NEW.id, NEW.nome, NEW.usuario);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tg_busca_pessoa ON tb_pessoa;
+CREATE TRIGGER tg_busca_pessoa
+    BEFORE INSERT OR UPDATE OF nome, usuario, busca ON tb_pessoa
+    FOR EACH ROW EXECUTE PROCEDURE atualiza_busca_pessoa();
+"""
+
+_DDL_PROJETO = """
+CREATE OR REPLACE FUNCTION vetor_busca_projeto(
+    p_id integer, p_nome text, p_objetivo text, p_descricao text
+) RETURNS tsvector AS $$
+    SELECT
+        setweight(to_tsvector('{config}', coalesce(p_nome, '')), 'A')
+        || setweight(to_tsvector('{config}', coalesce(p_objetivo, '')), 'B')
+        || setweight(to_tsvector('{config}', coalesce(p_descricao, '')), 'C')
+        || setweight(to_tsvector('{config}', concat_ws(' ',
+            (SELECT string_agg(a.descricao, ' ')
+               FROM tb_projeto_area pa JOIN tb_area a ON a.id = pa.area_id
+              WHERE pa.projeto_id = p_id),
+            (SELECT string_agg(h.nome, ' ')
+               FROM tb_habilidades_projeto hp
+               JOIN tb_habilidades h ON h.id = hp.habilidade_id
+              WHERE hp.projeto_id = p_id)
+        )), 'D')
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION atualiza_busca_projeto() RETURNS trigger AS $$
+BEGIN
+    NEW.busca := vetor_busca_projeto(
+        NEW.id, NEW.nome, NEW.objetivo, NEW.descricao);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tg_busca_projeto ON tb_projeto;
+CREATE TRIGGER tg_busca_projeto
+    BEFORE INSERT OR UPDATE OF nome, objetivo, descricao, busca ON tb_projeto
+    FOR EACH ROW EXECUTE PROCEDURE atualiza_busca_projeto();
+"""
+
+# Associações e nomes das tags: "SET busca = NULL" dispara o trigger acima,
+# que recalcula o vetor
+_DDL_TAGS = """
+CREATE OR REPLACE FUNCTION recalcula_busca_tags() RETURNS trigger AS $$
+DECLARE
+    linha record;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        linha := OLD;
+    ELSE
+        linha := NEW;
+    END IF;
+
+    IF TG_TABLE_NAME IN ('tb_pessoa_area', 'tb_habilidades_pessoa') THEN
+        UPDATE tb_pessoa SET busca = NULL WHERE id = linha.pessoa_id;
+    ELSIF TG_TABLE_NAME IN ('tb_projeto_area', 'tb_habilidades_projeto') THEN
+        UPDATE tb_projeto SET busca = NULL WHERE id = linha.projeto_id;
+    ELSIF TG_TABLE_NAME = 'tb_area' THEN
+        UPDATE tb_pessoa SET busca = NULL WHERE id IN (
+            SELECT pessoa_id FROM tb_pessoa_area WHERE area_id = linha.id);
+        UPDATE tb_projeto SET busca = NULL WHERE id IN (
+            SELECT projeto_id FROM tb_projeto_area WHERE area_id = linha.id);
+    ELSIF TG_TABLE_NAME = 'tb_habilidades' THEN
+        UPDATE tb_pessoa SET busca = NULL WHERE id IN (
+            SELECT pessoa_id FROM tb_habilidades_pessoa
+             WHERE habilidade_id = linha.id);
+        UPDATE tb_projeto SET busca = NULL WHERE id IN (
+            SELECT projeto_id FROM tb_habilidades_projeto
+             WHERE habilidade_id = linha.id);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+_TRIGGERS_TAGS = [
+    ("tb_pessoa_area", "INSERT OR DELETE"),
+    ("tb_habilidades_pessoa", "INSERT OR DELETE"),
+    ("tb_projeto_area", "INSERT OR DELETE"),
+    ("tb_habilidades_projeto", "INSERT OR DELETE"),
+    ("tb_area", "UPDATE OF descricao"),
+    ("tb_habilidades", "UPDATE OF nome"),
+]
+
+DDL_POSTGRES = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    f"""
+    DO $$ BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_ts_config WHERE cfgname = '{CONFIGURACAO}'
+        ) THEN
+            CREATE TEXT SEARCH CONFIGURATION {CONFIGURACAO} (COPY = portuguese);
+            ALTER TEXT SEARCH CONFIGURATION {CONFIGURACAO}
+                ALTER MAPPING FOR hword, hword_part, word
+                WITH unaccent, portuguese_stem;
+        END IF;
+    END $$
+    """,
+    _DDL_PESSOA.format(config=CONFIGURACAO),
+    _DDL_PROJETO.format(config=CONFIGURACAO),
+    _DDL_TAGS,
+] + [
+    f"""
+    DROP TRIGGER IF EXISTS tg_busca_{tabela} ON {tabela};
+    CREATE TRIGGER tg_busca_{tabela}
+        AFTER {eventos} ON {tabela}
+        FOR EACH ROW EXECUTE PROCEDURE recalcula_busca_tags();
+    """
+    for tabela, eventos in _TRIGGERS_TAGS
+]
+
+DDL_REMOCAO_POSTGRES = [
+    f"DROP TRIGGER IF EXISTS tg_busca_{tabela} ON {tabela}"
+    for tabela, _ in _TRIGGERS_TAGS
+] + [
+    "DROP TRIGGER IF EXISTS tg_busca_pessoa ON tb_pessoa",
+    "DROP TRIGGER IF EXISTS tg_busca_projeto ON tb_projeto",
+    "DROP FUNCTION IF EXISTS recalcula_busca_tags()",
+    "DROP FUNCTION IF EXISTS atualiza_busca_pessoa()",
+    "DROP FUNCTION IF EXISTS atualiza_busca_projeto()",
+    "DROP FUNCTION IF EXISTS vetor_busca_pessoa(integer, text, text)",
+    "DROP FUNCTION IF EXISTS vetor_busca_projeto(integer, text, text, text)",
+    f"DROP TEXT SEARCH CONFIGURATION IF EXISTS {CONFIGURACAO}",
+]
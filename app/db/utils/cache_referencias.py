@@ -0,0 +1,343 @@
+import json
+import logging
+import os
+import threading
+import time
+import typing as t
+import uuid
+
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from core import config, metricas
+from db import models
+
+logger = logging.getLogger(__name__)
+
+M = t.TypeVar("M")
+
+# Canal do Redis em que cada worker avisa os outros de que uma tabela de
+# referência mudou
+CANAL = "cache_referencias"
+# identifica este processo nas mensagens, para ignorar as próprias
+ORIGEM = f"{os.getpid()}-{uuid.uuid4().hex}"
+
+# tabela: caches dela
+_caches: t.Dict[str, t.List["CacheReferencias"]] = {}
+# tabela: outras cópias em memória a invalidar quando ela muda em outro
+# worker (árvore de áreas, índices do autocompletar)
+_ouvintes: t.Dict[str, t.List[t.Callable[[], None]]] = {}
+_trava_registro = threading.Lock()
+
+
+class CacheReferencias(t.Generic[M]):
+    '''
+        Cópia em memória, por worker, de uma tabela de referência pequena
+        e que quase não muda (papéis, tipos de acordo, áreas, habilidades),
+        para que as buscas por ID não vão ao banco.
+
+        A tabela inteira é lida com uma consulta só de colunas no primeiro
+        acesso e quando expira o TTL da tabela; IDs que não estão na cópia
+        (criados em outro worker, por exemplo) são buscados um a um e
+        acrescentados (read-through). As instâncias devolvidas são montadas
+        com os dados da cópia e ligadas à sessão sem consulta.
+
+        Os hooks de criação, edição e remoção do crud da tabela atualizam a
+        cópia deste worker e, com CACHE_REFERENCIAS_REDIS, avisam os outros
+        workers pelo Redis para descartarem as suas.
+    '''
+
+    def __init__(self, modelo: t.Type[M], ttl: int = 0):
+        self.modelo = modelo
+        self.tabela = modelo.__tablename__
+        self.colunas = [coluna.key for coluna in modelo.__table__.columns]
+        self.ttl = ttl
+        self.construido_em = None
+        # id: valores das colunas
+        self._linhas = {}
+        self._trava = threading.Lock()
+
+        self.acertos = 0
+        self.faltas = 0
+        self.recargas = 0
+        self.invalidacoes = 0
+
+        with _trava_registro:
+            _caches.setdefault(self.tabela, []).append(self)
+
+    def expirado(self) -> bool:
+        if self.construido_em is None:
+            return True
+        if not self.ttl:
+            return False
+        return time.monotonic() - self.construido_em > self.ttl
+
+    def _consulta(self, db: Session):
+        return db.query(*(
+            getattr(self.modelo, coluna) for coluna in self.colunas))
+
+    def _adiciona(self, linha: dict):
+        self._linhas[linha["id"]] = linha
+
+    def _retira(self, id: int) -> t.Optional[dict]:
+        return self._linhas.pop(id, None)
+
+    def carrega(self, linhas: t.Iterable[t.Sequence]):
+
+        '''
+            Monta a cópia do zero
+
+            Entrada: linhas com os valores das colunas, na ordem do modelo
+
+            Saída:
+        '''
+
+        with self._trava:
+            self._linhas = {}
+            self._limpa()
+            for linha in linhas:
+                self._adiciona(dict(zip(self.colunas, linha)))
+            self.construido_em = time.monotonic()
+            self.recargas += 1
+
+    def _limpa(self):
+        # índices extras das subclasses
+        pass
+
+    def garante_atualizado(self, db: Session) -> bool:
+
+        '''
+            Relê a tabela se a cópia expirou
+
+            Saída: se a tabela foi relida
+        '''
+
+        if not self.expirado():
+            return False
+        self.carrega(self._consulta(db))
+        return True
+
+    def acrescenta(self, linhas: t.Iterable[t.Sequence]):
+        with self._trava:
+            for linha in linhas:
+                self._adiciona(dict(zip(self.colunas, linha)))
+
+    def conta(self, acertos: int = 0, faltas: int = 0):
+        with self._trava:
+            self.acertos += acertos
+            self.faltas += faltas
+
+    def get(self, db: Session, id: int) -> t.Optional[M]:
+
+        '''
+            Registro pelo ID, da cópia em memória ou, se não estiver nela,
+            do banco
+
+            Entrada: ID
+
+            Saída: Instância ligada à sessão, ou None se não existe
+        '''
+
+        recarregado = self.garante_atualizado(db)
+
+        with self._trava:
+            linha = self._linhas.get(id)
+
+        if linha is None and not recarregado:
+            self.acrescenta(
+                self._consulta(db).filter(self.modelo.id == id).all())
+            with self._trava:
+                linha = self._linhas.get(id)
+            self.conta(faltas=1)
+        elif linha is None:
+            self.conta(faltas=1)
+        else:
+            self.conta(acertos=1)
+
+        return self.instancia(db, linha) if linha is not None else None
+
+    def instancia(self, db: Session, linha: dict) -> M:
+        # uma instância "persistida" montada com os dados da cópia e ligada
+        # à sessão sem consulta (load=False); se o registro já está na
+        # sessão, o merge devolve o que está lá
+        registro = self.modelo(**linha)
+        make_transient_to_detached(registro)
+        return db.merge(registro, load=False)
+
+    def atualiza(self, registro: M):
+
+        '''
+            Hook chamado após criar ou editar um registro
+        '''
+
+        if self.construido_em is not None:
+            with self._trava:
+                self._retira(registro.id)
+                self._adiciona({
+                    coluna: getattr(registro, coluna)
+                    for coluna in self.colunas
+                })
+        publica(self.tabela)
+
+    def remove(self, id: int):
+
+        '''
+            Hook chamado após apagar um registro
+        '''
+
+        with self._trava:
+            self._retira(id)
+        publica(self.tabela)
+
+    def invalida(self):
+
+        '''
+            Descarta a cópia deste worker e avisa os outros
+        '''
+
+        self.invalida_local()
+        publica(self.tabela)
+
+    def invalida_local(self):
+        with self._trava:
+            self.construido_em = None
+            self.invalidacoes += 1
+
+    def dicionario(self) -> t.Dict[str, t.Any]:
+        with self._trava:
+            consultas = self.acertos + self.faltas
+            return {
+                "registros": len(self._linhas),
+                "ttl": self.ttl,
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "taxa_acertos":
+                    self.acertos / consultas if consultas else 0.0,
+                "recargas": self.recargas,
+                "invalidacoes": self.invalidacoes,
+            }
+
+
+def ao_invalidar(tabela: str, funcao: t.Callable[[], None]):
+
+    '''
+        Registra uma função a chamar quando outro worker avisa que a tabela
+        mudou
+    '''
+
+    with _trava_registro:
+        _ouvintes.setdefault(tabela, []).append(funcao)
+
+
+class Difusao:
+    '''
+        Avisos de invalidação entre os workers pelo pub/sub do Redis
+        (REDIS_URL), ativados por CACHE_REFERENCIAS_REDIS. Falhas do Redis
+        só são registradas: cada worker continua com a própria cópia, que
+        expira pelo TTL.
+    '''
+
+    def __init__(self):
+        self._cliente = None
+        self._escuta = None
+        self._trava = threading.Lock()
+        self.publicadas = 0
+        self.recebidas = 0
+        self.falhas = 0
+
+    def ativa(self) -> bool:
+        return config.CACHE_REFERENCIAS_REDIS and bool(config.REDIS_URL)
+
+    def _conecta(self):
+        # redis só é necessário com a difusão ativa
+        import redis
+
+        with self._trava:
+            if self._cliente is None:
+                self._cliente = redis.Redis.from_url(config.REDIS_URL)
+            return self._cliente
+
+    def publica(self, tabela: str):
+        if not self.ativa():
+            return
+        try:
+            self._conecta().publish(
+                CANAL, json.dumps({"tabela": tabela, "origem": ORIGEM}))
+            self.publicadas += 1
+        except Exception:
+            self.falhas += 1
+            logger.warning(
+                "falha ao avisar a invalidação de %s", tabela, exc_info=True)
+
+    def recebe(self, mensagem: dict):
+        try:
+            aviso = json.loads(mensagem["data"])
+        except (TypeError, ValueError):
+            return
+        if aviso.get("origem") == ORIGEM:
+            return
+
+        self.recebidas += 1
+        tabela = aviso.get("tabela")
+        with _trava_registro:
+            caches = list(_caches.get(tabela, ()))
+            ouvintes = list(_ouvintes.get(tabela, ()))
+        for cache in caches:
+            cache.invalida_local()
+        for ouvinte in ouvintes:
+            ouvinte()
+
+    def inicia(self):
+
+        '''
+            Passa a ouvir os avisos dos outros workers, em uma thread; cada
+            worker chama uma vez, no startup
+        '''
+
+        if not self.ativa() or self._escuta is not None:
+            return
+        try:
+            assinatura = self._conecta().pubsub(
+                ignore_subscribe_messages=True)
+            assinatura.subscribe(**{CANAL: self.recebe})
+            self._escuta = assinatura.run_in_thread(
+                sleep_time=1, daemon=True)
+        except Exception:
+            self.falhas += 1
+            logger.warning(
+                "falha ao ouvir as invalidações do cache", exc_info=True)
+
+    def dicionario(self) -> t.Dict[str, t.Any]:
+        return {
+            "ativa": self.ativa(),
+            "ouvindo": self._escuta is not None,
+            "publicadas": self.publicadas,
+            "recebidas": self.recebidas,
+            "falhas": self.falhas,
+        }
+
+
+difusao = Difusao()
+
+
+def publica(tabela: str):
+    difusao.publica(tabela)
+
+
+def inicia_escuta():
+    difusao.inicia()
+
+
+def estatisticas() -> t.Dict[str, t.Any]:
+    with _trava_registro:
+        caches = [cache for lista in _caches.values() for cache in lista]
+    return {
+        "tabelas": {cache.tabela: cache.dicionario() for cache in caches},
+        "difusao": difusao.dicionario(),
+    }
+
+
+metricas.registra("cache_referencias", estatisticas)
+
+cache_papeis = CacheReferencias(models.Papel, ttl=config.CACHE_PAPEL_TTL)
+cache_tipos_acordo = CacheReferencias(
+    models.TipoAcordo, ttl=config.CACHE_TIPO_ACORDO_TTL)
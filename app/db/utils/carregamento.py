@@ -0,0 +1,81 @@
+import typing as t
+
+from sqlalchemy.orm import Query, configure_mappers, joinedload, selectinload
+
+from db import models
+
+# Perfis de carregamento: os relacionamentos que cada schema de resposta
+# serializa, carregados junto com a consulta principal (uma consulta extra
+# por relacionamento, com IN) em vez de um lazy load por objeto. O schema
+# indica o seu perfil em Config.perfil.
+
+# os backrefs (Projeto.projeto_reacoes) só existem depois de configurados
+configure_mappers()
+
+PESSOA = "pessoa"
+PESSOA_COMPLETA = "pessoa_completa"
+PROJETO = "projeto"
+VAGA = "vaga"
+VAGA_PESSOA = "vaga_pessoa"
+
+_pessoa = [
+    selectinload(models.Pessoa.habilidades),
+    selectinload(models.Pessoa.areas),
+]
+
+_vaga = [
+    selectinload(models.PessoaProjeto.habilidades),
+    selectinload(models.PessoaProjeto.areas),
+]
+
+PERFIS = {
+    PESSOA: _pessoa,
+    PESSOA_COMPLETA: _pessoa + [
+        selectinload(models.Pessoa.experiencia_profissional)
+        .selectinload(models.ExperienciaProf.areas),
+        selectinload(models.Pessoa.experiencia_projetos)
+        .selectinload(models.ExperienciaProj.areas),
+        selectinload(models.Pessoa.experiencia_academica)
+        .selectinload(models.ExperienciaAcad.areas),
+    ],
+    PROJETO: [
+        selectinload(models.Projeto.habilidades),
+        selectinload(models.Projeto.areas),
+        selectinload(models.Projeto.projeto_reacoes),
+    ],
+    VAGA: _vaga,
+    VAGA_PESSOA: _vaga + [
+        joinedload(models.PessoaProjeto.pessoa)
+        .selectinload(models.Pessoa.habilidades),
+        joinedload(models.PessoaProjeto.pessoa)
+        .selectinload(models.Pessoa.areas),
+    ],
+}
+
+
+def carrega(consulta: Query, perfil: t.Optional[str]) -> Query:
+
+    '''
+        Aplica à consulta as opções de carregamento do perfil
+
+        Entrada: consulta, nome do perfil (None não altera a consulta)
+
+        Saída: consulta
+
+        Exceções: Perfil inexistente (KeyError)
+    '''
+
+    if not perfil:
+        return consulta
+
+    return consulta.options(*PERFIS[perfil])
+
+
+def perfil_de(schema) -> t.Optional[str]:
+
+    '''
+        Perfil de carregamento de um schema de resposta, declarado em
+        Config.perfil
+    '''
+
+    return getattr(schema.__config__, "perfil", None)
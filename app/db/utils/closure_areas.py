@@ -0,0 +1,118 @@
+'''
+    Manutenção de tb_area_closure: uma linha (ancestral, descendente,
+    profundidade) para cada par de áreas ligadas na hierarquia, inclusive
+    cada área com ela mesma (profundidade 0).
+
+    As funções são registradas como eventos do mapper de Area (db/models.py)
+    e rodam na mesma transação do INSERT/UPDATE/DELETE da área, então a
+    tabela acompanha area_pai_id em toda escrita feita pelo ORM: crud,
+    fixtures dos testes, scripts. A tabela vem dos metadados do próprio
+    modelo, o que evita importar db.models aqui.
+'''
+
+from sqlalchemy import and_, inspect, literal, select
+
+TABELA = "tb_area_closure"
+
+
+def _closure(area):
+    return area.metadata.tables[TABELA]
+
+
+def insere(conexao, closure, area_id: int, area_pai_id):
+
+    '''
+        Adiciona a área com ela mesma e abaixo de todos os ancestrais do pai
+    '''
+
+    conexao.execute(closure.insert().values(
+        ancestor_id=area_id, descendant_id=area_id, depth=0))
+    if area_pai_id is None:
+        return
+    conexao.execute(closure.insert().from_select(
+        ["ancestor_id", "descendant_id", "depth"],
+        select([
+            closure.c.ancestor_id,
+            literal(area_id),
+            closure.c.depth + 1,
+        ]).where(closure.c.descendant_id == area_pai_id),
+    ))
+
+
+def move(conexao, closure, area_id: int, area_pai_id):
+
+    '''
+        Leva a área e toda a sua subárvore para baixo de outro pai (ou para
+        a raiz): apaga os caminhos que vinham de fora da subárvore e cria
+        os que passam pelo novo pai
+    '''
+
+    subarvore = select([closure.c.descendant_id])\
+        .where(closure.c.ancestor_id == area_id)
+    conexao.execute(closure.delete().where(and_(
+        closure.c.descendant_id.in_(subarvore),
+        ~closure.c.ancestor_id.in_(subarvore),
+    )))
+    if area_pai_id is None:
+        return
+
+    acima = closure.alias("acima")
+    abaixo = closure.alias("abaixo")
+    conexao.execute(closure.insert().from_select(
+        ["ancestor_id", "descendant_id", "depth"],
+        select([
+            acima.c.ancestor_id,
+            abaixo.c.descendant_id,
+            acima.c.depth + abaixo.c.depth + 1,
+        ]).where(and_(
+            acima.c.descendant_id == area_pai_id,
+            abaixo.c.ancestor_id == area_id,
+        )),
+    ))
+
+
+def remove(conexao, closure, area_id: int):
+    conexao.execute(closure.delete().where(
+        (closure.c.ancestor_id == area_id) |
+        (closure.c.descendant_id == area_id)
+    ))
+
+
+def apos_inserir(mapper, conexao, area):
+    insere(conexao, _closure(area), area.id, area.area_pai_id)
+
+
+def apos_atualizar(mapper, conexao, area):
+    if inspect(area).attrs.area_pai_id.history.has_changes():
+        move(conexao, _closure(area), area.id, area.area_pai_id)
+
+
+def antes_de_apagar(mapper, conexao, area):
+    remove(conexao, _closure(area), area.id)
+
+
+# (evento do mapper, função)
+EVENTOS = [
+    ("after_insert", apos_inserir),
+    ("after_update", apos_atualizar),
+    ("before_delete", antes_de_apagar),
+]
+
+# Preenche a tabela a partir de area_pai_id, para bancos que já tinham
+# áreas (migração 0003_area_closure). Nenhum caminho sem ciclos é mais
+# longo que a quantidade de áreas, o que encerra a recursão mesmo que
+# area_pai_id tenha algum ciclo.
+SQL_PREENCHIMENTO = f"""
+    INSERT INTO {TABELA} (ancestor_id, descendant_id, depth)
+    WITH RECURSIVE caminhos(ancestor_id, descendant_id, depth) AS (
+        SELECT id, id, 0 FROM tb_area
+        UNION
+        SELECT caminhos.ancestor_id, tb_area.id, caminhos.depth + 1
+        FROM caminhos
+        JOIN tb_area ON tb_area.area_pai_id = caminhos.descendant_id
+        WHERE caminhos.depth < (SELECT count(*) FROM tb_area)
+    )
+    SELECT ancestor_id, descendant_id, min(depth)
+    FROM caminhos
+    GROUP BY ancestor_id, descendant_id
+"""
@@ -0,0 +1,258 @@
+from array import array
+from bisect import bisect_left
+import threading
+import time
+import typing as t
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from core import config
+from db import models
+
+PAPEIS = ("aliado", "colaborador", "idealizador")
+HABILIDADE = "habilidade"
+AREA = "area"
+
+# (papeis, IDs das habilidades, IDs das áreas) de uma pessoa
+Retrato = t.Tuple[t.Tuple[str, ...], t.Tuple[int, ...], t.Tuple[int, ...]]
+RETRATO_VAZIO: Retrato = ((), (), ())
+
+
+def _insere(lista: array, valor: int):
+    posicao = bisect_left(lista, valor)
+    if posicao == len(lista) or lista[posicao] != valor:
+        lista.insert(posicao, valor)
+
+
+def _remove(lista: array, valor: int):
+    posicao = bisect_left(lista, valor)
+    if posicao < len(lista) and lista[posicao] == valor:
+        del lista[posicao]
+
+
+class IndiceTags:
+    '''
+        Índice invertido em memória usado no matchmaking. Para cada papel
+        e cada habilidade/área guarda a lista ordenada dos IDs das pessoas
+        que a possuem, em arrays de inteiros de 32 bits, além da lista das
+        pessoas de cada papel com ao menos uma habilidade ou área.
+
+        O índice é montado a partir de tb_habilidades_pessoa e
+        tb_pessoa_area, mantido pelos hooks de create_pessoa/edit_pessoa e
+        reconstruído sob demanda ou quando expira o INDICE_TAGS_TTL.
+    '''
+
+    def __init__(self, ttl: int = 0):
+        self.ttl = ttl
+        self.construido_em = None
+        self._listas = {}
+        self._candidatos = {}
+        self._trava = threading.RLock()
+
+    @property
+    def construido(self) -> bool:
+        return self.construido_em is not None
+
+    def expirado(self) -> bool:
+        if not self.construido:
+            return True
+        if not self.ttl:
+            return False
+        return time.monotonic() - self.construido_em > self.ttl
+
+    def carrega(
+        self,
+        linhas: t.Iterable[t.Tuple[int, str, int, t.Iterable[str]]]
+    ):
+
+        '''
+            Monta o índice do zero
+
+            Entrada: linhas (pessoa_id, tipo, tag_id, papeis), onde tipo
+                     é HABILIDADE ou AREA
+
+            Saída:
+        '''
+
+        listas = {}
+        candidatos = {papel: [] for papel in PAPEIS}
+
+        for pessoa_id, tipo, tag_id, papeis in linhas:
+            for papel in papeis:
+                listas.setdefault((papel, tipo, tag_id), []).append(pessoa_id)
+                candidatos[papel].append(pessoa_id)
+
+        listas = {
+            chave: array("i", sorted(set(ids))) for chave, ids in listas.items()
+        }
+        candidatos = {
+            papel: array("i", sorted(set(ids)))
+            for papel, ids in candidatos.items()
+        }
+
+        with self._trava:
+            self._listas = listas
+            self._candidatos = candidatos
+            self.construido_em = time.monotonic()
+
+    def reconstroi(self, db: Session):
+
+        '''
+            Reconstrói o índice com duas consultas, uma por tabela de
+            associação, sem carregar entidades do ORM
+        '''
+
+        colunas_papeis = [getattr(models.Pessoa, papel) for papel in PAPEIS]
+
+        def linhas():
+            for tipo, tabela, coluna in (
+                (HABILIDADE, models.HabilidadesPessoa,
+                 models.HabilidadesPessoa.c.habilidade_id),
+                (AREA, models.PessoaArea, models.PessoaArea.c.area_id),
+            ):
+                consulta = db.query(tabela.c.pessoa_id, coluna, *colunas_papeis)\
+                    .join(models.Pessoa, models.Pessoa.id == tabela.c.pessoa_id)\
+                    .yield_per(10000)
+
+                for pessoa_id, tag_id, *flags in consulta:
+                    papeis = [
+                        papel for papel, flag in zip(PAPEIS, flags) if flag
+                    ]
+                    yield pessoa_id, tipo, tag_id, papeis
+
+        self.carrega(linhas())
+
+    def garante_atualizado(self, db: Session):
+        if self.expirado():
+            self.reconstroi(db)
+
+    def retrato(self, pessoa: models.Pessoa) -> t.Optional[Retrato]:
+
+        '''
+            Extrai papeis, habilidades e áreas de uma pessoa para
+            posterior atualização do índice. Retorna None, sem tocar nos
+            relacionamentos, enquanto o índice não estiver construído
+        '''
+
+        if not self.construido:
+            return None
+
+        return (
+            tuple(papel for papel in PAPEIS if getattr(pessoa, papel)),
+            tuple(habilidade.id for habilidade in pessoa.habilidades),
+            tuple(area.id for area in pessoa.areas),
+        )
+
+    def atualiza(
+        self,
+        pessoa_id: int,
+        anterior: t.Optional[Retrato],
+        atual: t.Optional[Retrato]
+    ):
+
+        '''
+            Atualiza as listas de uma pessoa a partir dos retratos antes e
+            depois da alteração. Retratos ausentes contam como vazios
+        '''
+
+        if not self.construido:
+            return
+
+        anterior = anterior or RETRATO_VAZIO
+        atual = atual or RETRATO_VAZIO
+
+        def chaves(retrato):
+            papeis, habilidades, areas = retrato
+            return {
+                (papel, tipo, tag_id)
+                for papel in papeis
+                for tipo, tags in ((HABILIDADE, habilidades), (AREA, areas))
+                for tag_id in tags
+            }
+
+        def papeis_candidato(retrato):
+            papeis, habilidades, areas = retrato
+            return set(papeis) if habilidades or areas else set()
+
+        chaves_anteriores, chaves_atuais = chaves(anterior), chaves(atual)
+
+        with self._trava:
+            for chave in chaves_anteriores - chaves_atuais:
+                lista = self._listas.get(chave)
+                if lista is not None:
+                    _remove(lista, pessoa_id)
+
+            for chave in chaves_atuais - chaves_anteriores:
+                _insere(self._listas.setdefault(chave, array("i")), pessoa_id)
+
+            papeis_anteriores = papeis_candidato(anterior)
+            papeis_atuais = papeis_candidato(atual)
+
+            for papel in papeis_anteriores - papeis_atuais:
+                _remove(self._candidatos[papel], pessoa_id)
+
+            for papel in papeis_atuais - papeis_anteriores:
+                _insere(self._candidatos[papel], pessoa_id)
+
+    def lista(self, papel: str, tipo: str, tag_id: int) -> np.ndarray:
+
+        '''
+            Pessoas do papel que possuem a habilidade ou área
+        '''
+
+        with self._trava:
+            return np.array(
+                self._listas.get((papel, tipo, tag_id), ()), dtype=np.int32)
+
+    def candidatos(self, papel: str) -> np.ndarray:
+
+        '''
+            Pessoas do papel com ao menos uma habilidade ou área
+        '''
+
+        with self._trava:
+            return np.array(self._candidatos.get(papel, ()), dtype=np.int32)
+
+    def tamanho_bytes(self) -> int:
+        with self._trava:
+            listas = list(self._listas.values()) + list(self._candidatos.values())
+            return sum(lista.itemsize * len(lista) for lista in listas)
+
+
+indice_tags = IndiceTags(ttl=config.INDICE_TAGS_TTL)
+
+
+def indice_tags_ativo() -> bool:
+    return config.INDICE_TAGS_ATIVO
+
+
+def retrato_pessoa(pessoa: models.Pessoa) -> t.Optional[Retrato]:
+    if not indice_tags_ativo():
+        return None
+    return indice_tags.retrato(pessoa)
+
+
+def atualiza_indice_pessoa(
+    pessoa: models.Pessoa,
+    anterior: t.Optional[Retrato] = None
+):
+
+    '''
+        Hook chamado após criar ou editar uma pessoa
+    '''
+
+    if not indice_tags_ativo():
+        return
+    indice_tags.atualiza(pessoa.id, anterior, indice_tags.retrato(pessoa))
+
+
+def remove_pessoa_indice(pessoa_id: int, anterior: t.Optional[Retrato]):
+
+    '''
+        Hook chamado após apagar uma pessoa
+    '''
+
+    if not indice_tags_ativo():
+        return
+    indice_tags.atualiza(pessoa_id, anterior, None)
@@ -0,0 +1,452 @@
+from array import array
+from collections import Counter
+from math import log, sqrt
+import threading
+import time
+import typing as t
+
+import numpy as np
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import Session
+
+from core import config
+from db import models
+from db.ranking_vaga.crud import get_tags_pessoa, invalida_ranking_pessoa
+from db.utils.texto import pre_processing
+
+# tabelas cujas descrições compõem o texto de uma pessoa
+EXPERIENCIAS = (
+    models.ExperienciaProf,
+    models.ExperienciaProj,
+    models.ExperienciaAcad,
+)
+
+# fração de entradas descartadas a partir da qual as matrizes são compactadas
+LIMITE_DESCARTADAS = 0.5
+# descrições de vagas tokenizadas guardadas; passando disso, as usadas há
+# mais tempo saem
+MAXIMO_VAGAS = 10000
+
+
+def tokeniza(texto: t.Optional[str]) -> t.List[str]:
+    return pre_processing(texto or "").split()
+
+
+def pesos_termos(textos: t.Iterable[str]) -> t.Dict[str, float]:
+    contagens = Counter(
+        termo for texto in textos for termo in tokeniza(texto))
+    return {
+        termo: 1 + log(quantidade) for termo, quantidade in contagens.items()
+    }
+
+
+class IndiceTexto:
+    '''
+        Índice TF-IDF esparso das descrições das experiências de cada
+        pessoa, usado para somar a similaridade textual à do matchmaking.
+
+        Cada pessoa é uma linha de uma matriz CSR guardada em arrays: o
+        início de cada linha, os IDs dos termos, os pesos (1 + log tf) e a
+        linha de cada entrada, que evita refazê-la a cada consulta. As
+        linhas só crescem: ao editar uma experiência a linha antiga da
+        pessoa é descartada e uma nova é acrescentada ao final, e as
+        entradas descartadas são removidas quando passam de
+        LIMITE_DESCARTADAS, junto com os termos que deixaram de aparecer.
+        A norma de cada linha usa o IDF do momento em que ela foi escrita e
+        é recalculada a cada reconstrução.
+
+        As descrições das vagas são tokenizadas uma única vez e só voltam a
+        ser quando o texto muda; os termos delas não entram no vocabulário,
+        e só as MAXIMO_VAGAS usadas mais recentemente ficam guardadas.
+    '''
+
+    def __init__(self, ttl: int = 0):
+        self.ttl = ttl
+        self.construido_em = None
+        self._trava = threading.RLock()
+        self._limpa()
+
+    def _limpa(self):
+        self._vocabulario = {}
+        self._frequencias = array("i")
+        self._documentos = 0
+
+        self._ponteiros = array("i", [0])
+        self._termos = array("i")
+        self._pesos = array("f")
+        self._linha_entrada = array("i")
+        self._pessoa_linha = array("i")
+        self._normas = array("f")
+        self._linha_pessoa = {}
+        self._descartadas = 0
+
+        self._vagas = {}
+
+    @property
+    def construido(self) -> bool:
+        return self.construido_em is not None
+
+    def expirado(self) -> bool:
+        if not self.construido:
+            return True
+        if not self.ttl:
+            return False
+        return time.monotonic() - self.construido_em > self.ttl
+
+    def _idf(self, termo_id: int) -> float:
+        return log((1 + self._documentos) / (1 + self._frequencias[termo_id])) + 1
+
+    def _termo_id(self, termo: str) -> int:
+        termo_id = self._vocabulario.get(termo)
+        if termo_id is None:
+            termo_id = self._vocabulario[termo] = len(self._frequencias)
+            self._frequencias.append(0)
+        return termo_id
+
+    def _contagens(self, textos: t.Iterable[str]) -> t.Dict[int, float]:
+        return {
+            self._termo_id(termo): peso
+            for termo, peso in pesos_termos(textos).items()
+        }
+
+    def _acrescenta(self, pessoa_id: int, pesos: t.Dict[int, float]):
+        linha = len(self._pessoa_linha)
+        norma = sqrt(sum(
+            (peso * self._idf(termo_id)) ** 2
+            for termo_id, peso in pesos.items()
+        ))
+
+        self._termos.extend(pesos.keys())
+        self._pesos.extend(pesos.values())
+        self._linha_entrada.extend([linha] * len(pesos))
+        self._ponteiros.append(len(self._termos))
+        self._pessoa_linha.append(pessoa_id)
+        self._normas.append(norma)
+        self._linha_pessoa[pessoa_id] = linha
+
+    def _descarta(self, pessoa_id: int):
+        linha = self._linha_pessoa.pop(pessoa_id, None)
+        if linha is None:
+            return
+
+        self._pessoa_linha[linha] = -1
+        termos = self._termos[self._ponteiros[linha]:self._ponteiros[linha + 1]]
+
+        for termo_id in termos:
+            self._frequencias[termo_id] -= 1
+        self._documentos -= 1
+        self._descartadas += len(termos)
+
+    def _compacta(self):
+        pessoas = np.frombuffer(self._pessoa_linha, dtype=np.int32)
+        vivas = pessoas != -1
+        nova_linha = np.cumsum(vivas) - 1
+
+        linhas = np.frombuffer(self._linha_entrada, dtype=np.int32)
+        entradas = vivas[linhas]
+
+        self._termos = array(
+            "i", np.frombuffer(self._termos, dtype=np.int32)[entradas].tobytes())
+        self._pesos = array(
+            "f", np.frombuffer(self._pesos, dtype=np.float32)[entradas].tobytes())
+        self._linha_entrada = array(
+            "i", nova_linha[linhas[entradas]].astype(np.int32).tobytes())
+        tamanhos = np.diff(np.frombuffer(self._ponteiros, dtype=np.int32))[vivas]
+        self._ponteiros = array(
+            "i", np.concatenate([[0], np.cumsum(tamanhos)]).astype(np.int32).tobytes())
+        self._pessoa_linha = array("i", pessoas[vivas].tobytes())
+        self._normas = array(
+            "f", np.frombuffer(self._normas, dtype=np.float32)[vivas].tobytes())
+        self._linha_pessoa = {
+            pessoa_id: linha
+            for linha, pessoa_id in enumerate(self._pessoa_linha)
+        }
+        self._descartadas = 0
+
+        # termos que não aparecem em nenhuma pessoa saem do vocabulário, e
+        # os IDs dos outros são renumerados
+        frequencias = np.frombuffer(self._frequencias, dtype=np.int32)
+        usados = frequencias > 0
+        novo_termo = np.cumsum(usados) - 1
+        self._termos = array("i", novo_termo[
+            np.frombuffer(self._termos, dtype=np.int32)
+        ].astype(np.int32).tobytes())
+        self._frequencias = array("i", frequencias[usados].tobytes())
+        self._vocabulario = {
+            termo: int(novo_termo[termo_id])
+            for termo, termo_id in self._vocabulario.items()
+            if usados[termo_id]
+        }
+
+    def carrega(self, documentos: t.Iterable[t.Tuple[int, t.List[str]]]):
+
+        '''
+            Monta o índice do zero
+
+            Entrada: (pessoa_id, descrições da pessoa)
+
+            Saída:
+        '''
+
+        # monta em um índice novo para não bloquear as consultas
+        novo = IndiceTexto(self.ttl)
+
+        linhas = []
+        for pessoa_id, textos in documentos:
+            pesos = novo._contagens(textos)
+            if pesos:
+                linhas.append((pessoa_id, pesos))
+                for termo_id in pesos:
+                    novo._frequencias[termo_id] += 1
+
+        novo._documentos = len(linhas)
+        for pessoa_id, pesos in linhas:
+            novo._acrescenta(pessoa_id, pesos)
+
+        with self._trava:
+            for atributo, valor in vars(novo).items():
+                if atributo not in ("ttl", "_trava"):
+                    setattr(self, atributo, valor)
+            self.construido_em = time.monotonic()
+
+    def reconstroi(self, db: Session):
+
+        '''
+            Reconstrói o índice com uma única consulta sobre as três
+            tabelas de experiências, sem carregar entidades do ORM
+        '''
+
+        descricoes = union_all(*[
+            select([tabela.pessoa_id, tabela.descricao])
+            for tabela in EXPERIENCIAS
+        ]).alias("descricoes")
+
+        linhas = db.query(descricoes.c.pessoa_id, descricoes.c.descricao)\
+            .order_by(descricoes.c.pessoa_id)\
+            .yield_per(10000)
+
+        def documentos():
+            pessoa_atual, textos = None, []
+            for pessoa_id, descricao in linhas:
+                if pessoa_id != pessoa_atual and textos:
+                    yield pessoa_atual, textos
+                    textos = []
+                pessoa_atual = pessoa_id
+                textos.append(descricao)
+            if textos:
+                yield pessoa_atual, textos
+
+        self.carrega(documentos())
+
+    def garante_atualizado(self, db: Session):
+        if self.expirado():
+            self.reconstroi(db)
+
+    def atualiza_pessoa(self, pessoa_id: int, textos: t.List[str]):
+
+        '''
+            Substitui a linha de uma pessoa após a alteração de alguma de
+            suas descrições. Sem textos, a pessoa sai do índice
+        '''
+
+        if not self.construido:
+            return
+
+        with self._trava:
+            self._descarta(pessoa_id)
+
+            pesos = self._contagens(textos)
+            if pesos:
+                for termo_id in pesos:
+                    self._frequencias[termo_id] += 1
+                self._documentos += 1
+                self._acrescenta(pessoa_id, pesos)
+
+            if self._descartadas > LIMITE_DESCARTADAS * len(self._termos):
+                self._compacta()
+
+    def _pesos_vaga(
+        self,
+        vaga_id: int,
+        descricao: t.Optional[str]
+    ) -> t.Dict[str, float]:
+        texto, pesos = self._vagas.pop(vaga_id, (None, None))
+        if pesos is None or texto != descricao:
+            pesos = pesos_termos([descricao])
+        # reinserida no fim: a primeira do dicionário é a usada há mais tempo
+        self._vagas[vaga_id] = (descricao, pesos)
+        while len(self._vagas) > MAXIMO_VAGAS:
+            del self._vagas[next(iter(self._vagas))]
+        return pesos
+
+    def similaridades(
+        self,
+        vaga_id: int,
+        descricao: t.Optional[str]
+    ) -> t.Tuple[np.ndarray, np.ndarray]:
+
+        '''
+            Similaridade de cosseno entre a descrição da vaga e o texto de
+            cada pessoa, calculada como um produto da matriz esparsa pelo
+            vetor da vaga
+
+            Entrada: ID e descrição da vaga
+
+            Saída: (IDs das pessoas, similaridades), ordenados pelo ID e
+                   apenas com similaridade positiva
+        '''
+
+        vazio = np.empty(0, dtype=np.int64), np.empty(0)
+
+        with self._trava:
+            pesos_vaga = self._pesos_vaga(vaga_id, descricao)
+            if not pesos_vaga or not self._documentos:
+                return vazio
+
+            # termos fora do vocabulário não aparecem em nenhuma pessoa, mas
+            # contam na norma da vaga com o IDF de frequência zero
+            vetor = np.zeros(len(self._frequencias))
+            norma = 0.0
+            for termo, peso in pesos_vaga.items():
+                termo_id = self._vocabulario.get(termo)
+                idf = self._idf(termo_id) if termo_id is not None \
+                    else log(1 + self._documentos) + 1
+                norma += (peso * idf) ** 2
+                if termo_id is not None:
+                    vetor[termo_id] = peso * idf ** 2
+            vetor /= sqrt(norma)
+
+            termos = np.frombuffer(self._termos, dtype=np.int32)
+            contribuicoes = vetor[termos] * \
+                np.frombuffer(self._pesos, dtype=np.float32)
+            entradas = np.flatnonzero(contribuicoes)
+
+            linhas = np.frombuffer(self._linha_entrada, dtype=np.int32)[entradas]
+            produtos = np.bincount(
+                linhas, weights=contribuicoes[entradas],
+                minlength=len(self._pessoa_linha))
+            pessoas = np.frombuffer(self._pessoa_linha, dtype=np.int32)
+            normas = np.frombuffer(self._normas, dtype=np.float32)
+
+            validas = (produtos > 0) & (pessoas != -1) & (normas > 0)
+            ids = pessoas[validas].astype(np.int64)
+            cossenos = produtos[validas] / normas[validas]
+            # as visões de frombuffer impedem que atualiza_pessoa estenda os
+            # arrays (BufferError): saem antes de liberar a trava
+            del termos, linhas, pessoas, normas
+
+        ordem = np.argsort(ids)
+        return ids[ordem], np.minimum(cossenos[ordem], 1.0)
+
+    def tamanho_bytes(self) -> int:
+        with self._trava:
+            arrays = (
+                self._frequencias, self._ponteiros, self._termos, self._pesos,
+                self._linha_entrada, self._pessoa_linha, self._normas,
+            )
+            return sum(lista.itemsize * len(lista) for lista in arrays)
+
+
+indice_texto = IndiceTexto(ttl=config.INDICE_TEXTO_TTL)
+
+
+def indice_texto_ativo() -> bool:
+    return config.SIMILARIDADE_TEXTO_ATIVA
+
+
+def get_descricoes_pessoa(db: Session, pessoa_id: int) -> t.List[str]:
+    descricoes = union_all(*[
+        select([tabela.descricao]).where(tabela.pessoa_id == pessoa_id)
+        for tabela in EXPERIENCIAS
+    ])
+    return [descricao for descricao, in db.execute(descricoes)]
+
+
+def atualiza_texto_pessoa(db: Session, pessoa_id: int):
+
+    '''
+        Hook chamado após criar, editar ou apagar uma experiência
+    '''
+
+    if not indice_texto_ativo():
+        return
+
+    # a similaridade textual da pessoa mudou: os rankings que a contêm ou
+    # que dividem tags com ela são recalculados
+    habilidades_ids, areas_ids = get_tags_pessoa(db, pessoa_id)
+    invalida_ranking_pessoa(db, pessoa_id, habilidades_ids, areas_ids)
+
+    if indice_texto.construido:
+        indice_texto.atualiza_pessoa(
+            pessoa_id, get_descricoes_pessoa(db, pessoa_id))
+
+
+def remove_pessoa_texto(pessoa_id: int):
+
+    '''
+        Hook chamado após apagar uma pessoa
+    '''
+
+    if not indice_texto_ativo():
+        return
+    indice_texto.atualiza_pessoa(pessoa_id, [])
+
+
+def pontos_texto(
+    db: Session,
+    vaga: models.PessoaProjeto
+) -> t.Tuple[np.ndarray, np.ndarray]:
+
+    '''
+        Similaridade textual de cada pessoa com a vaga, já multiplicada
+        por PESO_SIMILARIDADE_TEXTO
+
+        Entrada: vaga
+
+        Saída: (IDs das pessoas, pontos), ordenados pelo ID e apenas com
+               similaridade positiva
+    '''
+
+    indice_texto.garante_atualizado(db)
+    ids, cossenos = indice_texto.similaridades(vaga.id, vaga.descricao)
+    return ids, config.PESO_SIMILARIDADE_TEXTO * cossenos
+
+
+def mistura_similaridade_texto(
+    db: Session,
+    vaga: models.PessoaProjeto,
+    pessoas: np.ndarray,
+    similaridades: np.ndarray,
+    elegiveis: t.Optional[t.Callable[[np.ndarray], np.ndarray]] = None
+) -> t.Tuple[np.ndarray, np.ndarray]:
+
+    '''
+        Soma às similaridades das pessoas a similaridade textual com a
+        vaga, multiplicada por PESO_SIMILARIDADE_TEXTO. Com `elegiveis`,
+        as pessoas parecidas só pelo texto também entram, desde que a
+        função as mantenha
+
+        Entrada: vaga, IDs das pessoas, similaridades atuais, filtro das
+                 pessoas que podem ser acrescentadas
+
+        Saída: (IDs das pessoas, similaridades), com as pessoas
+               acrescentadas ao final
+    '''
+
+    ids, pontos = pontos_texto(db, vaga)
+
+    pessoas = np.asarray(pessoas, dtype=np.int64)
+    similaridades = np.array(similaridades, dtype=float)
+    if not len(ids):
+        return pessoas, similaridades
+
+    if elegiveis is not None:
+        novas = elegiveis(ids[~np.isin(ids, pessoas)])
+        pessoas = np.concatenate([pessoas, np.asarray(novas, dtype=np.int64)])
+        similaridades = np.concatenate([similaridades, np.zeros(len(novas))])
+
+    posicoes = np.minimum(np.searchsorted(ids, pessoas), len(ids) - 1)
+    encontradas = ids[posicoes] == pessoas
+    similaridades[encontradas] += pontos[posicoes[encontradas]]
+
+    return pessoas, similaridades
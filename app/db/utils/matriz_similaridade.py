@@ -0,0 +1,356 @@
+import random
+import typing as t
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from core import config
+from db import models
+from db.ignorados.crud import get_ids_pessoas_ignoradas_by_vagas
+from db.pessoa.crud import (
+    PAPEIS_PESSOA,
+    get_candidatos_aleatorios,
+    get_candidatos_by_papel,
+)
+from db.reacoes.crud import get_ids_pessoas_interessadas
+from db.utils.indice_tags import (
+    AREA,
+    HABILIDADE,
+    indice_tags,
+    indice_tags_ativo,
+)
+from db.utils.indice_texto import indice_texto_ativo, mistura_similaridade_texto
+from db.utils.pesos_tags import (
+    Tag,
+    estatisticas_tags,
+    maiores_creditos,
+    tags_vaga,
+)
+
+# marca, na matriz, as pessoas que não podem ocupar a vaga
+INELEGIVEL = -np.inf
+
+
+class MatrizSimilaridade:
+    '''
+        Similaridades de todas as vagas de um projeto, calculadas de uma só
+        vez: `similaridades[i, j]` é a similaridade da pessoa
+        `pessoas_ids[i]` com a vaga `vagas_ids[j]`, ou INELEGIVEL
+    '''
+
+    def __init__(
+        self,
+        pessoas_ids: np.ndarray,
+        vagas_ids: t.List[int],
+        similaridades: np.ndarray
+    ):
+        self.pessoas_ids = pessoas_ids
+        self.vagas_ids = vagas_ids
+        self.similaridades = similaridades
+
+
+def _candidatos_indice(
+    db: Session,
+    papeis: t.List[str],
+    tags: t.Iterable[Tag]
+):
+
+    '''
+        Candidatos e, para cada tag, as linhas das pessoas que a possuem,
+        a partir do índice invertido em memória
+    '''
+
+    indice_tags.garante_atualizado(db)
+
+    candidatos = {papel: indice_tags.candidatos(papel) for papel in papeis}
+    pessoas_ids = np.unique(np.concatenate(list(candidatos.values())))
+    membros = {
+        papel: np.isin(pessoas_ids, ids) for papel, ids in candidatos.items()
+    }
+
+    coincidencias = {}
+    for tag in tags:
+        ids = np.unique(np.concatenate(
+            [indice_tags.lista(papel, *tag) for papel in papeis]))
+        coincidencias[tag] = np.searchsorted(pessoas_ids, ids)
+
+    return pessoas_ids, membros, coincidencias
+
+
+def _candidatos_banco(
+    db: Session,
+    amostras: t.Dict[int, int],
+    tags: t.Iterable[Tag]
+):
+
+    '''
+        Candidatos e, para cada tag, as linhas das pessoas que a possuem,
+        buscados no banco sem carregar entidades do ORM. Entram só as
+        pessoas com alguma das tags e, de cada papel, uma amostra limitada
+        de pessoas sem coincidência, para as vagas que não têm nenhuma. A
+        similaridade textual só é somada às pessoas desse conjunto
+
+        Entrada: {ID do papel: tamanho da amostra}, tags buscadas
+    '''
+
+    habilidades_ids = [tag_id for tipo, tag_id in tags if tipo == HABILIDADE]
+    areas_ids = [tag_id for tipo, tag_id in tags if tipo == AREA]
+
+    ids_por_papel = {}
+    ids_por_tag = {}
+    for papel_id, amostra in amostras.items():
+        linhas = get_candidatos_by_papel(
+            db, papel_id,
+            habilidades_ids=habilidades_ids, areas_ids=areas_ids)
+        ids = [pessoa_id for pessoa_id, _ in linhas]
+        for pessoa_id, tags_pessoa in linhas:
+            for tag in tags_pessoa:
+                ids_por_tag.setdefault(tag, set()).add(pessoa_id)
+
+        ids += get_candidatos_aleatorios(db, papel_id, quantidade=amostra)
+        ids_por_papel[PAPEIS_PESSOA[papel_id].key] = \
+            np.array(ids, dtype=np.int64)
+
+    pessoas_ids = np.unique(np.concatenate(
+        [np.empty(0, dtype=np.int64), *ids_por_papel.values()]))
+    membros = {
+        papel: np.isin(pessoas_ids, ids) for papel, ids in ids_por_papel.items()
+    }
+    coincidencias = {
+        tag: np.searchsorted(pessoas_ids, sorted(ids))
+        for tag, ids in ids_por_tag.items()
+    }
+
+    return pessoas_ids, membros, coincidencias
+
+
+def calcula_matriz_projeto(
+    db: Session,
+    projeto_id: int,
+    vagas: t.List[models.PessoaProjeto]
+) -> MatrizSimilaridade:
+
+    '''
+        Calcula a similaridade ponderada entre todas as vagas do projeto e
+        todas as pessoas candidatas com um único produto de matrizes: uma
+        matriz pessoa x tag (restrita às tags das vagas, com o crédito de
+        cada pessoa na tag) multiplicada pela matriz vaga x tag (com o peso
+        de cada tag)
+
+        Entrada: ID do projeto, vagas abertas do projeto
+
+        Saída: MatrizSimilaridade com o bônus de interesse aplicado e as
+               pessoas ignoradas de cada vaga marcadas como INELEGIVEL
+
+        Exceções: Papel não encontrado
+    '''
+
+    for vaga in vagas:
+        if vaga.papel_id not in PAPEIS_PESSOA:
+            raise HTTPException(status_code=404, detail="papel não encontrado")
+
+    papeis_vagas = [PAPEIS_PESSOA[vaga.papel_id].key for vaga in vagas]
+    papeis = sorted(set(papeis_vagas))
+
+    colunas = {}
+    for vaga in vagas:
+        for tag in tags_vaga(vaga):
+            colunas.setdefault(tag, len(colunas))
+    tags = list(colunas)
+
+    estatisticas_tags.garante_atualizado(db)
+    expansao = estatisticas_tags.expande(tags)
+
+    matriz_vagas = np.zeros((len(vagas), len(colunas)), dtype=np.float32)
+    for j, vaga in enumerate(vagas):
+        for tag in tags_vaga(vaga):
+            matriz_vagas[j, colunas[tag]] = estatisticas_tags.peso(tag)
+
+    if indice_tags_ativo():
+        pessoas_ids, membros, coincidencias = \
+            _candidatos_indice(db, papeis, expansao)
+    else:
+        # a amostra sem coincidências cobre o corte de atribui_otima em
+        # cada vaga do papel
+        amostras = {}
+        for vaga in vagas:
+            amostras[vaga.papel_id] = amostras.get(vaga.papel_id, 0) + \
+                config.MATCH_CANDIDATOS_POR_VAGA
+        pessoas_ids, membros, coincidencias = \
+            _candidatos_banco(db, amostras, expansao)
+
+    linhas, posicoes, creditos = maiores_creditos(coincidencias, expansao)
+    matriz_pessoas = np.zeros((len(pessoas_ids), len(colunas)), dtype=np.float32)
+    matriz_pessoas[linhas, posicoes] = creditos
+
+    similaridades = (matriz_pessoas @ matriz_vagas.T).astype(np.float64)
+
+    if indice_texto_ativo():
+        for j, vaga in enumerate(vagas):
+            _, similaridades[:, j] = mistura_similaridade_texto(
+                db, vaga, pessoas_ids, similaridades[:, j])
+
+    interessados = get_ids_pessoas_interessadas(db, projeto_id)
+    if interessados:
+        similaridades[np.isin(pessoas_ids, list(interessados))] *= \
+            1 + config.BONUS_INTERESSE
+
+    ignorados = get_ids_pessoas_ignoradas_by_vagas(
+        db, [vaga.id for vaga in vagas])
+
+    for j, (vaga, papel) in enumerate(zip(vagas, papeis_vagas)):
+        similaridades[~membros[papel], j] = INELEGIVEL
+        similaridades[np.isin(pessoas_ids, ignorados.get(vaga.id, [])), j] = \
+            INELEGIVEL
+
+    return MatrizSimilaridade(
+        pessoas_ids, [vaga.id for vaga in vagas], similaridades)
+
+
+def atribui_gulosa(matriz: MatrizSimilaridade) -> t.Dict[int, int]:
+
+    '''
+        Preenche as vagas na ordem em que foram buscadas, escolhendo para
+        cada uma a pessoa mais similar que ainda não foi selecionada.
+        Empates são decididos aleatoriamente
+
+        Entrada: MatrizSimilaridade
+
+        Saída: Dicionário {vaga_id: pessoa_id}; vagas sem candidatos
+               elegíveis ficam de fora
+    '''
+
+    similaridades = matriz.similaridades.copy()
+    selecionadas = {}
+
+    for j, vaga_id in enumerate(matriz.vagas_ids):
+        coluna = similaridades[:, j]
+        if not len(coluna) or coluna.max() == INELEGIVEL:
+            continue
+
+        melhores = np.flatnonzero(coluna == coluna.max())
+        i = random.choice(melhores.tolist())
+
+        selecionadas[vaga_id] = int(matriz.pessoas_ids[i])
+        # a mesma pessoa não é selecionada para duas vagas
+        similaridades[i, :] = INELEGIVEL
+
+    return selecionadas
+
+
+def _hungaro(custos: np.ndarray) -> np.ndarray:
+
+    '''
+        Algoritmo húngaro (Kuhn-Munkres) para o problema de atribuição de
+        custo mínimo em uma matriz n x m, com n <= m
+
+        Entrada: matriz de custos
+
+        Saída: array com a coluna atribuída a cada linha
+    '''
+
+    n, m = custos.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    # p[j]: linha (a partir de 1) atribuída à coluna j; a coluna 0 é auxiliar
+    p = np.zeros(m + 1, dtype=np.int64)
+    caminho = np.zeros(m + 1, dtype=np.int64)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minimos = np.full(m + 1, np.inf)
+        usadas = np.zeros(m + 1, dtype=bool)
+
+        while True:
+            usadas[j0] = True
+            i0 = p[j0]
+
+            reduzidos = custos[i0 - 1] - u[i0] - v[1:]
+            melhora = ~usadas[1:] & (reduzidos < minimos[1:])
+            minimos[1:][melhora] = reduzidos[melhora]
+            caminho[1:][melhora] = j0
+
+            livres = np.flatnonzero(~usadas[1:]) + 1
+            j1 = livres[np.argmin(minimos[livres])]
+            delta = minimos[j1]
+
+            u[p[usadas]] += delta
+            v[usadas] -= delta
+            minimos[~usadas] -= delta
+
+            j0 = j1
+            if p[j0] == 0:
+                break
+
+        while j0:
+            j1 = caminho[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    atribuicao = np.zeros(n, dtype=np.int64)
+    for j in range(1, m + 1):
+        if p[j]:
+            atribuicao[p[j] - 1] = j - 1
+
+    return atribuicao
+
+
+def atribui_otima(
+    matriz: MatrizSimilaridade,
+    candidatos_por_vaga: int = config.MATCH_CANDIDATOS_POR_VAGA
+) -> t.Dict[int, int]:
+
+    '''
+        Preenche as vagas resolvendo o problema de atribuição linear, o que
+        maximiza a similaridade total independentemente da ordem das vagas.
+        Antes, cada vaga é reduzida aos seus melhores candidatos para manter
+        a matriz pequena
+
+        Entrada: MatrizSimilaridade, quantidade de candidatos por vaga
+
+        Saída: Dicionário {vaga_id: pessoa_id}; vagas sem candidatos
+               elegíveis ficam de fora
+    '''
+
+    similaridades = matriz.similaridades
+    qtd_vagas = len(matriz.vagas_ids)
+
+    # com ao menos tantos candidatos quantas vagas, o corte preserva o ótimo
+    corte = max(candidatos_por_vaga, qtd_vagas)
+
+    # embaralha as linhas para que empates sejam decididos aleatoriamente
+    embaralhadas = np.random.permutation(len(matriz.pessoas_ids))
+    linhas = set()
+    for j in range(qtd_vagas):
+        coluna = similaridades[embaralhadas, j]
+        elegiveis = np.flatnonzero(coluna != INELEGIVEL)
+        if len(elegiveis) > corte:
+            melhores = np.argpartition(-coluna[elegiveis], corte - 1)[:corte]
+            elegiveis = elegiveis[melhores]
+        linhas.update(embaralhadas[elegiveis].tolist())
+
+    if not linhas:
+        return {}
+
+    linhas = np.random.permutation(list(linhas))
+    reduzida = similaridades[linhas].T
+
+    # uma atribuição inelegível custa mais do que qualquer ganho possível
+    validas = reduzida != INELEGIVEL
+    proibido = qtd_vagas * (reduzida[validas].max() + 1) + 1
+    custos = np.where(validas, -reduzida, proibido)
+
+    # completa com colunas fictícias quando há menos pessoas do que vagas
+    if custos.shape[1] < qtd_vagas:
+        ficticias = np.full((qtd_vagas, qtd_vagas - custos.shape[1]), proibido)
+        custos = np.hstack([custos, ficticias])
+
+    selecionadas = {}
+    for j, coluna in enumerate(_hungaro(custos)):
+        if coluna < len(linhas) and validas[j, coluna]:
+            selecionadas[matriz.vagas_ids[j]] = \
+                int(matriz.pessoas_ids[linhas[coluna]])
+
+    return selecionadas
@@ -0,0 +1,300 @@
+from math import log
+import threading
+import time
+import typing as t
+
+import numpy as np
+from sqlalchemy import func, select, union
+from sqlalchemy.orm import Session
+
+from core import config
+from db import models
+from db.utils.cache_referencias import ao_invalidar
+from db.utils.indice_tags import AREA, HABILIDADE
+
+# (tipo, tag_id), onde tipo é HABILIDADE ou AREA
+Tag = t.Tuple[str, int]
+
+# níveis da hierarquia de áreas percorridos, para cima e para baixo
+PROFUNDIDADE_HIERARQUIA = 3
+
+
+class EstatisticasTags:
+    '''
+        Estatísticas das habilidades e áreas usadas para ponderar a
+        similaridade: em quantas pessoas cada tag aparece (frequência de
+        documento) e quantas pessoas têm ao menos uma tag, além da
+        hierarquia de áreas (area_pai_id).
+
+        Assim como o índice de tags, é montada a partir do banco, mantida
+        pelos hooks de edição de pessoas e reconstruída quando expira o
+        ESTATISTICAS_TAGS_TTL.
+    '''
+
+    def __init__(self, ttl: int = 0):
+        self.ttl = ttl
+        self.construido_em = None
+        self._frequencias = {}
+        self._total = 0
+        self._pais = {}
+        self._filhos = {}
+        self._trava = threading.RLock()
+
+    @property
+    def construido(self) -> bool:
+        return self.construido_em is not None
+
+    def expirado(self) -> bool:
+        if not self.construido:
+            return True
+        if not self.ttl:
+            return False
+        return time.monotonic() - self.construido_em > self.ttl
+
+    def invalida(self):
+        self.construido_em = None
+
+    def carrega(
+        self,
+        frequencias: t.Dict[Tag, int],
+        total: int,
+        areas: t.Iterable[t.Tuple[int, t.Optional[int]]]
+    ):
+
+        '''
+            Monta as estatísticas do zero
+
+            Entrada: {(tipo, tag_id): quantidade de pessoas}, quantidade de
+                     pessoas com ao menos uma tag, linhas (area_id,
+                     area_pai_id)
+
+            Saída:
+        '''
+
+        pais, filhos = {}, {}
+        for area_id, area_pai_id in areas:
+            if area_pai_id:
+                pais[area_id] = area_pai_id
+                filhos.setdefault(area_pai_id, []).append(area_id)
+
+        with self._trava:
+            self._frequencias = dict(frequencias)
+            self._total = total
+            self._pais = pais
+            self._filhos = filhos
+            self.construido_em = time.monotonic()
+
+    def reconstroi(self, db: Session):
+
+        '''
+            Reconstrói as estatísticas com consultas agregadas, sem
+            carregar entidades do ORM
+        '''
+
+        frequencias = {}
+        for tipo, coluna, tabela in (
+            (HABILIDADE, models.HabilidadesPessoa.c.habilidade_id,
+             models.HabilidadesPessoa),
+            (AREA, models.PessoaArea.c.area_id, models.PessoaArea),
+        ):
+            contagens = db.query(coluna, func.count(tabela.c.pessoa_id))\
+                .group_by(coluna)
+            for tag_id, quantidade in contagens:
+                frequencias[(tipo, tag_id)] = quantidade
+
+        pessoas = union(
+            select([models.HabilidadesPessoa.c.pessoa_id]),
+            select([models.PessoaArea.c.pessoa_id]),
+        ).alias("pessoas")
+        total = db.query(func.count()).select_from(pessoas).scalar()
+
+        areas = db.query(models.Area.id, models.Area.area_pai_id).all()
+
+        self.carrega(frequencias, total, areas)
+
+    def garante_atualizado(self, db: Session):
+        if self.expirado():
+            self.reconstroi(db)
+
+    def atualiza(self, anteriores: t.Set[Tag], atuais: t.Set[Tag]):
+
+        '''
+            Atualiza as frequências a partir das tags de uma pessoa antes
+            e depois da alteração
+        '''
+
+        if not self.construido:
+            return
+
+        with self._trava:
+            for chave in anteriores - atuais:
+                self._frequencias[chave] = \
+                    max(self._frequencias.get(chave, 0) - 1, 0)
+            for chave in atuais - anteriores:
+                self._frequencias[chave] = self._frequencias.get(chave, 0) + 1
+            self._total = max(
+                self._total + bool(atuais) - bool(anteriores), 0)
+
+    def peso(self, chave: Tag) -> float:
+
+        '''
+            Peso de uma tag: o IDF do BM25, que cresce conforme a tag fica
+            mais rara. Com a ponderação desativada, todas pesam 1
+        '''
+
+        if not config.SIMILARIDADE_PONDERADA:
+            return 1.0
+
+        with self._trava:
+            frequencia = self._frequencias.get(chave, 0)
+            total = max(self._total, frequencia)
+
+        return log(1 + (total - frequencia + 0.5) / (frequencia + 0.5))
+
+    def expande(self, chaves: t.Sequence[Tag]) -> t.Dict[Tag, t.List[t.Tuple[int, float]]]:
+
+        '''
+            Relaciona cada tag buscada às tags que a satisfazem: ela mesma,
+            com crédito integral, e as áreas acima e abaixo dela na
+            hierarquia, com crédito DESCONTO_HIERARQUIA_AREAS por nível
+
+            Entrada: tags buscadas
+
+            Saída: {tag da pessoa: [(posição da tag buscada, crédito), ...]}
+        '''
+
+        desconto = config.DESCONTO_HIERARQUIA_AREAS
+        expansao = {}
+
+        def adiciona(chave, indice, credito):
+            creditos = expansao.setdefault(chave, {})
+            creditos[indice] = max(creditos.get(indice, 0.0), credito)
+
+        with self._trava:
+            for indice, (tipo, tag_id) in enumerate(chaves):
+                adiciona((tipo, tag_id), indice, 1.0)
+
+                if tipo != AREA or desconto <= 0:
+                    continue
+
+                credito, area_id = 1.0, tag_id
+                for _ in range(PROFUNDIDADE_HIERARQUIA):
+                    area_id = self._pais.get(area_id)
+                    if area_id is None:
+                        break
+                    credito *= desconto
+                    adiciona((AREA, area_id), indice, credito)
+
+                credito, nivel = 1.0, [tag_id]
+                for _ in range(PROFUNDIDADE_HIERARQUIA):
+                    nivel = [
+                        filho for area_id in nivel
+                        for filho in self._filhos.get(area_id, ())
+                    ]
+                    if not nivel:
+                        break
+                    credito *= desconto
+                    for area_id in nivel:
+                        adiciona((AREA, area_id), indice, credito)
+
+        return {
+            chave: sorted(creditos.items())
+            for chave, creditos in expansao.items()
+        }
+
+
+estatisticas_tags = EstatisticasTags(ttl=config.ESTATISTICAS_TAGS_TTL)
+# a hierarquia de áreas mudou em outro worker
+ao_invalidar(models.Area.__tablename__, estatisticas_tags.invalida)
+
+
+def tags_vaga(vaga: models.PessoaProjeto) -> t.List[Tag]:
+    return [(HABILIDADE, habilidade.id) for habilidade in vaga.habilidades] + \
+        [(AREA, area.id) for area in vaga.areas]
+
+
+def maiores_creditos(
+    coincidencias: t.Dict[Tag, np.ndarray],
+    expansao: t.Dict[Tag, t.List[t.Tuple[int, float]]]
+) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+
+    '''
+        Cruza as pessoas que possuem cada tag com a expansão das tags
+        buscadas, guardando o maior crédito de cada pessoa em cada tag
+        buscada (ter a área e uma subárea não conta duas vezes)
+
+        Entrada: {tag: IDs (ou linhas) das pessoas que a possuem},
+                 expansão das tags buscadas
+
+        Saída: arrays (pessoa, posição da tag buscada, crédito)
+    '''
+
+    pessoas, posicoes, creditos = [], [], []
+    for chave, ids in coincidencias.items():
+        for indice, credito in expansao.get(chave, ()):
+            pessoas.append(np.asarray(ids, dtype=np.int64))
+            posicoes.append(np.full(len(ids), indice, dtype=np.int64))
+            creditos.append(np.full(len(ids), credito))
+
+    if not pessoas:
+        vazio = np.empty(0, dtype=np.int64)
+        return vazio, vazio, np.empty(0)
+
+    pessoas = np.concatenate(pessoas)
+    posicoes = np.concatenate(posicoes)
+    creditos = np.concatenate(creditos)
+
+    ordem = np.lexsort((-creditos, posicoes, pessoas))
+    pessoas, posicoes, creditos = \
+        pessoas[ordem], posicoes[ordem], creditos[ordem]
+
+    primeiros = np.ones(len(pessoas), dtype=bool)
+    primeiros[1:] = (pessoas[1:] != pessoas[:-1]) | \
+        (posicoes[1:] != posicoes[:-1])
+
+    return pessoas[primeiros], posicoes[primeiros], creditos[primeiros]
+
+
+def pontua_coincidencias(
+    coincidencias: t.Dict[Tag, np.ndarray],
+    chaves: t.Sequence[Tag],
+    estatisticas: EstatisticasTags = estatisticas_tags
+) -> t.Tuple[np.ndarray, np.ndarray]:
+
+    '''
+        Similaridade ponderada entre as tags buscadas e as pessoas: soma,
+        para cada tag buscada, o peso da tag vezes o crédito da pessoa nela
+
+        Entrada: {tag: IDs das pessoas que a possuem}, tags buscadas
+
+        Saída: (IDs das pessoas, similaridades), ordenados pelo ID
+    '''
+
+    expansao = estatisticas.expande(chaves)
+    pesos = np.array([estatisticas.peso(chave) for chave in chaves])
+
+    pessoas, posicoes, creditos = maiores_creditos(coincidencias, expansao)
+
+    ids, inversos = np.unique(pessoas, return_inverse=True)
+    similaridades = np.bincount(
+        inversos, weights=pesos[posicoes] * creditos, minlength=len(ids))
+
+    return ids, similaridades
+
+
+def atualiza_estatisticas_pessoa(
+    anteriores: t.Tuple[t.Iterable[int], t.Iterable[int]],
+    atuais: t.Tuple[t.Iterable[int], t.Iterable[int]]
+):
+
+    '''
+        Hook chamado após editar ou apagar uma pessoa, com os IDs das
+        (habilidades, áreas) antes e depois da alteração
+    '''
+
+    def chaves(tags):
+        habilidades, areas = tags
+        return {(HABILIDADE, tag_id) for tag_id in habilidades} | \
+            {(AREA, tag_id) for tag_id in areas}
+
+    estatisticas_tags.atualiza(chaves(anteriores), chaves(atuais))
@@ -0,0 +1,168 @@
+import typing as t
+
+from fastapi import HTTPException
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from core import config
+from db import models
+from db.utils.cache_referencias import CacheReferencias
+
+ENCONTRADA = "encontrada"
+NAO_ENCONTRADA = "não encontrada"
+REPETIDA = "repetida"
+INVALIDA = "inválida"
+
+
+class ItemResolvido(t.NamedTuple):
+    # o dicionário recebido, com id ou nome/descricao
+    entrada: dict
+    situacao: str
+    # id da tag, quando encontrada ou repetida
+    id: t.Optional[int] = None
+
+
+class Relatorio(t.NamedTuple):
+    # instâncias das tags encontradas, na ordem recebida e sem repetições
+    tags: list
+    itens: t.List[ItemResolvido]
+
+    @property
+    def nao_encontradas(self) -> t.List[dict]:
+        return [
+            item.entrada for item in self.itens
+            if item.situacao in (NAO_ENCONTRADA, INVALIDA)
+        ]
+
+
+class CacheTags(CacheReferencias):
+    '''
+        Cache de referência de uma tabela de tags (áreas ou habilidades)
+        que também as encontra pelo nome, para resolver sem ir ao banco as
+        listas de tags recebidas nas edições de pessoas, projetos, vagas e
+        experiências. Tags que não estão na cópia são buscadas, todas de
+        uma vez, na resolução que as pediu.
+    '''
+
+    def __init__(self, modelo, campo: str, ttl: int = 0):
+        # coluna comparada com os nomes recebidos
+        self.campo = campo
+        # nome: id
+        self._ids = {}
+        super().__init__(modelo, ttl)
+
+    def _adiciona(self, linha: dict):
+        super()._adiciona(linha)
+        if linha[self.campo] is not None:
+            self._ids[linha[self.campo]] = linha["id"]
+
+    def _retira(self, id: int) -> t.Optional[dict]:
+        linha = super()._retira(id)
+        if linha is not None and self._ids.get(linha[self.campo]) == id:
+            del self._ids[linha[self.campo]]
+        return linha
+
+    def _limpa(self):
+        self._ids = {}
+
+    def _busca(self, id, nome) -> t.Optional[int]:
+        if id is not None:
+            return id if id in self._linhas else None
+        return self._ids.get(nome)
+
+    def resolve(self, db: Session, entradas: t.Sequence[dict]) -> Relatorio:
+
+        '''
+            Resolve uma lista de tags, cada uma pelo id ou, sem ele, pelo
+            nome exato. No máximo uma consulta ao banco: a da montagem do
+            cache ou a das tags que faltam nele
+
+            Entrada: lista de dicionários com id ou nome (descricao nas
+                     áreas)
+
+            Saída: Relatório com as instâncias das tags encontradas, ligadas
+                   à sessão, e a situação de cada item recebido
+        '''
+
+        recarregado = self.garante_atualizado(db)
+
+        chaves = [
+            (entrada.get("id"), entrada.get(self.campo)) for entrada in entradas
+        ]
+
+        with self._trava:
+            faltantes = [
+                (id, nome) for id, nome in chaves
+                if (id is not None or nome is not None)
+                and self._busca(id, nome) is None
+            ]
+        if faltantes and not recarregado:
+            ids = [id for id, _ in faltantes if id is not None]
+            nomes = [nome for id, nome in faltantes if id is None]
+            coluna = getattr(self.modelo, self.campo)
+            self.acrescenta(self._consulta(db).filter(or_(
+                self.modelo.id.in_(ids), coluna.in_(nomes))))
+        validas = sum(
+            1 for id, nome in chaves if id is not None or nome is not None)
+        self.conta(acertos=validas - len(faltantes), faltas=len(faltantes))
+
+        tags, itens, vistos = [], [], set()
+        with self._trava:
+            for entrada, (id, nome) in zip(entradas, chaves):
+                if id is None and nome is None:
+                    itens.append(ItemResolvido(entrada, INVALIDA))
+                    continue
+                tag_id = self._busca(id, nome)
+                if tag_id is None:
+                    itens.append(ItemResolvido(entrada, NAO_ENCONTRADA))
+                elif tag_id in vistos:
+                    itens.append(ItemResolvido(entrada, REPETIDA, tag_id))
+                else:
+                    vistos.add(tag_id)
+                    itens.append(ItemResolvido(entrada, ENCONTRADA, tag_id))
+                    tags.append(self.instancia(db, self._linhas[tag_id]))
+
+        return Relatorio(tags, itens)
+
+
+cache_areas = CacheTags(models.Area, "descricao", ttl=config.CACHE_TAGS_TTL)
+cache_habilidades = CacheTags(
+    models.Habilidades, "nome", ttl=config.CACHE_TAGS_TTL)
+
+
+def resolve_tags(
+    db: Session,
+    update_data: dict,
+    chave: str,
+    cache: CacheTags
+) -> t.Optional[Relatorio]:
+
+    '''
+        Troca, em update_data, a lista de dicionários da chave (areas ou
+        habilidades) pelas instâncias das tags. Repetições são ignoradas
+
+        Entrada: dados da edição, chave, cache das tags
+
+        Saída: Relatório da resolução, ou None se a chave não foi enviada
+
+        Exceções: Tags não encontradas ou sem id e nome, listadas no
+                  detalhe; update_data não é alterado
+    '''
+
+    if chave not in update_data:
+        return None
+
+    relatorio = cache.resolve(db, update_data[chave] or [])
+
+    if relatorio.nao_encontradas:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "message": f"{chave} não encontradas",
+                "nao_encontradas": relatorio.nao_encontradas,
+            },
+        )
+
+    update_data[chave] = relatorio.tags
+
+    return relatorio
@@ -1,37 +1,330 @@
-import re
-
-stop_words = set(
-    """
-    de a o que e do da em um para é com não uma os no se na por mais as dos como mas foi ao ele das tem à
-    seu sua ou ser quando muito há nos já está eu também só pelo pela até isso ela entre era depois sem mesmo
-    aos ter seus quem nas me esse eles estão você tinha foram essa num nem suas meu às minha têm numa pelos
-    elas havia seja qual será nós tenho lhe deles essas esses pelas este fosse dele tu te vocês vos lhes meus minhas
-    teu tua teus tuas nosso nossa nossos nossas dela delas esta estes estas aquele aquela aqueles aquelas isto aquilo
-    estou está estamos estão estive esteve estivemos estiverames tava estávamos estavames tivera estivéramos esteja
-    """.split()
+import typing as t
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import (
+    Float,
+    Integer,
+    String,
+    bindparam,
+    case,
+    column,
+    exists,
+    literal,
+    select,
+    text,
+    union_all,
+)
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from core import config
+from db import models
+from db.pessoa.crud import PAPEIS_PESSOA, get_candidatos_aleatorios
+from db.reacoes.crud import get_ids_pessoas_interessadas
+from db.utils.indice_tags import AREA, HABILIDADE, indice_tags, indice_tags_ativo
+from db.utils.indice_texto import (
+    indice_texto_ativo,
+    mistura_similaridade_texto,
+    pontos_texto,
+)
+from db.utils.pesos_tags import (
+    estatisticas_tags,
+    pontua_coincidencias,
+    tags_vaga,
 )
+from db.utils.texto import pre_processing, stop_words
+
+
+def pontua_candidatos_vaga(
+    db: Session,
+    vaga: models.PessoaProjeto,
+    pessoas_ignoradas_ids: t.List[int],
+    limite: int = 10
+    ) -> t.List[t.Tuple[int, float]]:
+
+    '''
+        Busca os candidatos mais similares à vaga, usando o índice
+        invertido em memória quando ativo e a consulta agregada no banco
+        caso contrário
+
+        Entrada: vaga, IDs das pessoas ignoradas, quantidade de candidatos
+
+        Saída: Lista de (pessoa_id, similaridade) com os melhores candidatos,
+               da maior para a menor similaridade
+
+        Exceções: Papel não encontrado
+    '''
+
+    if indice_tags_ativo():
+        return pontua_candidatos_indice(
+            db, vaga, pessoas_ignoradas_ids, limite)
+
+    return pontua_candidatos_sql(db, vaga, pessoas_ignoradas_ids, limite)
+
+
+def _melhores_candidatos(
+    pessoas: np.ndarray,
+    similaridades: np.ndarray,
+    restantes: np.ndarray,
+    limite: int
+    ) -> t.List[t.Tuple[int, float]]:
+
+    '''
+        Ordena os candidatos pela similaridade, sorteando a ordem apenas
+        entre os empatados, e completa a lista com pessoas sem coincidência
+        sorteadas entre as restantes, como na busca original
+    '''
+
+    ordem = np.lexsort((np.random.random(len(pessoas)), -similaridades))[:limite]
+    candidatos = list(zip(pessoas[ordem].tolist(), similaridades[ordem].tolist()))
+
+    if len(candidatos) < limite:
+        restantes = restantes[~np.isin(restantes, pessoas)]
+        sorteados = np.random.permutation(restantes)[:limite - len(candidatos)]
+        candidatos += [(pessoa_id, 0.0) for pessoa_id in sorteados.tolist()]
+
+    return candidatos
+
+
+def _tabela_valores(
+    db: Session,
+    nome: str,
+    colunas: t.List[t.Tuple[str, t.Any]],
+    linhas: t.List[tuple]
+):
+
+    '''
+        Tabela derivada com valores calculados em Python, para juntá-los a
+        uma consulta (o SQLAlchemy 1.3 não tem values()). No PostgreSQL
+        vira um unnest com um array por coluna, que mantém o SQL do mesmo
+        tamanho qualquer que seja a quantidade de linhas
+
+        Entrada: nome da tabela, [(nome da coluna, tipo)], linhas
+
+        Saída: tabela derivada com as colunas informadas
+    '''
+
+    dialeto = db.get_bind().dialect
+    if dialeto.name != "postgresql":
+        return union_all(*[
+            select([
+                literal(valor, tipo).label(coluna)
+                for valor, (coluna, tipo) in zip(linha, colunas)
+            ])
+            for linha in linhas
+        ]).alias(nome)
+
+    arrays = [
+        f"CAST(:{nome}_{coluna} AS {tipo().compile(dialect=dialeto)}[])"
+        for coluna, tipo in colunas
+    ]
+    nomes = ", ".join(coluna for coluna, _ in colunas)
+    return text(
+        f"SELECT * FROM unnest({', '.join(arrays)}) AS {nome} ({nomes})"
+    ).bindparams(*[
+        bindparam(f"{nome}_{coluna}", [linha[i] for linha in linhas])
+        for i, (coluna, _) in enumerate(colunas)
+    ]).columns(*[
+        column(coluna, tipo) for coluna, tipo in colunas
+    ]).alias(nome)
+
+
+def pontua_candidatos_sql(
+    db: Session,
+    vaga: models.PessoaProjeto,
+    pessoas_ignoradas_ids: t.List[int],
+    limite: int = 10
+    ) -> t.List[t.Tuple[int, float]]:
+
+    '''
+        Calcula a similaridade ponderada entre a vaga e as pessoas
+        candidatas em uma única consulta agregada: os pesos das tags da
+        vaga (o IDF vezes o crédito de cada tag na hierarquia) entram como
+        uma tabela de valores, cruzada com as tags das pessoas e somada por
+        pessoa, já com o bônus de interesse no projeto. Só voltam as
+        pessoas até a posição `limite`, com os empates dessa posição, para
+        que o sorteio entre empatados continue em Python
+
+        Entrada: vaga, IDs das pessoas ignoradas, quantidade de candidatos
+
+        Saída: Lista de (pessoa_id, similaridade) com os melhores candidatos,
+               da maior para a menor similaridade
+
+        Exceções: Papel não encontrado
+    '''
+
+    if vaga.papel_id not in PAPEIS_PESSOA:
+        raise HTTPException(status_code=404, detail="papel não encontrado")
+
+    chaves = tags_vaga(vaga)
+    estatisticas_tags.garante_atualizado(db)
+    expansao = estatisticas_tags.expande(chaves)
+    pesos = [estatisticas_tags.peso(chave) for chave in chaves]
+
+    pontuacoes = []
+
+    if expansao:
+        creditos = _tabela_valores(
+            db,
+            "creditos",
+            [("tipo", String), ("tag_id", Integer), ("indice", Integer),
+             ("pontos", Float)],
+            [
+                (tipo, tag_id, indice, pesos[indice] * credito)
+                for (tipo, tag_id), lista in expansao.items()
+                for indice, credito in lista
+            ],
+        )
+
+        def coincidencias(tabela, coluna, tipo):
+            return select([
+                tabela.c.pessoa_id.label("pessoa_id"),
+                creditos.c.indice.label("indice"),
+                creditos.c.pontos.label("pontos"),
+            ])\
+                .where(creditos.c.tipo == tipo)\
+                .where(tabela.c[coluna] == creditos.c.tag_id)
+
+        linhas = union_all(
+            coincidencias(models.HabilidadesPessoa, "habilidade_id", HABILIDADE),
+            coincidencias(models.PessoaArea, "area_id", AREA),
+        ).alias("coincidencias")
+
+        # o maior crédito em cada tag buscada: ter a área e uma subárea
+        # não conta duas vezes
+        pontuacoes.append(
+            select([
+                linhas.c.pessoa_id.label("pessoa_id"),
+                func.max(linhas.c.pontos).label("pontos"),
+            ]).group_by(linhas.c.pessoa_id, linhas.c.indice)
+        )
+
+    com_texto = indice_texto_ativo()
+    if com_texto:
+        ids, pontos = pontos_texto(db, vaga)
+        if len(ids):
+            valores = _tabela_valores(
+                db,
+                "texto",
+                [("pessoa_id", Integer), ("pontos", Float)],
+                list(zip(ids.tolist(), pontos.tolist())),
+            )
+            pontuacoes.append(select([valores.c.pessoa_id, valores.c.pontos]))
+
+    pessoas = np.empty(0, dtype=np.int64)
+    similaridades = np.empty(0)
+
+    if pontuacoes:
+        pontuacoes = union_all(*pontuacoes).alias("pontuacoes")
+
+        interessado = exists()\
+            .where(models.Reacoes.pessoa_id == models.Pessoa.id)\
+            .where(models.Reacoes.projeto_id == vaga.projeto_id)\
+            .where(models.Reacoes.reacao == "INTERESSE")
+        similaridade = func.sum(pontuacoes.c.pontos) * case(
+            [(interessado, 1 + config.BONUS_INTERESSE)], else_=1.0)
+
+        consulta = select([
+            models.Pessoa.id.label("pessoa_id"),
+            similaridade.label("similaridade"),
+            func.rank().over(order_by=similaridade.desc()).label("posicao"),
+        ])\
+            .select_from(pontuacoes.join(
+                models.Pessoa, models.Pessoa.id == pontuacoes.c.pessoa_id))\
+            .where(PAPEIS_PESSOA[vaga.papel_id] == True)\
+            .group_by(models.Pessoa.id)
+
+        if pessoas_ignoradas_ids:
+            consulta = consulta.where(
+                models.Pessoa.id.notin_(list(pessoas_ignoradas_ids)))
+
+        if com_texto:
+            # quem é parecido só pelo texto também precisa ser candidato
+            consulta = consulta.where(
+                exists().where(
+                    models.HabilidadesPessoa.c.pessoa_id == models.Pessoa.id)
+                | exists().where(
+                    models.PessoaArea.c.pessoa_id == models.Pessoa.id))
+
+        consulta = consulta.alias("pontuadas")
+        linhas = db.execute(
+            select([consulta.c.pessoa_id, consulta.c.similaridade])
+            .where(consulta.c.posicao <= limite)
+        ).fetchall()
+
+        pessoas = np.array(
+            [pessoa_id for pessoa_id, _ in linhas], dtype=np.int64)
+        similaridades = np.array(
+            [similaridade for _, similaridade in linhas], dtype=float)
+
+    restantes = np.empty(0, dtype=np.int64)
+    if len(pessoas) < limite:
+        restantes = np.array(get_candidatos_aleatorios(
+            db,
+            vaga.papel_id,
+            list(pessoas_ignoradas_ids) + pessoas.tolist(),
+            limite - len(pessoas),
+        ), dtype=np.int64)
+
+    return _melhores_candidatos(pessoas, similaridades, restantes, limite)
+
+
+def pontua_candidatos_indice(
+    db: Session,
+    vaga: models.PessoaProjeto,
+    pessoas_ignoradas_ids: t.List[int],
+    limite: int = 10
+    ) -> t.List[t.Tuple[int, float]]:
+
+    '''
+        Calcula a similaridade ponderada entre a vaga e as pessoas
+        candidatas juntando, no índice invertido, as listas de pessoas de
+        cada habilidade e área da vaga
+
+        Entrada: vaga, IDs das pessoas ignoradas, quantidade de candidatos
+
+        Saída: Lista de (pessoa_id, similaridade) com os melhores candidatos,
+               da maior para a menor similaridade
 
+        Exceções: Papel não encontrado
+    '''
 
-def pre_processing(text):
+    if vaga.papel_id not in PAPEIS_PESSOA:
+        raise HTTPException(status_code=404, detail="papel não encontrado")
 
-    # conversão para letras minúsculas
-    letras_min = re.findall(r'\b[A-zÀ-úü]+\b', text.lower())
+    papel = PAPEIS_PESSOA[vaga.papel_id].key
+    indice_tags.garante_atualizado(db)
+    estatisticas_tags.garante_atualizado(db)
 
-    # remoção de stopwords
-    # stopwords = nltk.corpus.stopwords.words('portuguese')
-    stop = set(stop_words)
-    no_stopwords = [w for w in letras_min if w not in stop]
+    chaves = tags_vaga(vaga)
+    coincidencias = {
+        chave: indice_tags.lista(papel, *chave)
+        for chave in estatisticas_tags.expande(chaves)
+    }
+    pessoas, similaridades = pontua_coincidencias(coincidencias, chaves)
 
-    # tokennização
-    text_clean = " ".join(no_stopwords)
-    return text_clean
+    ignorados = np.array(list(pessoas_ignoradas_ids), dtype=np.int32)
+    validos = ~np.isin(pessoas, ignorados)
+    pessoas = pessoas[validos]
+    similaridades = similaridades[validos]
 
+    if indice_texto_ativo():
+        def elegiveis(ids):
+            ids = ids[np.isin(ids, indice_tags.candidatos(papel))]
+            return ids[~np.isin(ids, ignorados)]
 
-def calcula_similaridade_vaga_pessoa(caracteristicas_vaga, caracteristicas_pessoa, tem_interesse):
+        pessoas, similaridades = mistura_similaridade_texto(
+            db, vaga, pessoas, similaridades, elegiveis)
 
-    similaridade = float(len([value for value in caracteristicas_vaga if value in caracteristicas_pessoa]))
+    interessados = get_ids_pessoas_interessadas(db, vaga.projeto_id)
+    if interessados:
+        similaridades[np.isin(pessoas, list(interessados))] *= \
+            1 + config.BONUS_INTERESSE
 
-    if tem_interesse:
-        return similaridade + (similaridade * 0.1)
+    restantes = np.empty(0, dtype=np.int32)
+    if len(pessoas) < limite:
+        restantes = indice_tags.candidatos(papel)
+        restantes = restantes[~np.isin(restantes, ignorados)]
 
-    return similaridade
\ No newline at end of file
+    return _melhores_candidatos(pessoas, similaridades, restantes, limite)
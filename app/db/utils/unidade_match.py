@@ -0,0 +1,93 @@
+import typing as t
+
+from sqlalchemy.orm import Session
+
+from db import models
+
+
+class UnidadeMatch:
+    '''
+        Unidade de trabalho do matchmaking: junta as escritas de uma
+        rodada (vagas preenchidas, pessoas ignoradas e o projeto voltando a
+        não finalizado) e grava tudo em uma única transação, em vez de um
+        commit e um refresh para cada uma.
+
+        O resultado final é o mesmo de editar cada vaga com
+        edit_pessoa_projeto, chamar add_pessoa_ignorada e
+        edit_finalizado_projeto uma a uma.
+    '''
+
+    def __init__(self, db: Session, projeto_id: int):
+        self.db = db
+        self.projeto_id = projeto_id
+        self._selecionadas: t.List[t.Tuple[models.PessoaProjeto, int]] = []
+
+    def seleciona(self, vaga: models.PessoaProjeto, pessoa_id: int):
+
+        '''
+            Registra a pessoa escolhida para a vaga: a vaga passa a
+            PENDENTE_IDEALIZADOR com a pessoa, que entra na lista de
+            ignorados da vaga
+        '''
+
+        self._selecionadas.append((vaga, pessoa_id))
+
+    def pessoas(self) -> t.Dict[int, models.Pessoa]:
+
+        '''
+            Carrega, em uma consulta, as pessoas selecionadas
+
+            Saída: {pessoa_id: Pessoa}
+        '''
+
+        ids = {pessoa_id for _, pessoa_id in self._selecionadas}
+        if not ids:
+            return {}
+
+        pessoas = self.db.query(models.Pessoa)\
+            .filter(models.Pessoa.id.in_(ids))\
+            .all()
+
+        return {pessoa.id: pessoa for pessoa in pessoas}
+
+    def aplica(self):
+
+        '''
+            Grava as alterações registradas com um único commit
+        '''
+
+        db = self.db
+
+        db.query(models.Projeto)\
+            .filter(models.Projeto.id == self.projeto_id)\
+            .update({"finalizado": False}, synchronize_session=False)
+
+        for vaga, pessoa_id in self._selecionadas:
+            vaga.pessoa_id = pessoa_id
+            vaga.situacao = "PENDENTE_IDEALIZADOR"
+            db.add(vaga)
+
+        # só insere quem ainda não está ignorado, como add_pessoa_ignorada
+        vagas_ids = {vaga.id for vaga, _ in self._selecionadas}
+        existentes = set()
+        if vagas_ids:
+            existentes = set(
+                db.query(
+                    models.PessoaIgnoradaVaga.pessoa_projeto_id,
+                    models.PessoaIgnoradaVaga.pessoa_id,
+                )
+                .filter(models.PessoaIgnoradaVaga.pessoa_projeto_id.in_(vagas_ids))
+                .all()
+            )
+
+        ignoradas = {
+            (vaga.id, pessoa_id) for vaga, pessoa_id in self._selecionadas
+        } - existentes
+
+        db.bulk_insert_mappings(models.PessoaIgnoradaVaga, [
+            {"pessoa_projeto_id": vaga_id, "pessoa_id": pessoa_id}
+            for vaga_id, pessoa_id in sorted(ignoradas)
+        ])
+
+        db.commit()
+        self._selecionadas = []
@@ -2,6 +2,7 @@ from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
 from starlette.requests import Request
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 
@@ -18,7 +19,9 @@ from app.api.api_v1.routers.habilidade import habilidades_router
 from app.api.api_v1.routers.papel import papel_router
 from app.api.api_v1.routers.pesquisa.projeto import pesquisa_projeto_router
 from app.api.api_v1.routers.pesquisa.pessoa import pesquisa_pessoa_router
+from app.api.api_v1.routers.pesquisa.busca import busca_router
 from app.api.api_v1.routers.area import area_router
+from app.api.api_v1.routers.autocompletar import autocompletar_router
 from app.api.api_v1.routers.auth import auth_router
 from app.api.api_v1.routers.pessoa_projeto import pessoa_projeto_router
 from app.api.api_v1.routers.papel import papel_router
@@ -34,15 +37,19 @@ from app.api.api_v1.routers.pessoa_projeto import pessoa_projeto_router
 from app.api.api_v1.routers.reacoes import reacoes_router
 from app.api.api_v1.routers.notificacao import notificacao_router
 from app.api.api_v1.routers.seguir import seguir_router
+from app.api.api_v1.routers.metricas import metricas_router, prometheus_router
 ############################# Routers ###########################################
 
 # from app.core import config
 # from app.db.session import SessionLocal
 # from app.core.auth import get_current_active_pessoa
 from core import config
-from db.session import SessionLocal
+from db.session import fecha_sessao
+from db.utils.cache_referencias import inicia_escuta
 from core.auth import get_current_active_pessoa
 
+from sqlalchemy import exc as sa_exc
+
 import os
 
 DEV_ENV = os.getenv("DEV_ENV")
@@ -74,12 +81,42 @@ if not DEV_ENV:
     )
 
 
+@app.get("/api/health", include_in_schema=False)
+async def health():
+    return {"status": "ok"}
+
+
+# No free connection in the pool within DB_POOL_TIMEOUT: answer like the
+# executor does when its queue is full instead of a 500
+@app.exception_handler(sa_exc.TimeoutError)
+async def pool_timeout_handler(request: Request, exc: sa_exc.TimeoutError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "servidor ocupado, tente novamente"},
+    )
+
+
+# The session is created by get_db on first use; this only closes it, so
+# requests that never touch the database never create one
 @app.middleware("http")
 async def db_session_middleware(request: Request, call_next):
-    request.state.db = SessionLocal()
-    response = await call_next(request)
-    request.state.db.close()
-    return response
+    try:
+        return await call_next(request)
+    finally:
+        fecha_sessao(request)
+
+
+# Added last so it wraps the session middleware and times the whole request
+if config.INSTRUMENTACAO_ATIVA:
+    from core.instrumentacao import instala_eventos, mede_requisicao
+
+    instala_eventos()
+    app.middleware("http")(mede_requisicao)
+
+
+# Reference-data caches: listen for the invalidations published by the
+# other workers (CACHE_REFERENCIAS_REDIS)
+app.on_event("startup")(inicia_escuta)
 
 
 # Routers
@@ -130,6 +167,13 @@ app.include_router(
     dependencies=[Depends(get_current_active_pessoa)],
 )
 
+# Public, so typing does not reach the database for authentication either
+app.include_router(
+    autocompletar_router,
+    prefix="/api/v1",
+    tags=["autocompletar"],
+)
+
 app.include_router(
     papel_router,
     prefix="/api/v1",
@@ -149,6 +193,12 @@ app.include_router(
     tags=["pesquisa_pessoa"],
 )
 
+app.include_router(
+    busca_router,
+    prefix="/api/v1",
+    tags=["busca"],
+)
+
 app.include_router(
     pessoa_projeto_router,
     prefix="/api/v1",
@@ -179,6 +229,18 @@ app.include_router(
     tags=["seguir"]
 )
 
+app.include_router(
+    metricas_router,
+    prefix="/api/v1",
+    tags=["metricas"]
+)
+
+app.include_router(
+    prometheus_router,
+    prefix="/api",
+    tags=["metricas"]
+)
+
 app.include_router(
     auth_router,
     prefix="/api",
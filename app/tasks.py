@@ -1,4 +1,5 @@
 from core.celery_app import celery_app
+from core.jobs import roda_job_match
 
 # refresh_token_list = []
 
@@ -6,6 +7,11 @@ from core.celery_app import celery_app
 def example_task(word: str) -> str:
     return f"test task returns {word}"
 
+
+@celery_app.task(name="app.tasks.job_match", acks_late=True)
+def job_match_task(job_id: int):
+    roda_job_match(job_id)
+
 # @celery_app.task
 # def append_refresh_token(token: str):
 #     r.lpush(token)
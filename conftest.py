@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 import pytest
 from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
@@ -49,6 +50,40 @@ def test_db():
     connection.close()
 
 
+@pytest.fixture
+def query_budget(test_db):
+    """
+    Context manager that fails the test if the block runs more SQL
+    statements than allowed. Use it to keep endpoints free of N+1 loads:
+
+        with query_budget(5):
+            client.get("/api/v1/projetos")
+    """
+
+    engine = test_db.get_bind()
+
+    @contextmanager
+    def budget(max_queries: int):
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            if not statement.startswith(("SAVEPOINT", "RELEASE", "ROLLBACK")):
+                statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        assert len(statements) <= max_queries, (
+            f"{len(statements)} queries, budget is {max_queries}:\n"
+            + "\n".join(statements)
+        )
+
+    return budget
+
+
 @pytest.fixture(scope="session", autouse=True)
 def create_test_db():
     """